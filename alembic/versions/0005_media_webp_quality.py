@@ -0,0 +1,64 @@
+"""media: record chosen WebP quality
+
+Revision ID: 0005_media_webp_quality
+Revises: 0004_add_apikeys
+Create Date: 2026-10-19
+
+Добавляет колонки с качеством, с которым был закодирован WebP:
+  - maincarousel.photo_webp_quality
+  - position.photo2_webp_quality
+  - foto.foto_webp_quality
+
+При включённом MEDIA_WEBP_TARGET_SSIM качество подбирается для каждого
+файла отдельно, и без этих колонок нельзя понять, что именно лежит на диске.
+
+Миграция идемпотентна: колонки добавляются только если их ещё нет
+(legacy-adoption паттерн, как в 0001–0003).
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.engine import Connection
+
+
+revision = "0005_media_webp_quality"
+down_revision = "0004_add_apikeys"
+branch_labels = None
+depends_on = None
+
+
+_QUALITY_COLUMNS: tuple[tuple[str, str], ...] = (
+    ("maincarousel", "photo_webp_quality"),
+    ("position", "photo2_webp_quality"),
+    ("foto", "foto_webp_quality"),
+)
+
+
+def _table_exists(bind: Connection, table_name: str) -> bool:
+    """Проверяет существование таблицы в схеме public."""
+    return table_name in sa.inspect(bind).get_table_names(schema="public")
+
+
+def _column_exists(bind: Connection, table_name: str, column_name: str) -> bool:
+    """Проверяет существование колонки в таблице."""
+    if not _table_exists(bind, table_name):
+        return False
+    columns = sa.inspect(bind).get_columns(table_name, schema="public")
+    return any(col["name"] == column_name for col in columns)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    for table_name, column_name in _QUALITY_COLUMNS:
+        if not _table_exists(bind, table_name) or _column_exists(bind, table_name, column_name):
+            continue
+        op.add_column(table_name, sa.Column(column_name, sa.SmallInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    for table_name, column_name in reversed(_QUALITY_COLUMNS):
+        if _column_exists(bind, table_name, column_name):
+            op.drop_column(table_name, column_name)
@@ -0,0 +1,75 @@
+"""media: intrinsic size and LQIP placeholder columns
+
+Revision ID: 0006_media_placeholders
+Revises: 0005_media_webp_quality
+Create Date: 2026-10-19
+
+Добавляет к строкам с изображениями исходные ширину/высоту и LQIP-плейсхолдер
+(крошечный WebP в виде data: URI):
+  - maincarousel.photo_width / photo_height / photo_lqip
+  - position.photo2_width / photo2_height / photo2_lqip
+  - foto.foto_width / foto_height / foto_lqip
+
+Колонки заполняются Celery-задачами конвертации в WebP; для существующих
+записей — командой ``python -m app.infrastructure.media.cli placeholders``.
+
+Миграция идемпотентна (legacy-adoption паттерн, как в 0001–0005).
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.engine import Connection
+
+
+revision = "0006_media_placeholders"
+down_revision = "0005_media_webp_quality"
+branch_labels = None
+depends_on = None
+
+
+_PLACEHOLDER_COLUMNS: tuple[tuple[str, str], ...] = (
+    ("maincarousel", "photo"),
+    ("position", "photo2"),
+    ("foto", "foto"),
+)
+
+
+def _table_exists(bind: Connection, table_name: str) -> bool:
+    """Проверяет существование таблицы в схеме public."""
+    return table_name in sa.inspect(bind).get_table_names(schema="public")
+
+
+def _column_exists(bind: Connection, table_name: str, column_name: str) -> bool:
+    """Проверяет существование колонки в таблице."""
+    if not _table_exists(bind, table_name):
+        return False
+    columns = sa.inspect(bind).get_columns(table_name, schema="public")
+    return any(col["name"] == column_name for col in columns)
+
+
+def _new_columns(prefix: str) -> tuple[sa.Column, ...]:
+    return (
+        sa.Column(f"{prefix}_width", sa.Integer(), nullable=True),
+        sa.Column(f"{prefix}_height", sa.Integer(), nullable=True),
+        sa.Column(f"{prefix}_lqip", sa.Text(), nullable=True),
+    )
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    for table_name, prefix in _PLACEHOLDER_COLUMNS:
+        if not _table_exists(bind, table_name):
+            continue
+        for column in _new_columns(prefix):
+            if not _column_exists(bind, table_name, column.name):
+                op.add_column(table_name, column)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    for table_name, prefix in reversed(_PLACEHOLDER_COLUMNS):
+        for column in reversed(_new_columns(prefix)):
+            if _column_exists(bind, table_name, column.name):
+                op.drop_column(table_name, column.name)
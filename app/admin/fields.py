@@ -20,7 +20,10 @@ import os
 from typing import Any
 
 from starlette_admin import ImageField, TinyMCEEditorField
+from starlette_admin._types import RequestAction
 
+from app.infrastructure.media.backends import get_media_storage
+from app.infrastructure.media.storage import thumbnail_relative_path
 from app.settings.config import settings
 
 
@@ -150,18 +153,35 @@ class AdminImageField(ImageField):
     Дополнительный бонус: тот же формат используется и на странице редактирования,
     поэтому встроенное превью текущего изображения начинает работать без костылей.
 
+    В списке записей (RequestAction.LIST) вместо оригинала отдаётся маленькое
+    WebP-превью из ``media/thumbs/``: страница из 100 слайдов иначе тянет
+    сотни мегабайт полноразмерных JPEG. Если превью ещё нет (запись до
+    backfill), остаётся оригинал.
+
     Параметры:
-        media_prefix — URL-префикс медиафайлов (по умолчанию '/media/').
+        media_prefix   — URL-префикс медиафайлов (по умолчанию '/media/').
+        list_thumbnail — отдавать ли превью в списке (по умолчанию True).
     """
 
     def __init__(
         self,
         *args: Any,
         media_prefix: str = "/media/",
+        list_thumbnail: bool = True,
         **kwargs: Any,
     ) -> None:
         super().__init__(*args, **kwargs)
         self._media_prefix = media_prefix.rstrip("/")
+        self._list_thumbnail = list_thumbnail
+
+    def _list_value(self, value: str) -> str:
+        """Подменяет относительный путь оригинала на путь превью, если оно есть в хранилище."""
+        if value.startswith(("http://", "https://", "/")):
+            return value
+        thumb = thumbnail_relative_path(value)
+        if get_media_storage().exists(thumb):
+            return thumb
+        return value
 
     def _build_absolute_url(self, request: Any, value: str) -> str:
         """Строит абсолютный URL к медиафайлу.
@@ -206,6 +226,8 @@ class AdminImageField(ImageField):
             return await super().serialize_value(request, value, action)
 
         if isinstance(value, str):
+            if self._list_thumbnail and action == RequestAction.LIST:
+                value = self._list_value(value)
             value = self._build_file_payload(request, value)
         elif isinstance(value, dict) and value.get("url"):
             if isinstance(value["url"], str):
@@ -16,18 +16,15 @@ from __future__ import annotations
 
 import asyncio
 import hashlib
-import io
 import json
 import logging
 import os
 import secrets
 import time
-import uuid
 from collections import defaultdict
 from pathlib import Path
 from typing import Any, Iterable
 
-from PIL import Image
 from sqlalchemy import create_engine
 from starlette.middleware import Middleware
 from starlette.middleware.sessions import SessionMiddleware
@@ -312,8 +309,7 @@ async def _tinymce_upload(request: Request) -> JSONResponse:
             status_code=403,
         )
     from app.admin.utils.photo_upload import PhotoUploadError, _validate_upload
-    from app.infrastructure.media.storage import ensure_dir
-    from app.settings.config import settings
+    from app.infrastructure.media.image_processor import save_editor_image_sync
 
     form = await request.form()
     upload = form.get("file")
@@ -338,20 +334,7 @@ async def _tinymce_upload(request: Request) -> JSONResponse:
     except PhotoUploadError as exc:
         return JSONResponse({"error": str(exc)}, status_code=400)
 
-    ext = os.path.splitext(filename)[1].lower() or ".jpg"
-    unique_name = f"{uuid.uuid4().hex}{ext}"
-    subdir = os.path.join(settings.media.MEDIA_ROOT, "media", "uploads")
-    ensure_dir(subdir)
-    dest = os.path.join(subdir, unique_name)
-
-    def _save_image() -> str:
-        img = Image.open(io.BytesIO(content))
-        if img.mode not in ("RGB", "RGBA", "L"):
-            img = img.convert("RGB")
-        img.save(dest, quality=90)
-        return f"/media/media/uploads/{unique_name}"
-
-    location = await asyncio.to_thread(_save_image)
+    location = await asyncio.to_thread(save_editor_image_sync, content, filename)
     return JSONResponse({"location": location})
 
 
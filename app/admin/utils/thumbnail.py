@@ -5,6 +5,11 @@
 
 Аналог AdminThumbnail из django-imagekit.
 
+Превью указывает не на оригинал, а на маленький WebP из ``media/thumbs/``,
+который строится при загрузке (см. image_processor.make_thumbnail_sync).
+Если превью ещё не построено (legacy-запись до backfill), браузер
+один раз откатывается на оригинал через onerror.
+
 Пример использования в ModelView:
     from app.admin.utils.thumbnail import make_thumbnail_formatter
 
@@ -21,7 +26,10 @@ from __future__ import annotations
 
 from typing import Any, Callable
 
-from markupsafe import Markup
+from markupsafe import Markup, escape
+
+from app.infrastructure.media.storage import thumbnail_relative_path
+from app.settings.config import settings
 
 
 def render_thumbnail(
@@ -34,7 +42,8 @@ def render_thumbnail(
     Args:
         photo_path: относительный путь к файлу (напр. 'media/foo.jpg').
                     Если None или пустая строка — возвращает заглушку «—».
-        height:     высота превью в пикселях.
+        height:     высота превью в пикселях; ширина считается по пропорциям
+                    THUMBNAIL_WIDTH × THUMBNAIL_HEIGHT.
         media_prefix: URL-префикс для формирования полного пути к изображению.
 
     Returns:
@@ -46,12 +55,17 @@ def render_thumbnail(
     # Убираем лишние слэши при склейке
     prefix = media_prefix.rstrip("/")
     path = photo_path.lstrip("/")
-    url = f"{prefix}/{path}"
+    url = escape(f"{prefix}/{path}")
+    thumb_url = escape(f"{prefix}/{thumbnail_relative_path(path)}")
+
+    media = settings.media
+    width = round(height * media.THUMBNAIL_WIDTH / media.THUMBNAIL_HEIGHT)
 
     return Markup(
-        f'<img src="{url}" height="{height}" '
-        f'style="object-fit:cover;border-radius:4px;" '
-        f'onerror="this.style.display=\'none\'">'
+        f'<img src="{thumb_url}" width="{width}" height="{height}" loading="lazy" '
+        f'decoding="async" style="object-fit:cover;border-radius:4px;" '
+        f'onerror="if(this.dataset.fallback){{this.style.display=\'none\'}}'
+        f'else{{this.dataset.fallback=1;this.src=\'{url}\'}}">'
     )
 
 
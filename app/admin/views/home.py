@@ -27,7 +27,8 @@ from app.admin.utils.photo_upload import handle_photo_upload
 from app.admin.fields import AdminImageField, LocalTinyMCEEditorField, RichTextUploadField
 from app.admin.views.base import BaseAdminView
 from app.infrastructure.media.image_processor import save_carousel_photo_sync
-from app.infrastructure.celery.tasks import slide_to_webp
+from app.infrastructure.celery.dispatch import task_dispatcher
+from app.infrastructure.celery.tasks import enqueue_media_task, slide_to_webp
 from app.modules.home.infrastructure.sa_models import (
     CoreSeo,
     MainCarousel,
@@ -128,12 +129,12 @@ class MainCarouselView(BaseAdminView):
     async def after_create(self, request: Request, obj: Any) -> None:
         """Запускает конвертацию в WebP после создания слайда."""
         if obj.photo:
-            slide_to_webp.delay(obj.id, obj.photo)
+            await task_dispatcher.submit(enqueue_media_task, slide_to_webp, obj.id, obj.photo)
 
     async def after_edit(self, request: Request, obj: Any) -> None:
         """Запускает конвертацию в WebP после редактирования (если фото изменилось)."""
         if obj.photo:
-            slide_to_webp.delay(obj.id, obj.photo)
+            await task_dispatcher.submit(enqueue_media_task, slide_to_webp, obj.id, obj.photo)
 
 
 # ---------------------------------------------------------------------------
@@ -25,10 +25,12 @@ from app.admin.utils.photo_upload import handle_photo_upload
 from app.admin.fields import AdminImageField, LocalTinyMCEEditorField, RichTextUploadField
 from app.admin.views.base import BaseAdminView
 from app.infrastructure.media.image_processor import save_position_photo_sync
+from app.infrastructure.celery.dispatch import task_dispatcher
 from app.infrastructure.celery.tasks import (
+    enqueue_media_task,
     foto_to_webp,
     position_photo_to_webp,
-    regenerate_pricelist_excel,
+    schedule_pricelist_excel,
 )
 from app.modules.pricelist.infrastructure.sa_models import (
     Category,
@@ -233,18 +235,22 @@ class PositionView(BaseAdminView):
     async def after_create(self, request: Request, obj: Any) -> None:
         """Запускает фоновые задачи после создания позиции."""
         if obj.photo2:
-            position_photo_to_webp.delay(obj.id, obj.photo2)
-        regenerate_pricelist_excel.delay()
+            await task_dispatcher.submit(
+                enqueue_media_task, position_photo_to_webp, obj.id, obj.photo2
+            )
+        await task_dispatcher.submit(schedule_pricelist_excel)
 
     async def after_edit(self, request: Request, obj: Any) -> None:
         """Запускает фоновые задачи после редактирования позиции."""
         if obj.photo2:
-            position_photo_to_webp.delay(obj.id, obj.photo2)
-        regenerate_pricelist_excel.delay()
+            await task_dispatcher.submit(
+                enqueue_media_task, position_photo_to_webp, obj.id, obj.photo2
+            )
+        await task_dispatcher.submit(schedule_pricelist_excel)
 
     async def after_delete(self, request: Request, obj: Any) -> None:
         """Обновляет Excel после удаления позиции."""
-        regenerate_pricelist_excel.delay()
+        await task_dispatcher.submit(schedule_pricelist_excel)
 
 
 # ---------------------------------------------------------------------------
@@ -324,12 +330,12 @@ class FotoView(BaseAdminView):
     async def after_create(self, request: Request, obj: Any) -> None:
         """Запускает конвертацию в WebP после создания фото."""
         if obj.foto:
-            foto_to_webp.delay(obj.id, obj.foto)
+            await task_dispatcher.submit(enqueue_media_task, foto_to_webp, obj.id, obj.foto)
 
     async def after_edit(self, request: Request, obj: Any) -> None:
         """Запускает конвертацию в WebP после редактирования (если фото изменилось)."""
         if obj.foto:
-            foto_to_webp.delay(obj.id, obj.foto)
+            await task_dispatcher.submit(enqueue_media_task, foto_to_webp, obj.id, obj.foto)
 
 
 # ---------------------------------------------------------------------------
@@ -351,15 +357,15 @@ class PriceDateView(BaseAdminView):
 
     async def after_create(self, request: Request, obj: Any) -> None:
         """Обновляет Excel после создания записи даты прайса."""
-        regenerate_pricelist_excel.delay()
+        await task_dispatcher.submit(schedule_pricelist_excel)
 
     async def after_edit(self, request: Request, obj: Any) -> None:
         """Обновляет Excel после редактирования записи даты прайса."""
-        regenerate_pricelist_excel.delay()
+        await task_dispatcher.submit(schedule_pricelist_excel)
 
     async def after_delete(self, request: Request, obj: Any) -> None:
         """Обновляет Excel после удаления записи даты прайса."""
-        regenerate_pricelist_excel.delay()
+        await task_dispatcher.submit(schedule_pricelist_excel)
 
 
 
@@ -1,13 +1,62 @@
 from __future__ import annotations
 
+import grp
+import hashlib
 import io
+import logging
+import os
+import pwd
+import queue
+import re
 import tarfile
-from dataclasses import dataclass
+import threading
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 from zoneinfo import ZoneInfo
 
-from app.infrastructure.backup.manifest import BackupManifest
+from app.infrastructure.backup.compression import Compressor, get_compressor
+from app.infrastructure.backup.manifest import MANIFEST_MEMBER, BackupManifest
+from app.infrastructure.backup.throttle import Throttle
+from app.infrastructure.backup.walker import WalkedFile
+
+
+logger = logging.getLogger("app.backup")
+
+BACKUP_TYPE_FULL = "full"
+BACKUP_TYPE_INCREMENTAL = "incremental"
+BACKUP_TYPE_DIFFERENTIAL = "differential"
+# a segmented upload is stored as a directory "<archive name>.parts"
+SEGMENTS_DIR_SUFFIX = ".parts"
+
+_TIMESTAMP_FORMAT = "%d%m%Y%H%M"
+_TYPE_SUFFIXES = {
+    BACKUP_TYPE_FULL: "",
+    BACKUP_TYPE_INCREMENTAL: ".inc",
+    BACKUP_TYPE_DIFFERENTIAL: ".diff",
+}
+_ARCHIVE_RE = re.compile(
+    r"^(?P<prefix>.+?)(?P<ts>\d{12})(?P<suffix>\.inc|\.diff)?\.tar\.(?:gz|zst)$"
+)
+SNAPSHOT_EXTENSION = ".snapshot.json"
+_SNAPSHOT_RE = re.compile(r"^(?P<prefix>.+?)(?P<ts>\d{12})\.snapshot\.json$")
+
+
+@dataclass(slots=True)
+class SourceDrift:
+    """Files that changed or disappeared between the walk and the tar pass.
+
+    `changed` holds the fstat the tar header was built from; `missing` files
+    were skipped.
+    """
+
+    changed: dict[str, os.stat_result] = field(default_factory=dict)
+    missing: list[str] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.changed or self.missing)
 
 
 @dataclass(slots=True)
@@ -19,43 +68,345 @@ class ArchiveResult:
     total_uncompressed_size: int
 
 
-def build_archive_name(prefix: str, timezone: str) -> tuple[str, datetime]:
+@dataclass(slots=True, frozen=True)
+class ArchiveName:
+    name: str
+    timestamp: datetime
+    backup_type: str
+    segmented: bool = False
+
+
+def build_archive_name(
+    prefix: str,
+    timezone: str,
+    backup_type: str = BACKUP_TYPE_FULL,
+    extension: str = ".tar.gz",
+) -> tuple[str, datetime]:
     now = datetime.now(ZoneInfo(timezone))
-    return f"{prefix}{now.strftime('%d%m%Y%H%M')}.tar.gz", now
+    suffix = _TYPE_SUFFIXES[backup_type]
+    return f"{prefix}{now.strftime(_TIMESTAMP_FORMAT)}{suffix}{extension}", now
+
+
+def parse_archive_name(file_name: str, prefix: str) -> ArchiveName | None:
+    if not file_name.startswith(prefix):
+        return None
+    segmented = file_name.endswith(SEGMENTS_DIR_SUFFIX)
+    file_name = file_name.removesuffix(SEGMENTS_DIR_SUFFIX)
+    match = _ARCHIVE_RE.match(file_name)
+    if not match:
+        return None
+
+    try:
+        timestamp = datetime.strptime(match.group("ts"), _TIMESTAMP_FORMAT)
+    except ValueError:
+        return None
+
+    suffix = match.group("suffix") or ""
+    backup_type = next(kind for kind, value in _TYPE_SUFFIXES.items() if value == suffix)
+    return ArchiveName(
+        name=file_name, timestamp=timestamp, backup_type=backup_type, segmented=segmented
+    )
+
+
+def parse_snapshot_name(file_name: str, prefix: str) -> ArchiveName | None:
+    """Chunk store snapshots are self-contained, so every one counts as a full backup."""
+    if not file_name.startswith(prefix):
+        return None
+    match = _SNAPSHOT_RE.match(file_name)
+    if not match:
+        return None
+    try:
+        timestamp = datetime.strptime(match.group("ts"), _TIMESTAMP_FORMAT)
+    except ValueError:
+        return None
+    return ArchiveName(name=file_name, timestamp=timestamp, backup_type=BACKUP_TYPE_FULL)
+
+
+@lru_cache(maxsize=64)
+def _user_name(uid: int) -> str:
+    try:
+        return pwd.getpwuid(uid).pw_name
+    except KeyError:
+        return ""
+
+
+@lru_cache(maxsize=64)
+def _group_name(gid: int) -> str:
+    try:
+        return grp.getgrgid(gid).gr_name
+    except KeyError:
+        return ""
+
+
+def _tarinfo_from_stat(relative: str, stat: os.stat_result) -> tarfile.TarInfo:
+    # Same header fields tar.add() fills, but from a stat the caller already has
+    tar_info = tarfile.TarInfo(name=relative)
+    tar_info.size = stat.st_size
+    tar_info.mtime = stat.st_mtime
+    tar_info.mode = stat.st_mode & 0o7777
+    tar_info.uid = stat.st_uid
+    tar_info.gid = stat.st_gid
+    tar_info.uname = _user_name(stat.st_uid)
+    tar_info.gname = _group_name(stat.st_gid)
+    return tar_info
+
+
+def _add_manifest(tar: tarfile.TarFile, manifest: BackupManifest, created_at: datetime) -> None:
+    payload = manifest.as_json().encode("utf-8")
+    tar_info = tarfile.TarInfo(name=MANIFEST_MEMBER)
+    tar_info.size = len(payload)
+    tar_info.mtime = created_at.timestamp()
+    tar.addfile(tar_info, io.BytesIO(payload))
+
+
+def _apply_drift(manifest: BackupManifest, drift: SourceDrift, files: list[WalkedFile]) -> None:
+    # totals count the tree's files only, not extra members such as the database dump
+    indexed = {item["path"] for item in manifest.file_index}
+    walked_sizes = {walked.relative: walked.stat.st_size for walked in files}
+    missing = set(drift.missing)
+    for path in missing & indexed:
+        manifest.file_count -= 1
+        manifest.total_uncompressed_size -= walked_sizes[path]
+    for path, stat in drift.changed.items():
+        if path in indexed:
+            manifest.total_uncompressed_size += stat.st_size - walked_sizes[path]
+
+    file_index: list[dict] = []
+    for item in manifest.file_index:
+        path = item["path"]
+        if path in missing:
+            continue
+        stat = drift.changed.get(path)
+        if stat is not None:
+            # the walk-time hash no longer describes the archived bytes
+            item = {
+                "path": path,
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "inode": stat.st_ino,
+            }
+        file_index.append(item)
+    manifest.file_index = file_index
+    # a vanished file may still exist in the base archive: restore must remove it
+    manifest.deleted_paths = sorted(set(manifest.deleted_paths) | missing)
 
 
-def create_tar_gz_archive(
+def _write_members(
+    tar: tarfile.TarFile,
+    *,
+    files: list[WalkedFile],
+    manifest: BackupManifest | None,
+    archive_name: str,
+    created_at: datetime,
+    throttle: Throttle | None = None,
+    drift: SourceDrift | None = None,
+) -> SourceDrift:
+    """Writes the manifest and the files; returns what changed since the walk.
+
+    Each header comes from the walker's stat unless fstat of the open file
+    disagrees (the file was written since), in which case the fresh stat is
+    used. A file that is gone is skipped. If anything drifted, a corrected
+    manifest is appended as the last member; restore applies the last one.
+    """
+    drift = drift if drift is not None else SourceDrift()
+    # the manifest goes first: listing an archive then needs only its first bytes
+    if manifest is not None:
+        manifest.archive_name = archive_name
+        _add_manifest(tar, manifest, created_at)
+
+    for walked in files:
+        try:
+            stream = walked.path.open("rb")
+        except FileNotFoundError:
+            logger.warning("Skip %s: removed after the walk", walked.relative)
+            drift.missing.append(walked.relative)
+            continue
+        with stream:
+            stat = os.fstat(stream.fileno())
+            if (stat.st_size, stat.st_mtime_ns) != (walked.stat.st_size, walked.stat.st_mtime_ns):
+                logger.warning("%s changed after the walk, archiving it as is", walked.relative)
+                drift.changed[walked.relative] = stat
+            else:
+                stat = walked.stat
+            source = throttle.reader(stream) if throttle is not None else stream
+            tar.addfile(_tarinfo_from_stat(walked.relative, stat), source)
+
+    if manifest is not None and drift:
+        _apply_drift(manifest, drift, files)
+        _add_manifest(tar, manifest, created_at)
+    return drift
+
+
+def create_tar_archive(
     *,
     temp_dir: Path,
-    file_paths: list[Path],
-    project_root: Path,
+    files: list[WalkedFile],
     prefix: str,
     timezone: str,
     manifest: BackupManifest | None = None,
+    archive_name: str | None = None,
+    created_at: datetime | None = None,
+    compressor: Compressor | None = None,
+    throttle: Throttle | None = None,
+    drift: SourceDrift | None = None,
 ) -> ArchiveResult:
+    compressor = compressor or get_compressor("gzip")
     temp_dir.mkdir(parents=True, exist_ok=True)
-    archive_name, created_at = build_archive_name(prefix=prefix, timezone=timezone)
+    if archive_name is None or created_at is None:
+        archive_name, created_at = build_archive_name(
+            prefix=prefix, timezone=timezone, extension=compressor.extension
+        )
     archive_path = temp_dir / archive_name
 
-    file_count = len(file_paths)
-    total_uncompressed_size = sum(path.stat().st_size for path in file_paths)
-
-    with tarfile.open(archive_path, mode="w:gz") as tar:
-        for path in file_paths:
-            relative = path.relative_to(project_root)
-            tar.add(path, arcname=str(relative), recursive=False)
-
-        if manifest is not None:
-            payload = manifest.as_json().encode("utf-8")
-            tar_info = tarfile.TarInfo(name="backup_manifest.json")
-            tar_info.size = len(payload)
-            tar_info.mtime = created_at.timestamp()
-            tar.addfile(tar_info, io.BytesIO(payload))
+    drift = drift if drift is not None else SourceDrift()
+    with (
+        archive_path.open("wb") as output,
+        compressor.writer(output) as compressed,
+        tarfile.open(fileobj=compressed, mode="w|") as tar,
+    ):
+        _write_members(
+            tar,
+            files=files,
+            manifest=manifest,
+            archive_name=archive_name,
+            created_at=created_at,
+            throttle=throttle,
+            drift=drift,
+        )
 
+    missing = set(drift.missing)
+    archived = [walked for walked in files if walked.relative not in missing]
     return ArchiveResult(
         archive_path=archive_path,
         archive_name=archive_name,
         created_at=created_at,
-        file_count=file_count,
-        total_uncompressed_size=total_uncompressed_size,
+        file_count=len(archived),
+        total_uncompressed_size=sum(
+            drift.changed.get(walked.relative, walked.stat).st_size for walked in archived
+        ),
     )
+
+
+class ArchiveStreamCancelled(RuntimeError):
+    pass
+
+
+_STREAM_QUEUE_CHUNKS = 4
+_STREAM_DONE = object()
+
+
+class _ChunkPipe:
+    """Write-only file object for tarfile that hands fixed-size chunks to a consumer.
+
+    The queue is bounded, so the tar thread never runs more than a few chunks
+    ahead of the upload: memory stays O(chunk_size) for any archive size.
+    """
+
+    def __init__(self, chunk_size: int) -> None:
+        self._chunk_size = chunk_size
+        self._buffer = bytearray()
+        self.queue: queue.Queue = queue.Queue(maxsize=_STREAM_QUEUE_CHUNKS)
+        self.cancelled = threading.Event()
+
+    def write(self, data: bytes) -> int:
+        self._buffer += data
+        while len(self._buffer) >= self._chunk_size:
+            self.put(bytes(self._buffer[: self._chunk_size]))
+            del self._buffer[: self._chunk_size]
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def flush_tail(self) -> None:
+        if self._buffer:
+            self.put(bytes(self._buffer))
+            self._buffer.clear()
+
+    def put(self, item: object) -> None:
+        while True:
+            if self.cancelled.is_set():
+                raise ArchiveStreamCancelled("Archive consumer went away")
+            try:
+                self.queue.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+
+def stream_tar_archive(
+    *,
+    files: list[WalkedFile],
+    archive_name: str,
+    created_at: datetime,
+    manifest: BackupManifest | None = None,
+    chunk_size: int = 8 * 1024 * 1024,
+    compressor: Compressor | None = None,
+    throttle: Throttle | None = None,
+    drift: SourceDrift | None = None,
+) -> Iterator[bytes]:
+    """Yields the compressed tar archive in chunks without touching the disk.
+
+    tarfile runs in a background thread; closing the generator early (failed
+    upload) stops that thread at its next chunk. `drift` is filled in by the
+    time the generator is exhausted.
+    """
+    pipe = _ChunkPipe(chunk_size)
+    compressor = compressor or get_compressor("gzip")
+
+    def produce() -> None:
+        try:
+            with (
+                compressor.writer(pipe) as compressed,
+                tarfile.open(fileobj=compressed, mode="w|") as tar,
+            ):
+                _write_members(
+                    tar,
+                    files=files,
+                    manifest=manifest,
+                    archive_name=archive_name,
+                    created_at=created_at,
+                    throttle=throttle,
+                    drift=drift,
+                )
+            pipe.flush_tail()
+            pipe.put(_STREAM_DONE)
+        except ArchiveStreamCancelled:
+            return
+        except BaseException as exc:
+            try:
+                pipe.put(exc)
+            except ArchiveStreamCancelled:
+                return
+
+    producer = threading.Thread(target=produce, name="backup-tar-stream", daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = pipe.queue.get()
+            if item is _STREAM_DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        pipe.cancelled.set()
+        producer.join()
+
+
+class HashingTee:
+    """Passes chunks through while computing SHA-256 and size of everything that went by."""
+
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self._chunks = chunks
+        self._digest = hashlib.sha256()
+        self.size = 0
+
+    def __iter__(self) -> Iterator[bytes]:
+        for chunk in self._chunks:
+            self._digest.update(chunk)
+            self.size += len(chunk)
+            yield chunk
+
+    def hexdigest(self) -> str:
+        return self._digest.hexdigest()
@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import logging
+import random
+import shutil
+import tarfile
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from app.infrastructure.backup.compression import (
+    COMPRESSION_GZIP,
+    COMPRESSION_PIGZ,
+    COMPRESSION_ZSTD,
+    get_compressor,
+)
+from app.infrastructure.backup.ignore_matcher import IgnoreMatcher
+from app.infrastructure.backup.walker import walk_include_root
+
+
+logger = logging.getLogger("app.backup")
+
+_WORDS = (
+    "металлолом приём цена лом меди алюминий латунь нержавейка аккумуляторы "
+    "price scrap copper brass steel iron cable radiator delivery vekolom"
+).split()
+
+
+@dataclass(slots=True)
+class WalkBenchmarkReport:
+    files: int
+    ignored_files: int
+    selected_files: int
+    legacy_seconds: float
+    walker_seconds: float
+    speedup: float
+
+
+@dataclass(slots=True)
+class CompressionBenchmarkResult:
+    compression: str
+    level: int
+    threads: int
+    output_bytes: int
+    ratio: float
+    seconds: float
+    mb_per_second: float
+
+
+@dataclass(slots=True)
+class CompressionBenchmarkReport:
+    files: int
+    input_bytes: int
+    results: list[CompressionBenchmarkResult] = field(default_factory=list)
+    skipped: list[str] = field(default_factory=list)
+
+
+class _CountingSink:
+    def __init__(self) -> None:
+        self.size = 0
+
+    def write(self, data) -> int:
+        self.size += len(data)
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+
+def build_synthetic_media_tree(root: Path, *, size_mb: int, files: int, seed: int = 42) -> int:
+    """Media-like tree: ~75% already-compressed images, ~20% text/markup, ~5% repetitive assets."""
+    rng = random.Random(seed)
+    average = max(1, size_mb * 1024 * 1024 // max(files, 1))
+    total = 0
+    for index in range(files):
+        kind = rng.random()
+        size = max(64, int(rng.expovariate(1 / average)))
+        directory = root / "media" / f"{index % 64:02d}"
+        directory.mkdir(parents=True, exist_ok=True)
+        if kind < 0.75:
+            path = directory / f"photo_{index}.webp"
+            payload = rng.randbytes(size)
+        elif kind < 0.95:
+            path = directory / f"page_{index}.html"
+            text = " ".join(rng.choice(_WORDS) for _ in range(size // 6 + 1))
+            payload = text.encode("utf-8")[:size]
+        else:
+            path = directory / f"style_{index}.css"
+            line = b".price-row td { padding: 4px 8px; color: #333; }\n"
+            payload = (line * (size // len(line) + 1))[:size]
+        path.write_bytes(payload)
+        total += len(payload)
+    return total
+
+
+def benchmark_compression(
+    *,
+    size_mb: int = 256,
+    files: int = 2000,
+    threads: int = 0,
+    compressions: tuple[str, ...] = (COMPRESSION_GZIP, COMPRESSION_PIGZ, COMPRESSION_ZSTD),
+) -> CompressionBenchmarkReport:
+    """Tars a synthetic media tree through each compressor into a counting sink (no disk writes)."""
+    root = Path(tempfile.mkdtemp(prefix="backup-bench-"))
+    try:
+        input_bytes = build_synthetic_media_tree(root, size_mb=size_mb, files=files)
+        file_paths = sorted(path for path in root.rglob("*") if path.is_file())
+        report = CompressionBenchmarkReport(files=len(file_paths), input_bytes=input_bytes)
+
+        for name in compressions:
+            try:
+                compressor = get_compressor(name, threads=threads)
+                sink = _CountingSink()
+                started_at = time.perf_counter()
+                with (
+                    compressor.writer(sink) as compressed,
+                    tarfile.open(fileobj=compressed, mode="w|") as tar,
+                ):
+                    for path in file_paths:
+                        tar.add(path, arcname=str(path.relative_to(root)), recursive=False)
+                seconds = time.perf_counter() - started_at
+            except ImportError as exc:
+                logger.warning("Skip %s benchmark: %s", name, exc)
+                report.skipped.append(name)
+                continue
+
+            report.results.append(
+                CompressionBenchmarkResult(
+                    compression=name,
+                    level=compressor.level,
+                    threads=getattr(compressor, "threads", 1),
+                    output_bytes=sink.size,
+                    ratio=round(sink.size / input_bytes, 4) if input_bytes else 0.0,
+                    seconds=round(seconds, 3),
+                    mb_per_second=round(input_bytes / 1024 / 1024 / seconds, 1) if seconds else 0.0,
+                )
+            )
+        return report
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def build_synthetic_file_tree(root: Path, *, files: int, ignored_share: float) -> int:
+    """`files` tiny files, 100 per directory; `ignored_share` of them under media/cache/."""
+    ignored = int(files * ignored_share)
+    for index in range(files):
+        base = "media/cache" if index < ignored else "media/upload"
+        directory = root / base / f"{index // 10000:03d}" / f"{index // 100 % 100:02d}"
+        if index % 100 == 0:
+            directory.mkdir(parents=True, exist_ok=True)
+        (directory / f"{index}.webp").write_bytes(b"RIFF")
+    return ignored
+
+
+def _legacy_collect(include_root: Path, project_root: Path, matcher: IgnoreMatcher) -> int:
+    # FilesBackupService before the scandir walker: rglob, filter afterwards,
+    # then one more stat for the manifest and one for the archive totals.
+    file_paths = []
+    for path in include_root.rglob("*"):
+        if path.is_dir():
+            continue
+        if path.is_symlink():
+            continue
+        resolved = path.resolve()
+        resolved.relative_to(project_root)
+        file_paths.append(resolved)
+        resolved.stat()
+    filtered = [
+        path for path in file_paths if not matcher.is_ignored(path.relative_to(project_root))
+    ]
+    sum(path.stat().st_size for path in filtered)
+    sum(path.stat().st_size for path in filtered)
+    return len(filtered)
+
+
+def benchmark_walk(*, files: int = 500_000, ignored_share: float = 0.3) -> WalkBenchmarkReport:
+    """Legacy rglob collection vs the pruning scandir walker on a synthetic tree."""
+    root = Path(tempfile.mkdtemp(prefix="backup-walk-bench-")).resolve()
+    try:
+        ignored = build_synthetic_file_tree(root, files=files, ignored_share=ignored_share)
+        matcher = IgnoreMatcher(patterns=["media/cache/", "*.tmp"])
+        include_root = root / "media"
+
+        started_at = time.perf_counter()
+        legacy_count = _legacy_collect(include_root, root, matcher)
+        legacy_seconds = time.perf_counter() - started_at
+
+        started_at = time.perf_counter()
+        walked = list(
+            walk_include_root(
+                include_root,
+                project_root=root,
+                ignore_matcher=matcher,
+                follow_symlinks=False,
+            )
+        )
+        sum(item.stat.st_size for item in walked)
+        walker_seconds = time.perf_counter() - started_at
+
+        if legacy_count != len(walked):
+            raise RuntimeError(f"Walkers disagree: legacy={legacy_count} scandir={len(walked)}")
+
+        return WalkBenchmarkReport(
+            files=files,
+            ignored_files=ignored,
+            selected_files=len(walked),
+            legacy_seconds=round(legacy_seconds, 3),
+            walker_seconds=round(walker_seconds, 3),
+            speedup=round(legacy_seconds / walker_seconds, 1) if walker_seconds else 0.0,
+        )
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
@@ -0,0 +1,381 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from app.infrastructure.backup.archiver import ArchiveName, parse_snapshot_name
+from app.infrastructure.backup.chunker import ChunkerParams, iter_chunks
+from app.infrastructure.backup.compression import (
+    COMPRESSION_GZIP,
+    COMPRESSION_PIGZ,
+    Compressor,
+    get_compressor,
+)
+from app.infrastructure.backup.restore import path_matches, safe_target_path
+from app.infrastructure.backup.segments import with_retries
+from app.infrastructure.backup.throttle import Throttle
+from app.infrastructure.backup.walker import WalkedFile
+from app.infrastructure.backup.webdav_client import WebDavClient
+
+
+logger = logging.getLogger("app.backup")
+
+BACKUP_FORMAT_CHUNKS = "chunks"
+CHUNK_STORE_CONFIG = "chunk_store.json"
+CHUNKS_DIR = "chunks"
+SNAPSHOTS_DIR = "snapshots"
+_CHUNK_STORE_VERSION = 1
+
+
+class ChunkStoreError(RuntimeError):
+    pass
+
+
+@dataclass(slots=True, frozen=True)
+class SnapshotFile:
+    path: str
+    size: int
+    mtime_ns: int
+    inode: int
+    mode: int
+    chunks: tuple[str, ...]
+
+    def as_dict(self) -> dict:
+        return {
+            "path": self.path,
+            "size": self.size,
+            "mtime_ns": self.mtime_ns,
+            "inode": self.inode,
+            "mode": self.mode,
+            "chunks": list(self.chunks),
+        }
+
+    @classmethod
+    def from_dict(cls, payload: dict) -> "SnapshotFile":
+        return cls(
+            path=payload["path"],
+            size=int(payload["size"]),
+            mtime_ns=int(payload["mtime_ns"]),
+            inode=int(payload["inode"]),
+            mode=int(payload["mode"]),
+            chunks=tuple(payload["chunks"]),
+        )
+
+
+@dataclass(slots=True)
+class Snapshot:
+    """One backup run: every file with the ordered list of chunk ids it is made of."""
+
+    name: str
+    created_at: str
+    included_roots: list[str]
+    excluded_patterns: list[str]
+    files: list[SnapshotFile] = field(default_factory=list)
+
+    @property
+    def total_size(self) -> int:
+        return sum(entry.size for entry in self.files)
+
+    def chunk_ids(self) -> set[str]:
+        return {chunk_id for entry in self.files for chunk_id in entry.chunks}
+
+    def as_json(self) -> str:
+        return json.dumps(
+            {
+                "name": self.name,
+                "created_at": self.created_at,
+                "included_roots": self.included_roots,
+                "excluded_patterns": self.excluded_patterns,
+                "files": [entry.as_dict() for entry in self.files],
+            },
+            ensure_ascii=False,
+        )
+
+    @classmethod
+    def from_json(cls, payload: str) -> "Snapshot":
+        data = json.loads(payload)
+        return cls(
+            name=data["name"],
+            created_at=data["created_at"],
+            included_roots=list(data["included_roots"]),
+            excluded_patterns=list(data["excluded_patterns"]),
+            files=[SnapshotFile.from_dict(item) for item in data["files"]],
+        )
+
+
+@dataclass(slots=True)
+class ChunkBackupStats:
+    chunks: int = 0
+    uploaded_chunks: int = 0
+    uploaded_bytes: int = 0
+    reused_files: int = 0
+
+
+class ChunkStore:
+    """Deduplicating store on WebDAV, restic-style.
+
+    Layout under `remote_dir`:
+      chunk_store.json        chunker parameters and codec, fixed when the store is created
+      chunks/ab/abcdef...     compressed chunk, named by the SHA-256 of its plain content
+      snapshots/<name>.json   Snapshot; immutable, cached locally in `cache_dir`
+    """
+
+    def __init__(
+        self,
+        client: WebDavClient,
+        remote_dir: str,
+        *,
+        cache_dir: Path,
+        parallelism: int,
+        retries: int,
+        throttle: Throttle | None = None,
+    ) -> None:
+        self._client = client
+        self._root = remote_dir.rstrip("/")
+        self._cache_dir = cache_dir
+        self._parallelism = parallelism
+        self._retries = retries
+        self._throttle = throttle
+        self._params: ChunkerParams | None = None
+        self._compressor: Compressor | None = None
+        self._known_dirs: set[str] = set()
+        self._dirs_lock = threading.Lock()
+
+    @property
+    def _config_path(self) -> str:
+        return f"{self._root}/{CHUNK_STORE_CONFIG}"
+
+    def _chunk_dir(self, chunk_id: str) -> str:
+        return f"{self._root}/{CHUNKS_DIR}/{chunk_id[:2]}"
+
+    def chunk_path(self, chunk_id: str) -> str:
+        return f"{self._chunk_dir(chunk_id)}/{chunk_id}"
+
+    def snapshot_path(self, name: str) -> str:
+        return f"{self._root}/{SNAPSHOTS_DIR}/{name}"
+
+    def _apply_config(self, payload: dict) -> None:
+        if payload.get("version") != _CHUNK_STORE_VERSION:
+            raise ChunkStoreError(f"Unsupported chunk store version: {payload.get('version')}")
+        self._params = ChunkerParams(**payload["chunker"])
+        # one chunk is too small for a compression thread pool
+        self._compressor = get_compressor(
+            payload["compression"], level=payload["compression_level"], threads=1
+        )
+
+    def load_config(self) -> None:
+        if not self._client.exists(self._config_path):
+            raise ChunkStoreError(f"No chunk store at {self._root}")
+        self._apply_config(json.loads(self._client.download_bytes(self._config_path)))
+
+    def open_for_backup(
+        self, *, compression: str, compression_level: int | None, params: ChunkerParams
+    ) -> None:
+        """Loads the store config, creating the store on first use.
+
+        Chunking and compression stay as they were when the store was created:
+        changing them would stop new chunks from matching the stored ones.
+        """
+        self._client.ensure_remote_dir(f"{self._root}/{CHUNKS_DIR}")
+        self._client.ensure_remote_dir(f"{self._root}/{SNAPSHOTS_DIR}")
+        if self._client.exists(self._config_path):
+            self.load_config()
+            if self._params != params:
+                logger.warning("Chunk store keeps its own chunker settings: %s", self._params)
+            return
+
+        codec = COMPRESSION_GZIP if compression == COMPRESSION_PIGZ else compression
+        payload = {
+            "version": _CHUNK_STORE_VERSION,
+            "compression": codec,
+            "compression_level": compression_level,
+            "chunker": params.as_dict(),
+        }
+        self._client.upload_bytes(json.dumps(payload).encode("utf-8"), self._config_path)
+        self._apply_config(payload)
+        logger.info("Created chunk store at %s", self._root)
+
+    def list_snapshots(self, prefix: str) -> list[ArchiveName]:
+        """Snapshots oldest first."""
+        entries = self._client.list_dir(f"{self._root}/{SNAPSHOTS_DIR}")
+        snapshots = [
+            snapshot
+            for entry in entries
+            if not entry.is_dir and (snapshot := parse_snapshot_name(entry.name, prefix))
+        ]
+        return sorted(snapshots, key=lambda snapshot: snapshot.timestamp)
+
+    def load_snapshot(self, name: str) -> Snapshot:
+        cached = self._cache_dir / name
+        if cached.exists():
+            return Snapshot.from_json(cached.read_text(encoding="utf-8"))
+        payload = self._client.download_bytes(self.snapshot_path(name)).decode("utf-8")
+        self._write_cache(name, payload)
+        return Snapshot.from_json(payload)
+
+    def _write_cache(self, name: str, payload: str) -> None:
+        self._cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._cache_dir / f".{name}.tmp"
+        tmp_path.write_text(payload, encoding="utf-8")
+        os.replace(tmp_path, self._cache_dir / name)
+
+    def save_snapshot(self, snapshot: Snapshot) -> None:
+        payload = snapshot.as_json()
+        with_retries(
+            lambda: self._client.upload_bytes(
+                payload.encode("utf-8"), self.snapshot_path(snapshot.name)
+            ),
+            what=f"Snapshot {snapshot.name}",
+            retries=self._retries,
+        )
+        self._write_cache(snapshot.name, payload)
+
+    def delete_snapshot(self, name: str) -> None:
+        self._client.delete_file(self.snapshot_path(name))
+        (self._cache_dir / name).unlink(missing_ok=True)
+
+    def delete_chunks(self, chunk_ids: list[str]) -> None:
+        self._client.delete_many(
+            [self.chunk_path(chunk_id) for chunk_id in chunk_ids], parallelism=self._parallelism
+        )
+
+    def _ensure_chunk_dir(self, chunk_id: str) -> None:
+        remote_dir = self._chunk_dir(chunk_id)
+        with self._dirs_lock:
+            if remote_dir in self._known_dirs:
+                return
+            self._client.ensure_remote_dir(remote_dir)
+            self._known_dirs.add(remote_dir)
+
+    def _put_chunk(self, chunk_id: str, chunk: bytes) -> int:
+        buffer = io.BytesIO()
+        with self._compressor.writer(buffer) as writer:
+            writer.write(chunk)
+        payload = buffer.getvalue()
+        self._ensure_chunk_dir(chunk_id)
+        with_retries(
+            lambda: self._client.upload_bytes(payload, self.chunk_path(chunk_id)),
+            what=f"Chunk {chunk_id}",
+            retries=self._retries,
+        )
+        return len(payload)
+
+    def _get_chunk(self, chunk_id: str) -> bytes:
+        payload = self._client.download_bytes(self.chunk_path(chunk_id))
+        chunk = self._compressor.reader(io.BytesIO(payload)).read()
+        if hashlib.sha256(chunk).hexdigest() != chunk_id:
+            raise ChunkStoreError(f"Checksum mismatch in chunk {chunk_id}")
+        return chunk
+
+    def backup(
+        self,
+        files: list[WalkedFile],
+        *,
+        parent: Snapshot | None,
+        known_chunks: set[str],
+    ) -> tuple[list[SnapshotFile], ChunkBackupStats]:
+        """Chunks changed files and uploads chunks the store does not have yet.
+
+        Files whose size, mtime and inode match the parent snapshot reuse its
+        chunk list without being read. `known_chunks` are the chunks referenced
+        by the snapshots on the server.
+        """
+        parent_files = {entry.path: entry for entry in parent.files} if parent else {}
+        queued = set(known_chunks)
+        stats = ChunkBackupStats()
+        entries: list[SnapshotFile] = []
+        pending: deque[Future[int]] = deque()
+
+        with ThreadPoolExecutor(
+            max_workers=self._parallelism, thread_name_prefix="backup-chunks"
+        ) as pool:
+            for walked in files:
+                stat = walked.stat
+                previous = parent_files.get(walked.relative)
+                if (
+                    previous is not None
+                    and previous.size == stat.st_size
+                    and previous.mtime_ns == stat.st_mtime_ns
+                    and previous.inode == stat.st_ino
+                ):
+                    chunk_ids = previous.chunks
+                    stats.reused_files += 1
+                else:
+                    ids: list[str] = []
+                    with walked.path.open("rb") as stream:
+                        source = (
+                            self._throttle.reader(stream) if self._throttle is not None else stream
+                        )
+                        for chunk in iter_chunks(source, self._params):
+                            chunk_id = hashlib.sha256(chunk).hexdigest()
+                            ids.append(chunk_id)
+                            if chunk_id in queued:
+                                continue
+                            queued.add(chunk_id)
+                            stats.uploaded_chunks += 1
+                            pending.append(pool.submit(self._put_chunk, chunk_id, chunk))
+                            # bounded read-ahead: memory stays O(parallelism * max chunk)
+                            while len(pending) > self._parallelism * 2:
+                                stats.uploaded_bytes += pending.popleft().result()
+                    chunk_ids = tuple(ids)
+
+                stats.chunks += len(chunk_ids)
+                entries.append(
+                    SnapshotFile(
+                        path=walked.relative,
+                        size=stat.st_size,
+                        mtime_ns=stat.st_mtime_ns,
+                        inode=stat.st_ino,
+                        mode=stat.st_mode & 0o7777,
+                        chunks=chunk_ids,
+                    )
+                )
+
+            while pending:
+                stats.uploaded_bytes += pending.popleft().result()
+
+        return entries, stats
+
+    def restore(
+        self,
+        snapshot: Snapshot,
+        target_dir: Path,
+        *,
+        patterns: list[str] | None = None,
+        workers: int | None = None,
+    ) -> int:
+        """Writes the snapshot's files matching `patterns` under `target_dir`, several at a time.
+
+        Only the chunks of the selected files are downloaded.
+        """
+        target_dir = target_dir.resolve()
+        target_dir.mkdir(parents=True, exist_ok=True)
+
+        def restore_file(entry: SnapshotFile) -> int:
+            path = safe_target_path(target_dir, entry.path)
+            if path is None:
+                logger.warning("Skip unsafe snapshot path: %s", entry.path)
+                return 0
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f".{path.name}.restore")
+            with tmp_path.open("wb") as output:
+                for chunk_id in entry.chunks:
+                    output.write(self._get_chunk(chunk_id))
+            os.chmod(tmp_path, entry.mode)
+            os.utime(tmp_path, ns=(entry.mtime_ns, entry.mtime_ns))
+            os.replace(tmp_path, path)
+            return 1
+
+        selected = [entry for entry in snapshot.files if path_matches(entry.path, patterns)]
+        with ThreadPoolExecutor(
+            max_workers=workers or self._parallelism, thread_name_prefix="backup-restore"
+        ) as pool:
+            return sum(pool.map(restore_file, selected))
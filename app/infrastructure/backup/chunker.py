@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+from collections.abc import Iterator
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import BinaryIO
+
+import numpy as np
+
+
+# rolling hash window: a boundary depends only on the last _WINDOW bytes
+_WINDOW = 48
+# hashes are computed for this many candidate positions per numpy pass
+_SCAN_BLOCK = 1024 * 1024
+
+
+@dataclass(slots=True, frozen=True)
+class ChunkerParams:
+    min_size: int
+    avg_size: int
+    max_size: int
+    seed: int = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "min_size": self.min_size,
+            "avg_size": self.avg_size,
+            "max_size": self.max_size,
+            "seed": self.seed,
+        }
+
+
+@lru_cache(maxsize=4)
+def _gear_table(seed: int) -> np.ndarray:
+    return np.random.Generator(np.random.PCG64(seed)).integers(
+        0, 2**64, size=256, dtype=np.uint64, endpoint=False
+    )
+
+
+def _high_bits_mask(bits: int) -> np.uint64:
+    return np.uint64(((1 << bits) - 1) << (64 - bits))
+
+
+@lru_cache(maxsize=4)
+def _masks(avg_size: int) -> tuple[np.uint64, np.uint64]:
+    bits = max(avg_size.bit_length() - 1, 4)
+    # FastCDC normalized chunking: harder to cut before the average size,
+    # easier after it, so chunk sizes cluster around avg_size.
+    return _high_bits_mask(bits + 2), _high_bits_mask(bits - 2)
+
+
+def _first_boundary(
+    data: np.ndarray, gear: np.ndarray, low: int, high: int, mask: np.uint64
+) -> int | None:
+    """First cut position p in [low, high] whose window data[p - _WINDOW:p] hashes to 0 under mask.
+
+    The hash is a windowed sum of per-byte random 64-bit values: one cumsum
+    and one subtraction per block instead of a Python loop per byte.
+    """
+    for block_low in range(low, high + 1, _SCAN_BLOCK):
+        block_high = min(block_low + _SCAN_BLOCK - 1, high)
+        values = gear[data[block_low - _WINDOW : block_high]]
+        sums = np.empty(values.size + 1, dtype=np.uint64)
+        sums[0] = 0
+        np.cumsum(values, dtype=np.uint64, out=sums[1:])
+        hashes = sums[_WINDOW:] - sums[:-_WINDOW]
+        hits = np.flatnonzero((hashes & mask) == 0)
+        if hits.size:
+            return block_low + int(hits[0])
+    return None
+
+
+def _cut_point(data: np.ndarray, params: ChunkerParams) -> int:
+    size = data.size
+    if size <= params.min_size:
+        return size
+    gear = _gear_table(params.seed)
+    mask_small, mask_large = _masks(params.avg_size)
+    normal = min(params.avg_size, size)
+    limit = min(params.max_size, size)
+    # bytes before min_size never end a chunk, so they are not hashed at all
+    low = max(params.min_size, _WINDOW)
+
+    cut = _first_boundary(data, gear, low, normal, mask_small)
+    if cut is None and normal < limit:
+        cut = _first_boundary(data, gear, normal + 1, limit, mask_large)
+    return cut if cut is not None else limit
+
+
+def iter_chunks(stream: BinaryIO, params: ChunkerParams) -> Iterator[bytes]:
+    """Content-defined chunks: an insertion or deletion moves only nearby boundaries."""
+    buffer = bytearray()
+    eof = False
+    while True:
+        while not eof and len(buffer) < params.max_size:
+            data = stream.read(params.max_size)
+            if not data:
+                eof = True
+            buffer += data
+        if not buffer:
+            return
+        cut = _cut_point(np.frombuffer(buffer, dtype=np.uint8), params)
+        chunk = bytes(buffer[:cut])
+        del buffer[:cut]
+        yield chunk
@@ -3,16 +3,139 @@ from __future__ import annotations
 import argparse
 import json
 import sys
+from dataclasses import asdict
+from datetime import datetime
+from pathlib import Path
 
+from app.infrastructure.backup.benchmark import benchmark_compression, benchmark_walk
 from app.infrastructure.backup.service import BackupLockNotAcquiredError, FilesBackupService
 from app.settings.config import settings
 
 
+def _restore(args: argparse.Namespace) -> int:
+    service = FilesBackupService(settings.backup)
+    try:
+        summary = service.restore(
+            Path(args.target),
+            archive_name=args.archive,
+            patterns=args.include,
+            workers=args.workers,
+            verify=not args.no_verify,
+        )
+    except Exception as exc:
+        print(f"Restore failed: {exc}", file=sys.stderr)
+        return 1
+
+    print(json.dumps(asdict(summary), ensure_ascii=False, indent=2))
+    return 0
+
+
+def _ls(args: argparse.Namespace) -> int:
+    service = FilesBackupService(settings.backup)
+    try:
+        if args.archive is None and not args.include:
+            for listing in service.list_backups():
+                size = "-" if listing.size is None else str(listing.size)
+                flags = ("segmented " if listing.segmented else "") + (
+                    "sha256" if listing.has_checksum else ""
+                )
+                print(f"{listing.name}\t{listing.backup_type}\t{size}\t{flags.strip()}")
+            return 0
+
+        archive_name, entries = service.list_files(
+            archive_name=args.archive, patterns=args.include
+        )
+    except Exception as exc:
+        print(f"Listing failed: {exc}", file=sys.stderr)
+        return 1
+
+    print(f"# {archive_name}: {len(entries)} files")
+    for entry in entries:
+        modified = datetime.fromtimestamp(entry.mtime_ns / 1_000_000_000).isoformat(
+            sep=" ", timespec="seconds"
+        )
+        print(f"{entry.size:>12}  {modified}  {entry.path}")
+    return 0
+
+
 def main() -> int:
     parser = argparse.ArgumentParser(description="Run project files backup to WebDAV")
-    parser.add_argument("command", nargs="?", default="run", choices=["run"])
+    parser.add_argument(
+        "command",
+        nargs="?",
+        default="run",
+        choices=["run", "restore", "ls", "compression-bench", "walk-bench"],
+    )
+    parser.add_argument(
+        "--target",
+        help="restore: directory to restore into (required)",
+    )
+    parser.add_argument(
+        "--archive",
+        default=None,
+        help="restore / ls: archive name (default: newest); restore applies its full base "
+        "and incrementals in order. ls without --archive and --include lists archives",
+    )
+    parser.add_argument(
+        "--include",
+        action="append",
+        default=None,
+        metavar="GLOB",
+        help="restore / ls: only paths matching the glob or under the directory "
+        "(repeatable), e.g. --include 'media/upload/2024/*'",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=8,
+        help="restore: threads writing extracted files",
+    )
+    parser.add_argument(
+        "--no-verify",
+        action="store_true",
+        help="restore: do not check archives against their .sha256 sidecar",
+    )
+    parser.add_argument(
+        "--size-mb",
+        type=int,
+        default=256,
+        help="compression-bench: size of the synthetic media tree",
+    )
+    parser.add_argument(
+        "--files",
+        type=int,
+        default=None,
+        help="compression-bench / walk-bench: number of files in the synthetic tree "
+        "(default 2000 / 500000)",
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=0,
+        help="compression-bench: threads for pigz/zstd (0 = all cores)",
+    )
     args = parser.parse_args()
 
+    if args.command == "compression-bench":
+        report = benchmark_compression(
+            size_mb=args.size_mb, files=args.files or 2000, threads=args.threads
+        )
+        print(json.dumps(asdict(report), ensure_ascii=False, indent=2))
+        return 0
+
+    if args.command == "walk-bench":
+        walk_report = benchmark_walk(files=args.files or 500_000)
+        print(json.dumps(asdict(walk_report), ensure_ascii=False, indent=2))
+        return 0
+
+    if args.command == "restore":
+        if not args.target:
+            parser.error("restore requires --target")
+        return _restore(args)
+
+    if args.command == "ls":
+        return _ls(args)
+
     if args.command != "run":
         parser.print_help()
         return 1
@@ -27,7 +150,7 @@ def main() -> int:
         print(f"Backup failed: {exc}", file=sys.stderr)
         return 1
 
-    print(json.dumps(summary.__dict__, ensure_ascii=False, indent=2))
+    print(json.dumps(asdict(summary), ensure_ascii=False, indent=2))
     return 0
 
 
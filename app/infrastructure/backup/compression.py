@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import gzip
+import io
+import os
+import struct
+import tarfile
+import zlib
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Protocol
+
+
+COMPRESSION_GZIP = "gzip"
+COMPRESSION_PIGZ = "pigz"
+COMPRESSION_ZSTD = "zstd"
+
+_DEFAULT_LEVELS = {
+    # tarfile "w:gz" default, kept so BACKUP_COMPRESSION=gzip produces the same archives
+    COMPRESSION_GZIP: 9,
+    COMPRESSION_PIGZ: 6,
+    COMPRESSION_ZSTD: 3,
+}
+
+_PIGZ_BLOCK_SIZE = 128 * 1024
+_DEFLATE_WINDOW = 32 * 1024
+
+
+class Compressor(Protocol):
+    name: str
+    extension: str
+
+    def writer(self, fileobj: BinaryIO) -> BinaryIO:
+        """Compressing stream; closing it writes the trailer and leaves `fileobj` open."""
+        ...
+
+    def reader(self, fileobj: BinaryIO) -> BinaryIO: ...
+
+
+@dataclass(slots=True, frozen=True)
+class GzipCompressor:
+    level: int
+    name: str = COMPRESSION_GZIP
+    extension: str = ".tar.gz"
+
+    def writer(self, fileobj: BinaryIO) -> BinaryIO:
+        return gzip.GzipFile(fileobj=fileobj, mode="wb", compresslevel=self.level)
+
+    def reader(self, fileobj: BinaryIO) -> BinaryIO:
+        return gzip.GzipFile(fileobj=fileobj, mode="rb")
+
+
+def _deflate_block(block: bytes, dictionary: bytes, level: int, last: bool) -> bytes:
+    if dictionary:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15, zdict=dictionary)
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    # Z_SYNC_FLUSH ends the block on a byte boundary without BFINAL, so the
+    # independently compressed blocks concatenate into one deflate stream.
+    flush_mode = zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH
+    return compressor.compress(block) + compressor.flush(flush_mode)
+
+
+class _ParallelGzipWriter(io.RawIOBase):
+    """pigz-style gzip: 128 KiB blocks deflated in a thread pool, primed with the previous 32 KiB.
+
+    The output is a single ordinary gzip member, readable by gzip/tarfile.
+    zlib releases the GIL while compressing, so threads scale across cores.
+    """
+
+    def __init__(self, fileobj: BinaryIO, *, level: int, threads: int) -> None:
+        super().__init__()
+        self._out = fileobj
+        self._level = level
+        self._threads = threads
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="pigz")
+        self._pending: deque[Future[bytes]] = deque()
+        self._buffer = bytearray()
+        self._dictionary = b""
+        self._crc = 0
+        self._size = 0
+        # magic, deflate, no flags, mtime=0, no extra flags, OS=unknown
+        self._out.write(b"\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff")
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._buffer += data
+        while len(self._buffer) >= _PIGZ_BLOCK_SIZE:
+            self._submit(bytes(self._buffer[:_PIGZ_BLOCK_SIZE]), last=False)
+            del self._buffer[:_PIGZ_BLOCK_SIZE]
+        return len(data)
+
+    def _submit(self, block: bytes, *, last: bool) -> None:
+        self._crc = zlib.crc32(block, self._crc)
+        self._size += len(block)
+        self._pending.append(
+            self._executor.submit(_deflate_block, block, self._dictionary, self._level, last)
+        )
+        self._dictionary = block[-_DEFLATE_WINDOW:]
+        # bounded read-ahead: memory stays O(threads * block size)
+        while len(self._pending) > self._threads * 2:
+            self._out.write(self._pending.popleft().result())
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        try:
+            self._submit(bytes(self._buffer), last=True)
+            self._buffer.clear()
+            while self._pending:
+                self._out.write(self._pending.popleft().result())
+            self._out.write(struct.pack("<II", self._crc & 0xFFFFFFFF, self._size & 0xFFFFFFFF))
+        finally:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            super().close()
+
+
+@dataclass(slots=True, frozen=True)
+class ParallelGzipCompressor:
+    level: int
+    threads: int
+    name: str = COMPRESSION_PIGZ
+    extension: str = ".tar.gz"
+
+    def writer(self, fileobj: BinaryIO) -> BinaryIO:
+        return _ParallelGzipWriter(fileobj, level=self.level, threads=self.threads)
+
+    def reader(self, fileobj: BinaryIO) -> BinaryIO:
+        return gzip.GzipFile(fileobj=fileobj, mode="rb")
+
+
+@dataclass(slots=True, frozen=True)
+class ZstdCompressor:
+    level: int
+    threads: int
+    name: str = COMPRESSION_ZSTD
+    extension: str = ".tar.zst"
+
+    def writer(self, fileobj: BinaryIO) -> BinaryIO:
+        import zstandard
+
+        compressor = zstandard.ZstdCompressor(level=self.level, threads=self.threads)
+        return compressor.stream_writer(fileobj, closefd=False)
+
+    def reader(self, fileobj: BinaryIO) -> BinaryIO:
+        import zstandard
+
+        return zstandard.ZstdDecompressor().stream_reader(fileobj, closefd=False)
+
+
+def get_compressor(name: str, *, level: int | None = None, threads: int = 0) -> Compressor:
+    resolved_level = level if level is not None else _DEFAULT_LEVELS[name]
+    resolved_threads = threads or os.cpu_count() or 1
+    if name == COMPRESSION_GZIP:
+        return GzipCompressor(level=resolved_level)
+    if name == COMPRESSION_PIGZ:
+        return ParallelGzipCompressor(level=resolved_level, threads=resolved_threads)
+    if name == COMPRESSION_ZSTD:
+        return ZstdCompressor(level=resolved_level, threads=resolved_threads)
+    raise ValueError(f"Unknown backup compression: {name}")
+
+
+def compressor_for_archive(file_name: str) -> Compressor:
+    """Decompression side: picks the codec from the archive extension."""
+    if file_name.endswith(".tar.zst"):
+        return get_compressor(COMPRESSION_ZSTD, threads=1)
+    return get_compressor(COMPRESSION_GZIP)
+
+
+def open_tar_for_reading(archive_path: Path, stream: BinaryIO) -> tarfile.TarFile:
+    """Sequential ("r|") reader over a compressed tar of any supported format."""
+    reader = compressor_for_archive(archive_path.name).reader(stream)
+    return tarfile.open(fileobj=reader, mode="r|")
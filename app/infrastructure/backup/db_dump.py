@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import logging
+import os
+import subprocess
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from urllib.parse import unquote, urlsplit
+
+from app.infrastructure.backup.walker import WalkedFile
+
+
+logger = logging.getLogger("app.backup")
+
+DB_DUMP_FORMAT_DIRECTORY = "directory"
+DB_DUMP_FORMAT_CUSTOM = "custom"
+# dump files are stored in the archive under this directory
+DB_DUMP_MEMBER_DIR = "database"
+
+_SNAPSHOT_QUERY = """
+SELECT
+    pg_export_snapshot(),
+    (CASE WHEN pg_is_in_recovery() THEN pg_last_wal_replay_lsn()
+          ELSE pg_current_wal_lsn() END)::text,
+    now(),
+    current_setting('server_version'),
+    current_database()
+"""
+
+
+class DatabaseDumpError(RuntimeError):
+    pass
+
+
+@dataclass(slots=True, frozen=True)
+class DatabaseSnapshot:
+    snapshot_id: str
+    lsn: str
+    taken_at: str
+    server_version: str
+    database: str
+
+
+@dataclass(slots=True)
+class DatabaseDump:
+    snapshot: DatabaseSnapshot
+    dump_format: str
+    member_path: str
+    files: list[WalkedFile]
+    duration_seconds: float
+
+    @property
+    def total_size(self) -> int:
+        return sum(walked.stat.st_size for walked in self.files)
+
+    def as_dict(self) -> dict:
+        return {
+            "database": self.snapshot.database,
+            "server_version": self.snapshot.server_version,
+            "snapshot_lsn": self.snapshot.lsn,
+            "snapshot_at": self.snapshot.taken_at,
+            "format": self.dump_format,
+            "path": self.member_path,
+            "file_count": len(self.files),
+            "total_size": self.total_size,
+        }
+
+
+def _libpq_uri(dsn: str) -> tuple[str, str | None]:
+    """`dsn` without the password (so it never shows up in `ps`) and the password.
+
+    SQLAlchemy-style schemes such as postgresql+psycopg2:// are accepted.
+    """
+    parts = urlsplit(dsn)
+    scheme = parts.scheme.split("+", 1)[0]
+    netloc = parts.netloc
+    password = None
+    if "@" in netloc:
+        userinfo, host = netloc.rsplit("@", 1)
+        user, separator, raw_password = userinfo.partition(":")
+        if separator:
+            password = unquote(raw_password)
+        netloc = f"{user}@{host}" if user else host
+    # built by hand: urlunsplit drops the empty host of postgresql:///db?host=/socket
+    query = f"?{parts.query}" if parts.query else ""
+    return f"{scheme}://{netloc}{parts.path}{query}", password
+
+
+@contextmanager
+def export_snapshot(dsn: str) -> Iterator[DatabaseSnapshot]:
+    """Opens a read-only REPEATABLE READ transaction and exports its snapshot.
+
+    The snapshot stays importable (`pg_dump --snapshot`) until the block exits.
+    """
+    import psycopg2
+
+    uri, password = _libpq_uri(dsn)
+    connection = psycopg2.connect(uri, password=password) if password else psycopg2.connect(uri)
+    try:
+        connection.set_session(isolation_level="REPEATABLE READ", readonly=True)
+        with connection.cursor() as cursor:
+            cursor.execute(_SNAPSHOT_QUERY)
+            snapshot_id, lsn, taken_at, server_version, database = cursor.fetchone()
+        yield DatabaseSnapshot(
+            snapshot_id=snapshot_id,
+            lsn=lsn,
+            taken_at=taken_at.isoformat(),
+            server_version=server_version,
+            database=database,
+        )
+    finally:
+        connection.rollback()
+        connection.close()
+
+
+def _walk_dump(output_dir: Path, dump_path: Path) -> list[WalkedFile]:
+    paths = sorted(dump_path.rglob("*")) if dump_path.is_dir() else [dump_path]
+    return [
+        WalkedFile(
+            path=path,
+            relative=path.relative_to(output_dir).as_posix(),
+            stat=path.stat(),
+        )
+        for path in paths
+        if path.is_file()
+    ]
+
+
+def dump_database(
+    *,
+    dsn: str,
+    output_dir: Path,
+    dump_format: str,
+    jobs: int,
+    pg_dump_binary: str = "pg_dump",
+) -> DatabaseDump:
+    """pg_dump of an exported snapshot into `output_dir/database/`.
+
+    The dump is written uncompressed: it goes through the archive compressor
+    like every other member. `jobs` applies to the directory format only.
+    """
+    started_at = time.perf_counter()
+    uri, password = _libpq_uri(dsn)
+    env = dict(os.environ)
+    if password is not None:
+        env["PGPASSWORD"] = password
+
+    with export_snapshot(dsn) as snapshot:
+        if dump_format == DB_DUMP_FORMAT_DIRECTORY:
+            dump_path = output_dir / DB_DUMP_MEMBER_DIR / snapshot.database
+        else:
+            dump_path = output_dir / DB_DUMP_MEMBER_DIR / f"{snapshot.database}.dump"
+        dump_path.parent.mkdir(parents=True, exist_ok=True)
+
+        command = [
+            pg_dump_binary,
+            f"--dbname={uri}",
+            f"--format={dump_format}",
+            f"--file={dump_path}",
+            f"--snapshot={snapshot.snapshot_id}",
+            "--compress=0",
+            "--no-password",
+        ]
+        if dump_format == DB_DUMP_FORMAT_DIRECTORY:
+            command.append(f"--jobs={jobs}")
+
+        logger.info(
+            "Dumping database %s at LSN %s (%s, jobs=%s)",
+            snapshot.database,
+            snapshot.lsn,
+            dump_format,
+            jobs if dump_format == DB_DUMP_FORMAT_DIRECTORY else 1,
+        )
+        try:
+            completed = subprocess.run(command, env=env, capture_output=True, text=True)
+        except OSError as exc:
+            raise DatabaseDumpError(f"Cannot run {pg_dump_binary}: {exc}") from exc
+        if completed.returncode != 0:
+            raise DatabaseDumpError(
+                f"pg_dump exited with code {completed.returncode}: "
+                f"{completed.stderr.strip()[-2000:]}"
+            )
+
+    files = _walk_dump(output_dir, dump_path)
+    dump = DatabaseDump(
+        snapshot=snapshot,
+        dump_format=dump_format,
+        member_path=dump_path.relative_to(output_dir).as_posix(),
+        files=files,
+        duration_seconds=time.perf_counter() - started_at,
+    )
+    logger.info(
+        "Database dump done: %s files, %s bytes in %.2f seconds",
+        len(files),
+        dump.total_size,
+        dump.duration_seconds,
+    )
+    return dump
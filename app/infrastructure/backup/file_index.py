@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from app.infrastructure.backup.walker import WalkedFile
+
+
+@dataclass(slots=True, frozen=True)
+class FileIndexEntry:
+    path: str
+    size: int
+    mtime_ns: int
+    inode: int
+    sha256: str | None = None
+
+    def same_stat(self, other: "FileIndexEntry") -> bool:
+        return (
+            self.size == other.size
+            and self.mtime_ns == other.mtime_ns
+            and self.inode == other.inode
+        )
+
+    def as_dict(self) -> dict:
+        payload = {
+            "path": self.path,
+            "size": self.size,
+            "mtime_ns": self.mtime_ns,
+            "inode": self.inode,
+        }
+        if self.sha256 is not None:
+            payload["sha256"] = self.sha256
+        return payload
+
+    @classmethod
+    def from_dict(cls, payload: dict) -> "FileIndexEntry":
+        return cls(
+            path=payload["path"],
+            size=int(payload["size"]),
+            mtime_ns=int(payload["mtime_ns"]),
+            inode=int(payload["inode"]),
+            sha256=payload.get("sha256"),
+        )
+
+
+@dataclass(slots=True)
+class FileIndex:
+    """Snapshot of the backed-up tree, keyed by path relative to the project root.
+
+    `archive_name` is the archive this index was recorded for: the next
+    incremental/differential run diffs against it and names it as its base.
+    """
+
+    archive_name: str
+    backup_type: str
+    created_at: str
+    entries: dict[str, FileIndexEntry] = field(default_factory=dict)
+
+    def as_dict(self) -> dict:
+        return {
+            "archive_name": self.archive_name,
+            "backup_type": self.backup_type,
+            "created_at": self.created_at,
+            "entries": [self.entries[path].as_dict() for path in sorted(self.entries)],
+        }
+
+    @classmethod
+    def from_dict(cls, payload: dict) -> "FileIndex":
+        entries = {
+            item["path"]: FileIndexEntry.from_dict(item) for item in payload.get("entries", [])
+        }
+        return cls(
+            archive_name=payload["archive_name"],
+            backup_type=payload["backup_type"],
+            created_at=payload["created_at"],
+            entries=entries,
+        )
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        tmp_path.write_text(json.dumps(self.as_dict(), ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "FileIndex | None":
+        if not path.exists():
+            return None
+        try:
+            return cls.from_dict(json.loads(path.read_text(encoding="utf-8")))
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+
+@dataclass(slots=True)
+class IndexDiff:
+    added: list[str]
+    changed: list[str]
+    deleted: list[str]
+
+    @property
+    def upload_paths(self) -> list[str]:
+        return sorted(self.added + self.changed)
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as stream:
+        for chunk in iter(lambda: stream.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_file_index(
+    *,
+    files: list[WalkedFile],
+    archive_name: str,
+    backup_type: str,
+    created_at: str,
+    hash_files: bool,
+    previous: FileIndex | None = None,
+) -> FileIndex:
+    """Index from the walker's cached stats; hashes are reused while stat is unchanged."""
+    entries: dict[str, FileIndexEntry] = {}
+    previous_entries = previous.entries if previous is not None else {}
+
+    for walked in files:
+        relative = walked.relative
+        stat = walked.stat
+        entry = FileIndexEntry(
+            path=relative,
+            size=stat.st_size,
+            mtime_ns=stat.st_mtime_ns,
+            inode=stat.st_ino,
+        )
+        if hash_files:
+            known = previous_entries.get(relative)
+            if known is not None and known.sha256 and known.same_stat(entry):
+                sha256 = known.sha256
+            else:
+                sha256 = _sha256(walked.path)
+            entry = FileIndexEntry(
+                path=relative,
+                size=entry.size,
+                mtime_ns=entry.mtime_ns,
+                inode=entry.inode,
+                sha256=sha256,
+            )
+        entries[relative] = entry
+
+    return FileIndex(
+        archive_name=archive_name,
+        backup_type=backup_type,
+        created_at=created_at,
+        entries=entries,
+    )
+
+
+def diff_index(previous: FileIndex, current: FileIndex) -> IndexDiff:
+    added: list[str] = []
+    changed: list[str] = []
+
+    for path, entry in current.entries.items():
+        known = previous.entries.get(path)
+        if known is None:
+            added.append(path)
+            continue
+        if known.same_stat(entry):
+            continue
+        # touched (mtime/inode) but identical content is not a change when hashes are known
+        if known.sha256 and entry.sha256 and known.sha256 == entry.sha256:
+            continue
+        changed.append(path)
+
+    deleted = sorted(path for path in previous.entries if path not in current.entries)
+    return IndexDiff(added=sorted(added), changed=sorted(changed), deleted=deleted)
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import logging
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 
 import pathspec
@@ -13,6 +13,7 @@ logger = logging.getLogger("app.backup")
 @dataclass(slots=True)
 class IgnoreMatcher:
     patterns: list[str]
+    _spec: pathspec.PathSpec = field(init=False, repr=False)
 
     def __post_init__(self) -> None:
         self._spec = pathspec.PathSpec.from_lines("gitwildmatch", self.patterns)
@@ -20,6 +21,19 @@ class IgnoreMatcher:
     def is_ignored(self, relative_path: Path) -> bool:
         return self._spec.match_file(relative_path.as_posix())
 
+    def is_ignored_path(self, relative_posix: str) -> bool:
+        return self._spec.match_file(relative_posix)
+
+    @property
+    def can_prune_directories(self) -> bool:
+        # A negation ("!media/keep/**") may re-include files under an ignored
+        # directory, so whole subtrees are skipped only when there is none.
+        return not any(pattern.startswith("!") for pattern in self.patterns)
+
+    def is_dir_ignored(self, relative_posix: str) -> bool:
+        """True when the directory and therefore everything below it is ignored."""
+        return self._spec.match_file(f"{relative_posix}/")
+
 
 def load_ignore_patterns(
     *,
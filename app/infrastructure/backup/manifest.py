@@ -2,11 +2,14 @@ from __future__ import annotations
 
 import hashlib
 import json
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
 
 
+MANIFEST_MEMBER = "backup_manifest.json"
+
+
 @dataclass(slots=True)
 class BackupManifest:
     created_at: str
@@ -16,6 +19,13 @@ class BackupManifest:
     file_count: int
     total_uncompressed_size: int
     checksum_sha256: str | None = None
+    backup_type: str = "full"
+    base_archive: str | None = None
+    deleted_paths: list[str] = field(default_factory=list)
+    file_index: list[dict] = field(default_factory=list)
+    # when the file index was taken; the database snapshot (if any) is older
+    file_index_created_at: str | None = None
+    database: dict | None = None
 
     def as_json(self) -> str:
         return json.dumps(
@@ -27,6 +37,12 @@ class BackupManifest:
                 "file_count": self.file_count,
                 "total_uncompressed_size": self.total_uncompressed_size,
                 "checksum_sha256": self.checksum_sha256,
+                "backup_type": self.backup_type,
+                "base_archive": self.base_archive,
+                "deleted_paths": self.deleted_paths,
+                "file_index": self.file_index,
+                "file_index_created_at": self.file_index_created_at,
+                "database": self.database,
             },
             ensure_ascii=False,
             indent=2,
@@ -42,9 +58,13 @@ def compute_sha256(path: Path) -> str:
     return digest.hexdigest()
 
 
+def format_sha256_sidecar(file_name: str, checksum: str) -> str:
+    return f"{checksum}  {file_name}\n"
+
+
 def write_sha256_sidecar(path: Path, checksum: str) -> Path:
     sidecar_path = Path(f"{path}.sha256")
-    sidecar_path.write_text(f"{checksum}  {path.name}\n", encoding="utf-8")
+    sidecar_path.write_text(format_sha256_sidecar(path.name, checksum), encoding="utf-8")
     return sidecar_path
 
 
@@ -56,6 +76,12 @@ def build_manifest(
     total_uncompressed_size: int,
     checksum_sha256: str | None,
     created_at: datetime,
+    backup_type: str = "full",
+    base_archive: str | None = None,
+    deleted_paths: list[str] | None = None,
+    file_index: list[dict] | None = None,
+    file_index_created_at: str | None = None,
+    database: dict | None = None,
 ) -> BackupManifest:
     return BackupManifest(
         created_at=created_at.isoformat(),
@@ -65,4 +91,10 @@ def build_manifest(
         file_count=file_count,
         total_uncompressed_size=total_uncompressed_size,
         checksum_sha256=checksum_sha256,
+        backup_type=backup_type,
+        base_archive=base_archive,
+        deleted_paths=deleted_paths or [],
+        file_index=file_index or [],
+        file_index_created_at=file_index_created_at,
+        database=database,
     )
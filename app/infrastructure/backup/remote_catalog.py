@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from app.infrastructure.backup.webdav_client import RemoteEntry
+
+
+logger = logging.getLogger("app.backup")
+
+REMOTE_CATALOG_FILE = "remote_catalog.json"
+
+
+@dataclass(slots=True)
+class RemoteCatalog:
+    """Listing of BACKUP_REMOTE_DIR kept between runs.
+
+    It is reused while the directory's ETag (or getlastmodified) is unchanged,
+    so a run costs a Depth: 0 PROPFIND instead of listing every archive. The
+    run records its own uploads and deletes, then stores the validator the
+    server reports after them.
+    """
+
+    remote_dir: str
+    etag: str | None = None
+    last_modified: str | None = None
+    entries: dict[str, RemoteEntry] = field(default_factory=dict)
+
+    def matches(self, current: RemoteEntry) -> bool:
+        if self.etag and current.etag:
+            return self.etag == current.etag
+        if self.last_modified and current.modified_at:
+            return self.last_modified == current.modified_at.isoformat()
+        return False
+
+    def refresh(self, current: RemoteEntry) -> None:
+        self.etag = current.etag
+        self.last_modified = current.modified_at.isoformat() if current.modified_at else None
+
+    def list(self) -> list[RemoteEntry]:
+        return list(self.entries.values())
+
+    def add(self, name: str, *, is_dir: bool = False, size: int | None = None) -> None:
+        self.entries[name] = RemoteEntry(
+            name=name,
+            path=f"/{self.remote_dir.strip('/')}/{name}",
+            is_dir=is_dir,
+            size=size,
+        )
+
+    def remove(self, names: list[str]) -> None:
+        for name in names:
+            self.entries.pop(name, None)
+
+    def as_json(self) -> str:
+        return json.dumps(
+            {
+                "remote_dir": self.remote_dir,
+                "etag": self.etag,
+                "last_modified": self.last_modified,
+                "entries": [entry.as_dict() for entry in self.entries.values()],
+            },
+            ensure_ascii=False,
+            indent=2,
+        )
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        tmp_path.write_text(self.as_json(), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> RemoteCatalog | None:
+        if not path.exists():
+            return None
+        try:
+            payload = json.loads(path.read_text(encoding="utf-8"))
+            entries = [RemoteEntry.from_dict(item) for item in payload["entries"]]
+            return cls(
+                remote_dir=payload["remote_dir"],
+                etag=payload.get("etag"),
+                last_modified=payload.get("last_modified"),
+                entries={entry.name: entry for entry in entries},
+            )
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            logger.warning("Ignoring unreadable remote catalog %s: %s", path, exc)
+            return None
@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+import fnmatch
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tarfile
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO
+
+from app.infrastructure.backup.archiver import (
+    BACKUP_TYPE_DIFFERENTIAL,
+    BACKUP_TYPE_FULL,
+    ArchiveName,
+    parse_archive_name,
+)
+from app.infrastructure.backup.compression import open_tar_for_reading
+from app.infrastructure.backup.file_index import FileIndexEntry
+from app.infrastructure.backup.manifest import MANIFEST_MEMBER
+
+
+logger = logging.getLogger("app.backup")
+
+# members up to this size are read into memory and written by the pool;
+# bigger ones are copied straight from the stream
+_INLINE_MEMBER_BYTES = 16 * 1024 * 1024
+_WRITE_BUFFER_BYTES = 64 * 1024 * 1024
+
+
+class RestoreChainError(RuntimeError):
+    pass
+
+
+class RestoreVerificationError(RuntimeError):
+    pass
+
+
+@dataclass(slots=True)
+class ArchiveRestoreResult:
+    archive_name: str
+    extracted_files: int
+    deleted_files: int
+
+
+def plan_restore_chain(
+    names: list[str],
+    *,
+    filename_prefix: str,
+    target_archive: str | None = None,
+) -> list[ArchiveName]:
+    """Archives to apply, oldest first, to get the state of `target_archive` (default: newest).
+
+    A differential archive needs only its full base; an incremental one needs
+    the full base and every archive after it.
+    """
+    archives = sorted(
+        (archive for name in names if (archive := parse_archive_name(name, filename_prefix))),
+        key=lambda archive: archive.timestamp,
+    )
+    if not archives:
+        raise RestoreChainError("No backup archives found")
+
+    if target_archive is None:
+        target_index = len(archives) - 1
+    else:
+        names_in_order = [archive.name for archive in archives]
+        if target_archive not in names_in_order:
+            raise RestoreChainError(f"Archive not found: {target_archive}")
+        target_index = names_in_order.index(target_archive)
+
+    base_index = target_index
+    while archives[base_index].backup_type != BACKUP_TYPE_FULL:
+        base_index -= 1
+        if base_index < 0:
+            raise RestoreChainError(f"No full archive precedes {archives[target_index].name}")
+
+    target = archives[target_index]
+    if target.backup_type == BACKUP_TYPE_DIFFERENTIAL:
+        return [archives[base_index], target]
+    return archives[base_index : target_index + 1]
+
+
+def safe_target_path(target_dir: Path, relative: str) -> Path | None:
+    candidate = (target_dir / relative).resolve()
+    try:
+        candidate.relative_to(target_dir)
+    except ValueError:
+        return None
+    return candidate
+
+
+def path_matches(relative: str, patterns: list[str] | None) -> bool:
+    """No patterns match everything; a pattern matches by glob or as a directory prefix."""
+    if not patterns:
+        return True
+    return any(
+        fnmatch.fnmatchcase(relative, pattern) or relative.startswith(pattern.rstrip("/") + "/")
+        for pattern in patterns
+    )
+
+
+class HashingReader:
+    """Read-through SHA-256 of everything read from `stream`."""
+
+    def __init__(self, stream: BinaryIO) -> None:
+        self._stream = stream
+        self._digest = hashlib.sha256()
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._stream.read(size)
+        self._digest.update(data)
+        return data
+
+    def drain(self) -> None:
+        # tar stops at its end-of-archive blocks; the hash needs every byte
+        while self.read(1024 * 1024):
+            pass
+
+    def hexdigest(self) -> str:
+        return self._digest.hexdigest()
+
+
+def read_archive_listing(stream: BinaryIO, archive_name: str) -> list[FileIndexEntry]:
+    """Files of the tree as of this archive.
+
+    The manifest is the first member, so only its bytes are downloaded. For
+    archives without a manifest file index, every member header is read. If
+    files changed during the archive pass, the corrected manifest at the end
+    of the archive is not read: the listing shows the tree as indexed.
+    """
+    entries: list[FileIndexEntry] = []
+    with open_tar_for_reading(Path(archive_name), stream) as tar:
+        for member in tar:
+            if member.name == MANIFEST_MEMBER:
+                manifest_stream = tar.extractfile(member)
+                manifest = json.loads(manifest_stream.read().decode("utf-8"))
+                if manifest.get("file_index"):
+                    return [FileIndexEntry.from_dict(item) for item in manifest["file_index"]]
+                continue
+            if member.isreg():
+                entries.append(
+                    FileIndexEntry(
+                        path=member.name,
+                        size=member.size,
+                        mtime_ns=int(member.mtime * 1_000_000_000),
+                        inode=0,
+                    )
+                )
+    return entries
+
+
+class _ParallelFileWriter:
+    """Writes extracted members from a thread pool while the tar stream keeps being read."""
+
+    def __init__(self, workers: int) -> None:
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="backup-restore"
+        )
+        self._pending: deque[tuple[Future[None], int]] = deque()
+        self._pending_bytes = 0
+
+    @staticmethod
+    def _write(path: Path, data: bytes, mode: int, mtime: float) -> None:
+        path.write_bytes(data)
+        os.chmod(path, mode)
+        os.utime(path, (mtime, mtime))
+
+    def submit(self, path: Path, data: bytes, mode: int, mtime: float) -> None:
+        future = self._executor.submit(self._write, path, data, mode, mtime)
+        self._pending.append((future, len(data)))
+        self._pending_bytes += len(data)
+        # bounded memory: at most _WRITE_BUFFER_BYTES of member data waits for the pool
+        while self._pending_bytes > _WRITE_BUFFER_BYTES:
+            self._pop()
+
+    def _pop(self) -> None:
+        future, size = self._pending.popleft()
+        self._pending_bytes -= size
+        future.result()
+
+    def finish(self) -> None:
+        try:
+            while self._pending:
+                self._pop()
+        finally:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+def apply_archive(
+    stream: BinaryIO,
+    archive_name: str,
+    target_dir: Path,
+    *,
+    patterns: list[str] | None = None,
+    expected_sha256: str | None = None,
+    workers: int = 4,
+) -> ArchiveRestoreResult:
+    """Extracts one archive from `stream` over `target_dir`, then applies its deletion list.
+
+    Only members matching `patterns` are written. Files go to hidden staging
+    names first; they replace the real files only once the whole stream is
+    read and matches `expected_sha256`, so a corrupt download changes nothing.
+    """
+    target_dir = target_dir.resolve()
+    target_dir.mkdir(parents=True, exist_ok=True)
+    hashed = HashingReader(stream)
+    writer = _ParallelFileWriter(workers)
+    staged: list[tuple[Path, Path]] = []
+    manifest: dict = {}
+
+    try:
+        try:
+            with open_tar_for_reading(Path(archive_name), hashed) as tar:
+                for member in tar:
+                    if member.name == MANIFEST_MEMBER:
+                        manifest_stream = tar.extractfile(member)
+                        if manifest_stream is not None:
+                            manifest = json.loads(manifest_stream.read().decode("utf-8"))
+                        continue
+                    if not path_matches(member.name, patterns):
+                        continue
+                    member = tarfile.data_filter(member, str(target_dir))
+                    if not member.isreg():
+                        tar.extract(member, target_dir, filter="data")
+                        continue
+
+                    path = target_dir / member.name
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    staging_path = path.with_name(f".{path.name}.restore")
+                    source = tar.extractfile(member)
+                    if member.size <= _INLINE_MEMBER_BYTES:
+                        writer.submit(staging_path, source.read(), member.mode, member.mtime)
+                    else:
+                        with staging_path.open("wb") as output:
+                            shutil.copyfileobj(source, output, 1024 * 1024)
+                        os.chmod(staging_path, member.mode)
+                        os.utime(staging_path, (member.mtime, member.mtime))
+                    staged.append((staging_path, path))
+            hashed.drain()
+        finally:
+            writer.finish()
+
+        if expected_sha256 is not None and hashed.hexdigest() != expected_sha256:
+            raise RestoreVerificationError(f"Checksum mismatch in {archive_name}")
+    except BaseException:
+        for staging_path, _ in staged:
+            staging_path.unlink(missing_ok=True)
+        raise
+
+    for staging_path, path in staged:
+        os.replace(staging_path, path)
+
+    deleted = 0
+    for relative in manifest.get("deleted_paths", []):
+        if not path_matches(relative, patterns):
+            continue
+        path = safe_target_path(target_dir, relative)
+        if path is None:
+            logger.warning("Skip unsafe tombstone path: %s", relative)
+            continue
+        if path.is_file() or path.is_symlink():
+            path.unlink()
+            deleted += 1
+
+    return ArchiveRestoreResult(
+        archive_name=archive_name,
+        extracted_files=len(staged),
+        deleted_files=deleted,
+    )
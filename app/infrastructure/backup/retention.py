@@ -1,26 +1,28 @@
 from __future__ import annotations
 
 import logging
-import re
-from datetime import datetime
 
+from app.infrastructure.backup.archiver import BACKUP_TYPE_FULL, ArchiveName, parse_archive_name
+from app.infrastructure.backup.chunk_store import ChunkStore
 from app.infrastructure.backup.webdav_client import RemoteEntry, WebDavClient
 
 
 logger = logging.getLogger("app.backup")
 
-_ARCHIVE_RE = re.compile(r"^(?P<prefix>.+?)(?P<ts>\d{12})\.tar\.gz$")
 
+def _keep_count_with_chains(archives: list[ArchiveName], retention_count: int) -> int:
+    """Extends the newest `retention_count` archives back to the full archive they need.
 
-def _extract_timestamp(file_name: str) -> datetime | None:
-    match = _ARCHIVE_RE.match(file_name)
-    if not match:
-        return None
-
-    try:
-        return datetime.strptime(match.group("ts"), "%d%m%Y%H%M")
-    except ValueError:
-        return None
+    `archives` is sorted newest first. Incremental and differential archives
+    are useless without their full base, so the base and everything between
+    it and the oldest kept archive stays too.
+    """
+    keep_count = min(retention_count, len(archives))
+    while keep_count < len(archives) and (
+        keep_count == 0 or archives[keep_count - 1].backup_type != BACKUP_TYPE_FULL
+    ):
+        keep_count += 1
+    return keep_count
 
 
 def apply_retention(
@@ -30,37 +32,87 @@ def apply_retention(
     filename_prefix: str,
     retention_count: int,
     write_sha256: bool,
+    entries: list[RemoteEntry] | None = None,
+    parallelism: int = 1,
 ) -> tuple[list[str], list[str]]:
-    entries = client.list_dir(remote_dir)
-    archive_entries: list[tuple[datetime, RemoteEntry]] = []
-    sha_entries = {entry.name for entry in entries if entry.name.endswith(".tar.gz.sha256")}
+    """Deletes archives beyond the newest `retention_count` (and their sidecars).
 
-    for entry in entries:
-        if entry.is_dir:
-            continue
-        if not entry.name.startswith(filename_prefix):
-            continue
-        if not entry.name.endswith(".tar.gz"):
-            continue
+    `entries` is the listing of `remote_dir` if the caller already has one;
+    DELETEs run `parallelism` at a time.
+    """
+    if entries is None:
+        entries = client.list_dir(remote_dir)
+    archive_entries: list[tuple[ArchiveName, RemoteEntry]] = []
+    sha_entries = {entry.name for entry in entries if entry.name.endswith(".sha256")}
 
-        timestamp = _extract_timestamp(entry.name)
-        if timestamp is None:
+    for entry in entries:
+        archive = parse_archive_name(entry.name, filename_prefix)
+        if archive is None or entry.is_dir != archive.segmented:
             continue
 
-        archive_entries.append((timestamp, entry))
+        archive_entries.append((archive, entry))
 
-    archive_entries.sort(key=lambda pair: pair[0], reverse=True)
-    keep = [entry.name for _, entry in archive_entries[:retention_count]]
+    archive_entries.sort(key=lambda pair: pair[0].timestamp, reverse=True)
+    keep_count = _keep_count_with_chains(
+        [archive for archive, _ in archive_entries], retention_count
+    )
+    keep = [entry.name for _, entry in archive_entries[:keep_count]]
 
     deleted: list[str] = []
-    for _, entry in archive_entries[retention_count:]:
-        client.delete_file(entry.path)
+    delete_paths: list[str] = []
+    for archive, entry in archive_entries[keep_count:]:
+        # DELETE of a "<archive>.parts" collection removes all its segments
+        delete_paths.append(entry.path)
         deleted.append(entry.name)
         if write_sha256:
-            sidecar_name = f"{entry.name}.sha256"
+            sidecar_name = f"{archive.name}.sha256"
             if sidecar_name in sha_entries:
-                client.delete_file(f"{remote_dir.rstrip('/')}/{sidecar_name}")
+                delete_paths.append(f"{remote_dir.rstrip('/')}/{sidecar_name}")
                 deleted.append(sidecar_name)
+    client.delete_many(delete_paths, parallelism=parallelism)
 
     logger.info("Retention completed. Keep=%s delete=%s", keep, deleted)
     return keep, deleted
+
+
+def apply_snapshot_retention(
+    *,
+    store: ChunkStore,
+    filename_prefix: str,
+    retention_count: int,
+) -> tuple[list[str], list[str]]:
+    """Keeps the newest `retention_count` snapshots; a chunk goes once no kept snapshot uses it."""
+    snapshots = store.list_snapshots(filename_prefix)
+    keep_count = min(retention_count, len(snapshots))
+    kept = snapshots[len(snapshots) - keep_count :]
+    dropped = snapshots[: len(snapshots) - keep_count]
+    keep = [snapshot.name for snapshot in kept]
+    if not dropped:
+        logger.info("Retention completed. Keep=%s delete=[]", keep)
+        return keep, []
+
+    referenced: set[str] = set()
+    for snapshot in kept:
+        referenced |= store.load_snapshot(snapshot.name).chunk_ids()
+    unreferenced: set[str] = set()
+    for snapshot in dropped:
+        unreferenced |= store.load_snapshot(snapshot.name).chunk_ids()
+    unreferenced -= referenced
+
+    # snapshots first: an interrupted run leaves orphan chunks, never a
+    # snapshot that points at deleted ones
+    deleted: list[str] = []
+    for snapshot in dropped:
+        store.delete_snapshot(snapshot.name)
+        deleted.append(snapshot.name)
+    # chunk paths are not listed in `deleted`: one snapshot may free thousands
+    orphaned = sorted(unreferenced)
+    store.delete_chunks(orphaned)
+
+    logger.info(
+        "Retention completed. Keep=%s delete=%s snapshots and %s chunks",
+        keep,
+        len(dropped),
+        len(orphaned),
+    )
+    return keep, deleted
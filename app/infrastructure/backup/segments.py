@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import BinaryIO
+
+import httpx
+
+from app.infrastructure.backup.webdav_client import WebDavClient
+
+
+logger = logging.getLogger("app.backup")
+
+SEGMENTS_MANIFEST = "segments.json"
+PENDING_UPLOAD_FILE = "pending_upload.json"
+
+_READ_CHUNK = 1024 * 1024
+
+
+@dataclass(slots=True, frozen=True)
+class Segment:
+    index: int
+    offset: int
+    size: int
+    sha256: str
+
+    @property
+    def name(self) -> str:
+        # The checksum is part of the name: a PROPFIND listing alone tells
+        # whether a segment on the server is complete and has the right bytes.
+        return f"{self.index:05d}-{self.sha256[:16]}.part"
+
+
+@dataclass(slots=True)
+class SegmentPlan:
+    archive_name: str
+    size: int
+    sha256: str
+    segment_size: int
+    segments: list[Segment] = field(default_factory=list)
+
+    def as_json(self) -> str:
+        return json.dumps(
+            {
+                "archive_name": self.archive_name,
+                "size": self.size,
+                "sha256": self.sha256,
+                "segment_size": self.segment_size,
+                "segments": [asdict(segment) | {"name": segment.name} for segment in self.segments],
+            },
+            ensure_ascii=False,
+            indent=2,
+        )
+
+    @classmethod
+    def from_json(cls, payload: str) -> "SegmentPlan":
+        data = json.loads(payload)
+        return cls(
+            archive_name=data["archive_name"],
+            size=int(data["size"]),
+            sha256=data["sha256"],
+            segment_size=int(data["segment_size"]),
+            segments=[
+                Segment(
+                    index=int(item["index"]),
+                    offset=int(item["offset"]),
+                    size=int(item["size"]),
+                    sha256=item["sha256"],
+                )
+                for item in data["segments"]
+            ],
+        )
+
+
+@dataclass(slots=True)
+class SegmentUploadResult:
+    uploaded: int
+    skipped: int
+
+
+@dataclass(slots=True)
+class PendingUpload:
+    """Local archive whose segmented upload has not finished; the next run resumes it."""
+
+    archive_name: str
+    archive_path: str
+    staged_index_path: str | None
+    file_count: int
+    total_uncompressed_size: int
+    backup_type: str
+    base_archive: str | None
+    deleted_file_count: int
+
+    def save(self, path: Path) -> None:
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        tmp_path.write_text(json.dumps(asdict(self), ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "PendingUpload | None":
+        if not path.exists():
+            return None
+        try:
+            return cls(**json.loads(path.read_text(encoding="utf-8")))
+        except (OSError, ValueError, TypeError):
+            return None
+
+
+def plan_segments(archive_path: Path, segment_size: int) -> SegmentPlan:
+    """One read pass: per-segment SHA-256 plus the SHA-256 of the whole archive."""
+    whole = hashlib.sha256()
+    segments: list[Segment] = []
+    offset = 0
+
+    with archive_path.open("rb") as stream:
+        while True:
+            digest = hashlib.sha256()
+            size = 0
+            while size < segment_size:
+                chunk = stream.read(min(_READ_CHUNK, segment_size - size))
+                if not chunk:
+                    break
+                digest.update(chunk)
+                whole.update(chunk)
+                size += len(chunk)
+            if size == 0 and segments:
+                break
+            segments.append(
+                Segment(index=len(segments), offset=offset, size=size, sha256=digest.hexdigest())
+            )
+            offset += size
+            if size < segment_size:
+                break
+
+    return SegmentPlan(
+        archive_name=archive_path.name,
+        size=offset,
+        sha256=whole.hexdigest(),
+        segment_size=segment_size,
+        segments=segments,
+    )
+
+
+def with_retries(action, *, what: str, retries: int) -> None:
+    for attempt in range(retries + 1):
+        try:
+            action()
+            return
+        except httpx.HTTPError as exc:
+            if attempt == retries:
+                raise
+            delay = min(2**attempt, 30)
+            logger.warning(
+                "%s failed (%s), retry %s/%s in %ss", what, exc, attempt + 1, retries, delay
+            )
+            time.sleep(delay)
+
+
+def upload_segments(
+    client: WebDavClient,
+    plan: SegmentPlan,
+    archive_path: Path,
+    remote_parts_dir: str,
+    *,
+    parallelism: int,
+    retries: int,
+) -> SegmentUploadResult:
+    """Uploads missing segments in parallel, then the segment manifest that marks completion."""
+    client.ensure_remote_dir(remote_parts_dir)
+    present = {
+        entry.name: entry.size for entry in client.list_dir(remote_parts_dir) if not entry.is_dir
+    }
+    missing = [segment for segment in plan.segments if present.get(segment.name) != segment.size]
+    skipped = len(plan.segments) - len(missing)
+    if skipped:
+        logger.info(
+            "Resuming %s: %s of %s segments already uploaded",
+            plan.archive_name,
+            skipped,
+            len(plan.segments),
+        )
+
+    def upload(segment: Segment) -> None:
+        with_retries(
+            lambda: client.upload_range(
+                archive_path,
+                offset=segment.offset,
+                size=segment.size,
+                remote_path=f"{remote_parts_dir}/{segment.name}",
+            ),
+            what=f"Segment {segment.name}",
+            retries=retries,
+        )
+
+    with ThreadPoolExecutor(max_workers=parallelism, thread_name_prefix="backup-upload") as pool:
+        # list() re-raises the first failure; queued segments are cancelled, running
+        # ones finish, and the next run uploads whatever is still missing
+        list(pool.map(upload, missing))
+
+    with_retries(
+        lambda: client.upload_bytes(
+            plan.as_json().encode("utf-8"), f"{remote_parts_dir}/{SEGMENTS_MANIFEST}"
+        ),
+        what="Segment manifest",
+        retries=retries,
+    )
+    return SegmentUploadResult(uploaded=len(missing), skipped=skipped)
+
+
+class SegmentedReader(io.RawIOBase):
+    """Streams a segmented archive in order, checking each segment's SHA-256 as it ends."""
+
+    def __init__(self, client: WebDavClient, remote_parts_dir: str, *, retries: int) -> None:
+        super().__init__()
+        self._client = client
+        self._remote_parts_dir = remote_parts_dir
+        self._retries = retries
+        self.plan = SegmentPlan.from_json(
+            client.download_bytes(f"{remote_parts_dir}/{SEGMENTS_MANIFEST}").decode("utf-8")
+        )
+        self._position = 0
+        self._current: BinaryIO | None = None
+        self._segment_digest = hashlib.sha256()
+        self._whole_digest = hashlib.sha256()
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while self._position < len(self.plan.segments):
+            segment = self.plan.segments[self._position]
+            if self._current is None:
+                self._current = self._client.open_reader(
+                    f"{self._remote_parts_dir}/{segment.name}", retries=self._retries
+                )
+                self._segment_digest = hashlib.sha256()
+            size = self._current.readinto(buffer)
+            if size:
+                self._segment_digest.update(buffer[:size])
+                self._whole_digest.update(buffer[:size])
+                return size
+            self._current.close()
+            self._current = None
+            if self._segment_digest.hexdigest() != segment.sha256:
+                raise ValueError(f"Checksum mismatch in segment {segment.name}")
+            self._position += 1
+            if self._position == len(self.plan.segments):
+                if self._whole_digest.hexdigest() != self.plan.sha256:
+                    raise ValueError(f"Checksum mismatch in reassembled {self.plan.archive_name}")
+        return 0
+
+    def close(self) -> None:
+        if self._current is not None:
+            self._current.close()
+            self._current = None
+        super().close()
@@ -1,16 +1,65 @@
 from __future__ import annotations
 
+import io
 import shutil
 import time
 from dataclasses import dataclass
+from datetime import datetime
 from pathlib import Path
-
-from app.infrastructure.backup.archiver import create_tar_gz_archive
-from app.infrastructure.backup.ignore_matcher import load_ignore_patterns
+from typing import BinaryIO
+
+from app.infrastructure.backup.archiver import (
+    BACKUP_TYPE_DIFFERENTIAL,
+    BACKUP_TYPE_FULL,
+    BACKUP_TYPE_INCREMENTAL,
+    SEGMENTS_DIR_SUFFIX,
+    SNAPSHOT_EXTENSION,
+    ArchiveName,
+    build_archive_name,
+    HashingTee,
+    SourceDrift,
+    create_tar_archive,
+    parse_archive_name,
+    stream_tar_archive,
+)
+from app.infrastructure.backup.chunk_store import BACKUP_FORMAT_CHUNKS, ChunkStore, Snapshot
+from app.infrastructure.backup.chunker import ChunkerParams
+from app.infrastructure.backup.compression import Compressor, get_compressor
+from app.infrastructure.backup.db_dump import DatabaseDump, dump_database
+from app.infrastructure.backup.file_index import (
+    FileIndex,
+    FileIndexEntry,
+    build_file_index,
+    diff_index,
+)
+from app.infrastructure.backup.ignore_matcher import IgnoreMatcher, load_ignore_patterns
 from app.infrastructure.backup.lock import RedisBackupLock
 from app.infrastructure.backup.logging_utils import setup_backup_logger
-from app.infrastructure.backup.manifest import build_manifest, compute_sha256, write_sha256_sidecar
-from app.infrastructure.backup.retention import apply_retention
+from app.infrastructure.backup.manifest import (
+    BackupManifest,
+    build_manifest,
+    compute_sha256,
+    format_sha256_sidecar,
+    write_sha256_sidecar,
+)
+from app.infrastructure.backup.remote_catalog import REMOTE_CATALOG_FILE, RemoteCatalog
+from app.infrastructure.backup.restore import (
+    RestoreChainError,
+    apply_archive,
+    path_matches,
+    plan_restore_chain,
+    read_archive_listing,
+)
+from app.infrastructure.backup.retention import apply_retention, apply_snapshot_retention
+from app.infrastructure.backup.segments import (
+    PENDING_UPLOAD_FILE,
+    PendingUpload,
+    SegmentedReader,
+    plan_segments,
+    upload_segments,
+)
+from app.infrastructure.backup.throttle import LoadGuard, Throttle, apply_process_priority
+from app.infrastructure.backup.walker import WalkedFile, walk_include_root
 from app.infrastructure.backup.webdav_client import WebDavClient
 from app.settings.config import BackupSettings
 
@@ -32,6 +81,35 @@ class BackupRunSummary:
     total_uncompressed_size: int
     duration_seconds: float
     deleted_remote_files: list[str]
+    backup_type: str = BACKUP_TYPE_FULL
+    base_archive: str | None = None
+    deleted_file_count: int = 0
+    uploaded_chunks: int | None = None
+    uploaded_bytes: int | None = None
+    database_snapshot_lsn: str | None = None
+    # bytes per second over the whole run, caps and load pauses included
+    read_bytes_per_second: float | None = None
+    upload_bytes_per_second: float | None = None
+    paused_seconds: float = 0.0
+
+
+@dataclass(slots=True)
+class BackupRestoreSummary:
+    target_dir: str
+    archives: list[str]
+    extracted_files: int
+    deleted_files: int
+    duration_seconds: float
+
+
+@dataclass(slots=True)
+class BackupListing:
+    name: str
+    backup_type: str
+    created_at: datetime
+    size: int | None
+    segmented: bool = False
+    has_checksum: bool = False
 
 
 class FilesBackupService:
@@ -51,9 +129,14 @@ class FilesBackupService:
             raise FileNotFoundError(f"Path does not exist: {value}")
         return candidate
 
-    def _collect_candidate_files(self, includes: list[str], follow_symlinks: bool) -> tuple[list[Path], int]:
-        file_paths: list[Path] = []
-        total_size = 0
+    def _collect_candidate_files(
+        self,
+        includes: list[str],
+        follow_symlinks: bool,
+        ignore_matcher: IgnoreMatcher,
+    ) -> list[WalkedFile]:
+        files: list[WalkedFile] = []
+        seen: set[str] = set()
 
         for include in includes:
             include_root = self._resolve_relative_path(include, must_exist=True)
@@ -61,18 +144,366 @@ class FilesBackupService:
                 self.logger.error("Include path is not a directory: %s", include)
                 raise NotADirectoryError(f"Include path is not a directory: {include}")
 
-            for path in include_root.rglob("*"):
-                if path.is_dir():
-                    continue
-                if path.is_symlink() and not follow_symlinks:
+            for walked in walk_include_root(
+                include_root,
+                project_root=self.project_root,
+                ignore_matcher=ignore_matcher,
+                follow_symlinks=follow_symlinks,
+            ):
+                # overlapping includes or a followed symlink may reach a file twice
+                if walked.relative in seen:
                     continue
+                seen.add(walked.relative)
+                files.append(walked)
+
+        return files
+
+    def _webdav_client(self, throttle: Throttle | None = None) -> WebDavClient:
+        return WebDavClient(
+            base_url=self.settings.WEBDAV_BASE_URL,
+            username=self.settings.WEBDAV_USERNAME,
+            password=self.settings.WEBDAV_PASSWORD.get_secret_value(),
+            timeout_seconds=self.settings.REQUEST_TIMEOUT_SECONDS,
+            verify_tls=self.settings.VERIFY_TLS,
+            max_connections=self.settings.UPLOAD_PARALLELISM,
+            throttle=throttle,
+        )
+
+    def _throttle(self) -> Throttle:
+        guard = None
+        if self.settings.THROTTLE_MAX_LOAD is not None or self.settings.THROTTLE_PROBE_URL:
+            guard = LoadGuard(
+                max_load_per_cpu=self.settings.THROTTLE_MAX_LOAD,
+                probe_url=self.settings.THROTTLE_PROBE_URL,
+                probe_max_ms=self.settings.THROTTLE_PROBE_MAX_MS,
+                check_interval_seconds=self.settings.THROTTLE_CHECK_SECONDS,
+                max_pause_seconds=self.settings.THROTTLE_MAX_PAUSE_SECONDS,
+            )
+        return Throttle(
+            read_bytes_per_second=self.settings.READ_BYTES_PER_SECOND,
+            upload_bytes_per_second=self.settings.UPLOAD_BYTES_PER_SECOND,
+            guard=guard,
+        )
+
+    def _with_throughput(self, summary: BackupRunSummary, throttle: Throttle) -> BackupRunSummary:
+        duration = summary.duration_seconds or 1e-9
+        summary.read_bytes_per_second = round(throttle.read_bytes / duration, 1)
+        summary.upload_bytes_per_second = round(throttle.uploaded_bytes / duration, 1)
+        summary.paused_seconds = round(throttle.paused_seconds, 3)
+        if summary.uploaded_bytes is None:
+            summary.uploaded_bytes = throttle.uploaded_bytes
+        self.logger.info(
+            "Throughput: read %.1f MiB/s, upload %.1f MiB/s, paused %.1f s",
+            summary.read_bytes_per_second / (1024 * 1024),
+            summary.upload_bytes_per_second / (1024 * 1024),
+            summary.paused_seconds,
+        )
+        return summary
+
+    def _apply_drift(self, index: FileIndex, drift: SourceDrift) -> None:
+        """Makes the saved index describe what the archive holds, not what the walk saw."""
+        for path in drift.missing:
+            # not in this archive: the next run sees it as added if it comes back
+            index.entries.pop(path, None)
+        for path, stat in drift.changed.items():
+            if path in index.entries:
+                index.entries[path] = FileIndexEntry(
+                    path=path, size=stat.st_size, mtime_ns=stat.st_mtime_ns, inode=stat.st_ino
+                )
+        self.logger.warning(
+            "%s files changed and %s disappeared during the archive pass",
+            len(drift.changed),
+            len(drift.missing),
+        )
+
+    def _remote_paths(self, archive_name: str) -> tuple[str, str | None]:
+        remote_archive_path = f"{self.settings.REMOTE_DIR.rstrip('/')}/{archive_name}"
+        remote_checksum_path = (
+            f"{remote_archive_path}.sha256" if self.settings.WRITE_SHA256 else None
+        )
+        return remote_archive_path, remote_checksum_path
+
+    def _plan_backup_type(
+        self, previous_index: FileIndex | None, remote_names: list[str]
+    ) -> tuple[str, FileIndex | None]:
+        """Returns the archive type for this run and the index to diff against."""
+        mode = self.settings.ARCHIVE_MODE
+        if mode == BACKUP_TYPE_FULL:
+            return BACKUP_TYPE_FULL, None
+        if previous_index is None:
+            self.logger.info("No local file index, making a full archive")
+            return BACKUP_TYPE_FULL, None
+
+        chain = sorted(
+            (
+                archive
+                for name in remote_names
+                if (archive := parse_archive_name(name, self.settings.FILENAME_PREFIX))
+            ),
+            key=lambda archive: archive.timestamp,
+        )
+        full_positions = [
+            index for index, archive in enumerate(chain) if archive.backup_type == BACKUP_TYPE_FULL
+        ]
+        if not full_positions:
+            self.logger.info("No full archive on WebDAV, making a full archive")
+            return BACKUP_TYPE_FULL, None
+
+        last_full = full_positions[-1]
+        if len(chain) - last_full >= self.settings.FULL_EVERY:
+            return BACKUP_TYPE_FULL, None
+
+        # The index must describe exactly the archive the new one is based on,
+        # otherwise the chain has a gap (lost index, failed run, manual delete).
+        expected_base = chain[-1] if mode == BACKUP_TYPE_INCREMENTAL else chain[last_full]
+        if previous_index.archive_name != expected_base.name:
+            self.logger.warning(
+                "File index is for %s, expected %s: making a full archive",
+                previous_index.archive_name,
+                expected_base.name,
+            )
+            return BACKUP_TYPE_FULL, None
+
+        return mode, previous_index
+
+    def _stream_upload(
+        self,
+        webdav: WebDavClient,
+        *,
+        files: list[WalkedFile],
+        manifest: BackupManifest,
+        archive_name: str,
+        created_at: datetime,
+        remote_archive_path: str,
+        remote_checksum_path: str | None,
+        compressor: Compressor,
+        throttle: Throttle | None = None,
+        drift: SourceDrift | None = None,
+    ) -> None:
+        """tar -> compressor -> SHA-256 tee -> chunked PUT in one pass, no temp archive."""
+        stream = HashingTee(
+            stream_tar_archive(
+                files=files,
+                archive_name=archive_name,
+                created_at=created_at,
+                manifest=manifest,
+                chunk_size=self.settings.STREAM_CHUNK_BYTES,
+                compressor=compressor,
+                throttle=throttle,
+                drift=drift,
+            )
+        )
+        try:
+            webdav.upload_stream(stream, remote_archive_path)
+        except Exception:
+            # do not leave a truncated archive for retention/restore to pick up
+            try:
+                webdav.delete_file(remote_archive_path)
+            except Exception:
+                self.logger.warning("Cannot delete partial upload %s", remote_archive_path)
+            raise
+        self.logger.info("Streamed %s: %s bytes", archive_name, stream.size)
+
+        if remote_checksum_path is not None:
+            sidecar = format_sha256_sidecar(archive_name, stream.hexdigest())
+            webdav.upload_bytes(sidecar.encode("utf-8"), remote_checksum_path)
+
+    def _upload_segmented(
+        self,
+        webdav: WebDavClient,
+        *,
+        archive_path: Path,
+        remote_archive_path: str,
+        remote_checksum_path: str | None,
+    ) -> None:
+        plan = plan_segments(archive_path, self.settings.UPLOAD_SEGMENT_BYTES)
+        result = upload_segments(
+            webdav,
+            plan,
+            archive_path,
+            f"{remote_archive_path}{SEGMENTS_DIR_SUFFIX}",
+            parallelism=self.settings.UPLOAD_PARALLELISM,
+            retries=self.settings.UPLOAD_SEGMENT_RETRIES,
+        )
+        self.logger.info(
+            "Uploaded %s in %s segments (%s already on WebDAV)",
+            plan.archive_name,
+            len(plan.segments),
+            result.skipped,
+        )
+        if remote_checksum_path is not None:
+            sidecar = format_sha256_sidecar(plan.archive_name, plan.sha256)
+            webdav.upload_bytes(sidecar.encode("utf-8"), remote_checksum_path)
+
+    def _complete_pending_upload(
+        self, pending: PendingUpload, state_path: Path, index_path: Path
+    ) -> None:
+        if pending.staged_index_path is not None:
+            index_path.parent.mkdir(parents=True, exist_ok=True)
+            shutil.move(pending.staged_index_path, index_path)
+        state_path.unlink(missing_ok=True)
+
+    def _discard_pending_upload(self, pending: PendingUpload, state_path: Path) -> None:
+        Path(pending.archive_path).unlink(missing_ok=True)
+        if pending.staged_index_path is not None:
+            Path(pending.staged_index_path).unlink(missing_ok=True)
+        state_path.unlink(missing_ok=True)
+
+    def _dump_database(self, dump_dir: Path) -> DatabaseDump:
+        shutil.rmtree(dump_dir, ignore_errors=True)
+        return dump_database(
+            dsn=self.settings.effective_db_dump_dsn,
+            output_dir=dump_dir,
+            dump_format=self.settings.DB_DUMP_FORMAT,
+            jobs=self.settings.DB_DUMP_JOBS,
+            pg_dump_binary=self.settings.DB_DUMP_BINARY,
+        )
+
+    def _catalog_path(self) -> Path:
+        return self._resolve_relative_path(self.settings.INDEX_FILE).parent / REMOTE_CATALOG_FILE
+
+    def _load_catalog(self, webdav: WebDavClient) -> RemoteCatalog:
+        """Listing of REMOTE_DIR (created if missing), cached while the directory is unchanged."""
+        remote_dir = self.settings.REMOTE_DIR
+        current = webdav.stat_dir(remote_dir)
+        if current is None:
+            webdav.ensure_remote_dir(remote_dir)
+            return RemoteCatalog(remote_dir=remote_dir)
+
+        cached = (
+            RemoteCatalog.load(self._catalog_path())
+            if self.settings.REMOTE_CATALOG_CACHE
+            else None
+        )
+        if cached is not None and cached.remote_dir == remote_dir and cached.matches(current):
+            self.logger.info(
+                "Remote directory unchanged since last run, using cached listing of %s entries",
+                len(cached.entries),
+            )
+            catalog = cached
+        else:
+            catalog = RemoteCatalog(
+                remote_dir=remote_dir,
+                entries={entry.name: entry for entry in webdav.list_dir(remote_dir)},
+            )
+        for entry in catalog.entries.values():
+            if entry.is_dir:
+                webdav.mark_dir_known(entry.path)
+        return catalog
+
+    def _save_catalog(self, webdav: WebDavClient, catalog: RemoteCatalog) -> None:
+        if not self.settings.REMOTE_CATALOG_CACHE:
+            return
+        # the validator after this run's own uploads and deletes
+        current = webdav.stat_dir(catalog.remote_dir)
+        if current is None:
+            return
+        catalog.refresh(current)
+        catalog.save(self._catalog_path())
+
+    def _record_upload(self, catalog: RemoteCatalog, archive_name: str, *, segmented: bool) -> None:
+        if segmented:
+            catalog.add(f"{archive_name}{SEGMENTS_DIR_SUFFIX}", is_dir=True)
+        else:
+            catalog.add(archive_name)
+        if self.settings.WRITE_SHA256:
+            catalog.add(f"{archive_name}.sha256")
+
+    def _apply_retention(self, webdav: WebDavClient, catalog: RemoteCatalog) -> list[str]:
+        _, deleted = apply_retention(
+            client=webdav,
+            remote_dir=self.settings.REMOTE_DIR,
+            filename_prefix=self.settings.FILENAME_PREFIX,
+            retention_count=self.settings.RETENTION_COUNT,
+            write_sha256=self.settings.WRITE_SHA256,
+            entries=catalog.list(),
+            parallelism=self.settings.UPLOAD_PARALLELISM,
+        )
+        catalog.remove(deleted)
+        return deleted
+
+    def _chunk_store(self, webdav: WebDavClient, throttle: Throttle | None = None) -> ChunkStore:
+        index_path = self._resolve_relative_path(self.settings.INDEX_FILE)
+        return ChunkStore(
+            webdav,
+            self.settings.REMOTE_DIR,
+            cache_dir=index_path.parent / "snapshots",
+            parallelism=self.settings.UPLOAD_PARALLELISM,
+            retries=self.settings.UPLOAD_SEGMENT_RETRIES,
+            throttle=throttle,
+        )
+
+    def _run_chunked(
+        self,
+        files: list[WalkedFile],
+        ignore_matcher: IgnoreMatcher,
+        started_at: float,
+        throttle: Throttle,
+    ) -> BackupRunSummary:
+        with self._webdav_client(throttle) as webdav:
+            # only to skip MKCOL for REMOTE_DIR, chunks/ and snapshots/; the chunk
+            # store changes REMOTE_DIR behind the catalog's back, so it is not saved
+            self._load_catalog(webdav)
+            store = self._chunk_store(webdav, throttle)
+            store.open_for_backup(
+                compression=self.settings.COMPRESSION,
+                compression_level=self.settings.COMPRESSION_LEVEL,
+                params=ChunkerParams(
+                    min_size=self.settings.CHUNK_MIN_BYTES,
+                    avg_size=self.settings.CHUNK_AVG_BYTES,
+                    max_size=self.settings.CHUNK_MAX_BYTES,
+                ),
+            )
+            existing = store.list_snapshots(self.settings.FILENAME_PREFIX)
+            known_chunks: set[str] = set()
+            for archive in existing:
+                known_chunks |= store.load_snapshot(archive.name).chunk_ids()
+            parent = store.load_snapshot(existing[-1].name) if existing else None
+
+            snapshot_name, created_at = build_archive_name(
+                prefix=self.settings.FILENAME_PREFIX,
+                timezone=self.settings.TIMEZONE,
+                extension=SNAPSHOT_EXTENSION,
+            )
+            entries, stats = store.backup(files, parent=parent, known_chunks=known_chunks)
+            snapshot = Snapshot(
+                name=snapshot_name,
+                created_at=created_at.isoformat(),
+                included_roots=self.settings.INCLUDE_DIRS,
+                excluded_patterns=ignore_matcher.patterns,
+                files=entries,
+            )
+            store.save_snapshot(snapshot)
+            self.logger.info(
+                "Snapshot %s: %s files, %s reused unread, %s of %s chunks uploaded (%s bytes)",
+                snapshot_name,
+                len(entries),
+                stats.reused_files,
+                stats.uploaded_chunks,
+                stats.chunks,
+                stats.uploaded_bytes,
+            )
 
-                resolved = path.resolve()
-                resolved.relative_to(self.project_root)
-                file_paths.append(resolved)
-                total_size += resolved.stat().st_size
+            _, deleted = apply_snapshot_retention(
+                store=store,
+                filename_prefix=self.settings.FILENAME_PREFIX,
+                retention_count=self.settings.RETENTION_COUNT,
+            )
 
-        return file_paths, total_size
+        duration = time.perf_counter() - started_at
+        self.logger.info("Backup finished successfully in %.2f seconds", duration)
+        summary = BackupRunSummary(
+            archive_name=snapshot_name,
+            remote_archive_path=store.snapshot_path(snapshot_name),
+            remote_checksum_path=None,
+            file_count=len(entries),
+            total_uncompressed_size=snapshot.total_size,
+            duration_seconds=duration,
+            deleted_remote_files=deleted,
+            uploaded_chunks=stats.uploaded_chunks,
+            uploaded_bytes=stats.uploaded_bytes,
+        )
+        return self._with_throughput(summary, throttle)
 
     def run(self, *, force: bool = False) -> BackupRunSummary:
         if not self.settings.ENABLED and not force:
@@ -92,107 +523,452 @@ class FilesBackupService:
 
         archive_path: Path | None = None
         checksum_path: Path | None = None
+        staged_index_path: Path | None = None
+        dump_dir: Path | None = None
+        # set while a segmented upload is in flight: a failed run leaves the
+        # archive and its PendingUpload state in TEMP_DIR for the next run
+        keep_for_resume = False
 
         try:
+            # before any worker thread starts: they inherit the lowered priority
+            apply_process_priority(
+                nice=self.settings.NICE,
+                ionice_class=self.settings.IONICE_CLASS,
+                ionice_level=self.settings.IONICE_LEVEL,
+            )
+            throttle = self._throttle()
+
+            temp_dir = self._resolve_relative_path(self.settings.TEMP_DIR)
+            temp_dir.mkdir(parents=True, exist_ok=True)
+            index_path = self._resolve_relative_path(self.settings.INDEX_FILE)
+            state_path = temp_dir / PENDING_UPLOAD_FILE
+            segmented = self.settings.UPLOAD_SEGMENT_BYTES is not None
+
+            pending = PendingUpload.load(state_path)
+            if pending is not None and (
+                not segmented or not Path(pending.archive_path).exists()
+            ):
+                self.logger.warning("Discarding unfinished upload of %s", pending.archive_name)
+                self._discard_pending_upload(pending, state_path)
+                pending = None
+
+            if pending is not None:
+                self.logger.info("Resuming unfinished upload of %s", pending.archive_name)
+                archive_path = Path(pending.archive_path)
+                keep_for_resume = True
+                remote_archive_path, remote_checksum_path = self._remote_paths(
+                    pending.archive_name
+                )
+                with self._webdav_client(throttle) as webdav:
+                    catalog = self._load_catalog(webdav)
+                    self._upload_segmented(
+                        webdav,
+                        archive_path=archive_path,
+                        remote_archive_path=remote_archive_path,
+                        remote_checksum_path=remote_checksum_path,
+                    )
+                    self._complete_pending_upload(pending, state_path, index_path)
+                    keep_for_resume = False
+                    self._record_upload(catalog, pending.archive_name, segmented=True)
+                    deleted = self._apply_retention(webdav, catalog)
+                    self._save_catalog(webdav, catalog)
+
+                duration = time.perf_counter() - started_at
+                self.logger.info("Backup finished successfully in %.2f seconds", duration)
+                summary = BackupRunSummary(
+                    archive_name=pending.archive_name,
+                    remote_archive_path=f"{remote_archive_path}{SEGMENTS_DIR_SUFFIX}",
+                    remote_checksum_path=remote_checksum_path,
+                    file_count=pending.file_count,
+                    total_uncompressed_size=pending.total_uncompressed_size,
+                    duration_seconds=duration,
+                    deleted_remote_files=deleted,
+                    backup_type=pending.backup_type,
+                    base_archive=pending.base_archive,
+                    deleted_file_count=pending.deleted_file_count,
+                )
+                return self._with_throughput(summary, throttle)
+
+            # The dump runs before the walk: pg_dump takes a while, and file
+            # contents are read only in the tar pass, so dumping later would
+            # widen the window in which walked files change under the run.
+            # Files in the archive are therefore never older than the snapshot.
+            database_dump: DatabaseDump | None = None
+            if self.settings.DB_DUMP:
+                dump_dir = temp_dir / "database_dump"
+                database_dump = self._dump_database(dump_dir)
+
             ignore_matcher = load_ignore_patterns(
                 project_root=self.project_root,
                 ignore_file_relative=self.settings.IGNORE_FILE,
                 extra_patterns=self.settings.EXCLUDE_PATTERNS,
             )
 
-            file_paths, _ = self._collect_candidate_files(
+            files = self._collect_candidate_files(
                 includes=self.settings.INCLUDE_DIRS,
                 follow_symlinks=self.settings.FOLLOW_SYMLINKS,
+                ignore_matcher=ignore_matcher,
             )
-            filtered_files = [
-                path
-                for path in file_paths
-                if not ignore_matcher.is_ignored(path.relative_to(self.project_root))
-            ]
-            self.logger.info(
-                "Collected %s files, after ignore=%s",
-                len(file_paths),
-                len(filtered_files),
-            )
+            self.logger.info("Collected %s files after ignore", len(files))
 
-            temp_dir = self._resolve_relative_path(self.settings.TEMP_DIR)
-            temp_dir.mkdir(parents=True, exist_ok=True)
+            if self.settings.FORMAT == BACKUP_FORMAT_CHUNKS:
+                return self._run_chunked(files, ignore_matcher, started_at, throttle)
 
-            initial_manifest = build_manifest(
-                archive_name="pending",
-                included_roots=self.settings.INCLUDE_DIRS,
-                excluded_patterns=ignore_matcher.patterns,
-                file_count=len(filtered_files),
-                total_uncompressed_size=sum(path.stat().st_size for path in filtered_files),
-                checksum_sha256=None,
-                created_at=time_to_datetime(self.settings.TIMEZONE),
-            )
+            with self._webdav_client(throttle) as webdav:
+                catalog = self._load_catalog(webdav)
 
-            archive_result = create_tar_gz_archive(
-                temp_dir=temp_dir,
-                file_paths=filtered_files,
-                project_root=self.project_root,
-                prefix=self.settings.FILENAME_PREFIX,
-                timezone=self.settings.TIMEZONE,
-                manifest=initial_manifest,
-            )
-            archive_path = archive_result.archive_path
-
-            checksum = None
-            if self.settings.WRITE_SHA256:
-                checksum = compute_sha256(archive_path)
-                checksum_path = write_sha256_sidecar(archive_path, checksum)
-
-            with WebDavClient(
-                base_url=self.settings.WEBDAV_BASE_URL,
-                username=self.settings.WEBDAV_USERNAME,
-                password=self.settings.WEBDAV_PASSWORD.get_secret_value(),
-                timeout_seconds=self.settings.REQUEST_TIMEOUT_SECONDS,
-                verify_tls=self.settings.VERIFY_TLS,
-            ) as webdav:
-                webdav.ensure_remote_dir(self.settings.REMOTE_DIR)
-
-                remote_archive_path = f"{self.settings.REMOTE_DIR.rstrip('/')}/{archive_path.name}"
-                webdav.upload_file(archive_path, remote_archive_path)
-
-                remote_checksum_path = None
-                if checksum_path is not None:
-                    remote_checksum_path = f"{remote_archive_path}.sha256"
-                    webdav.upload_file(checksum_path, remote_checksum_path)
-
-                _, deleted = apply_retention(
-                    client=webdav,
-                    remote_dir=self.settings.REMOTE_DIR,
-                    filename_prefix=self.settings.FILENAME_PREFIX,
-                    retention_count=self.settings.RETENTION_COUNT,
-                    write_sha256=self.settings.WRITE_SHA256,
+                previous_index = (
+                    FileIndex.load(index_path)
+                    if self.settings.ARCHIVE_MODE != BACKUP_TYPE_FULL
+                    else None
                 )
+                remote_names = [entry.name for entry in catalog.list()]
+                backup_type, base_index = self._plan_backup_type(previous_index, remote_names)
+
+                compressor = get_compressor(
+                    self.settings.COMPRESSION,
+                    level=self.settings.COMPRESSION_LEVEL,
+                    threads=self.settings.COMPRESSION_THREADS,
+                )
+                archive_name, created_at = build_archive_name(
+                    prefix=self.settings.FILENAME_PREFIX,
+                    timezone=self.settings.TIMEZONE,
+                    backup_type=backup_type,
+                    extension=compressor.extension,
+                )
+                current_index = build_file_index(
+                    files=files,
+                    archive_name=archive_name,
+                    backup_type=backup_type,
+                    created_at=created_at.isoformat(),
+                    hash_files=self.settings.INDEX_SHA256,
+                    previous=previous_index,
+                )
+                archive_paths = list(current_index.entries)
+                deleted_paths: list[str] = []
+                if base_index is not None:
+                    changes = diff_index(base_index, current_index)
+                    archive_paths = changes.upload_paths
+                    deleted_paths = changes.deleted
+                    self.logger.info(
+                        "%s archive based on %s: added=%s changed=%s deleted=%s",
+                        backup_type.capitalize(),
+                        base_index.archive_name,
+                        len(changes.added),
+                        len(changes.changed),
+                        len(changes.deleted),
+                    )
+
+                initial_manifest = build_manifest(
+                    archive_name=archive_name,
+                    included_roots=self.settings.INCLUDE_DIRS,
+                    excluded_patterns=ignore_matcher.patterns,
+                    file_count=len(archive_paths),
+                    total_uncompressed_size=sum(
+                        current_index.entries[path].size for path in archive_paths
+                    ),
+                    checksum_sha256=None,
+                    created_at=created_at,
+                    backup_type=backup_type,
+                    base_archive=base_index.archive_name if base_index else None,
+                    deleted_paths=deleted_paths,
+                    file_index=[
+                        current_index.entries[path].as_dict()
+                        for path in sorted(current_index.entries)
+                    ],
+                    file_index_created_at=current_index.created_at,
+                    database=database_dump.as_dict() if database_dump else None,
+                )
+
+                files_by_path = {walked.relative: walked for walked in files}
+                archive_files = [files_by_path[path] for path in archive_paths]
+                if database_dump is not None:
+                    # always the whole dump, also in incremental archives
+                    archive_files.extend(database_dump.files)
+                remote_archive_path, remote_checksum_path = self._remote_paths(archive_name)
+                # A differential run keeps diffing against its full base, so
+                # only full archives replace the local index in that mode.
+                save_index = (
+                    self.settings.ARCHIVE_MODE != BACKUP_TYPE_DIFFERENTIAL
+                    or backup_type == BACKUP_TYPE_FULL
+                )
+
+                drift = SourceDrift()
+                if self.settings.STREAM_UPLOAD:
+                    self._stream_upload(
+                        webdav,
+                        files=archive_files,
+                        manifest=initial_manifest,
+                        archive_name=archive_name,
+                        created_at=created_at,
+                        remote_archive_path=remote_archive_path,
+                        remote_checksum_path=remote_checksum_path,
+                        compressor=compressor,
+                        throttle=throttle,
+                        drift=drift,
+                    )
+                else:
+                    archive_result = create_tar_archive(
+                        temp_dir=temp_dir,
+                        files=archive_files,
+                        prefix=self.settings.FILENAME_PREFIX,
+                        timezone=self.settings.TIMEZONE,
+                        manifest=initial_manifest,
+                        archive_name=archive_name,
+                        created_at=created_at,
+                        compressor=compressor,
+                        throttle=throttle,
+                        drift=drift,
+                    )
+                    archive_path = archive_result.archive_path
+                if drift:
+                    self._apply_drift(current_index, drift)
+
+                if segmented:
+                    # the index is installed only after the last segment lands,
+                    # so an interrupted upload never becomes the next run's base
+                    if save_index:
+                        staged_index_path = temp_dir / f"{archive_name}.index.json"
+                        current_index.save(staged_index_path)
+                    pending = PendingUpload(
+                        archive_name=archive_name,
+                        archive_path=str(archive_path),
+                        staged_index_path=str(staged_index_path) if staged_index_path else None,
+                        file_count=initial_manifest.file_count,
+                        total_uncompressed_size=initial_manifest.total_uncompressed_size,
+                        backup_type=backup_type,
+                        base_archive=base_index.archive_name if base_index else None,
+                        deleted_file_count=len(deleted_paths),
+                    )
+                    pending.save(state_path)
+                    keep_for_resume = True
+                    self._upload_segmented(
+                        webdav,
+                        archive_path=archive_path,
+                        remote_archive_path=remote_archive_path,
+                        remote_checksum_path=remote_checksum_path,
+                    )
+                    self._complete_pending_upload(pending, state_path, index_path)
+                    keep_for_resume = False
+                    remote_archive_path = f"{remote_archive_path}{SEGMENTS_DIR_SUFFIX}"
+                elif not self.settings.STREAM_UPLOAD:
+                    if remote_checksum_path is not None:
+                        checksum = compute_sha256(archive_path)
+                        checksum_path = write_sha256_sidecar(archive_path, checksum)
+
+                    webdav.upload_file(archive_path, remote_archive_path)
+                    if checksum_path is not None:
+                        webdav.upload_file(checksum_path, remote_checksum_path)
+
+                if save_index and not segmented:
+                    current_index.save(index_path)
+
+                self._record_upload(catalog, archive_name, segmented=segmented)
+                deleted = self._apply_retention(webdav, catalog)
+                self._save_catalog(webdav, catalog)
 
             duration = time.perf_counter() - started_at
             self.logger.info("Backup finished successfully in %.2f seconds", duration)
-            return BackupRunSummary(
-                archive_name=archive_path.name,
+            summary = BackupRunSummary(
+                archive_name=archive_name,
                 remote_archive_path=remote_archive_path,
                 remote_checksum_path=remote_checksum_path,
-                file_count=archive_result.file_count,
-                total_uncompressed_size=archive_result.total_uncompressed_size,
+                file_count=initial_manifest.file_count,
+                total_uncompressed_size=initial_manifest.total_uncompressed_size,
                 duration_seconds=duration,
                 deleted_remote_files=deleted,
+                backup_type=backup_type,
+                base_archive=base_index.archive_name if base_index else None,
+                deleted_file_count=len(deleted_paths),
+                database_snapshot_lsn=database_dump.snapshot.lsn if database_dump else None,
             )
+            return self._with_throughput(summary, throttle)
         finally:
             if checksum_path and checksum_path.exists():
                 checksum_path.unlink(missing_ok=True)
-            if archive_path and archive_path.exists():
-                archive_path.unlink(missing_ok=True)
+            if not keep_for_resume:
+                if archive_path and archive_path.exists():
+                    archive_path.unlink(missing_ok=True)
+                if staged_index_path and staged_index_path.exists():
+                    staged_index_path.unlink(missing_ok=True)
+            # the archive holds the dump by now, also when kept for resume
+            if dump_dir is not None:
+                shutil.rmtree(dump_dir, ignore_errors=True)
 
             temp_root = self._resolve_relative_path(self.settings.TEMP_DIR)
             if temp_root.exists() and not any(temp_root.iterdir()):
                 shutil.rmtree(temp_root, ignore_errors=True)
             lock.release()
 
+    def _open_archive(
+        self, webdav: WebDavClient, archive: ArchiveName, remote_names: set[str], *, verify: bool
+    ) -> tuple[BinaryIO, str | None]:
+        """Streaming reader for a remote archive and the SHA-256 it must match (if known)."""
+        remote_path = f"{self.settings.REMOTE_DIR.rstrip('/')}/{archive.name}"
+        retries = self.settings.UPLOAD_SEGMENT_RETRIES
+        if archive.segmented:
+            # SegmentedReader checks every segment and the whole archive itself
+            reader = SegmentedReader(webdav, f"{remote_path}{SEGMENTS_DIR_SUFFIX}", retries=retries)
+            return io.BufferedReader(reader, buffer_size=1024 * 1024), None
+
+        expected_sha256 = None
+        if verify and f"{archive.name}.sha256" in remote_names:
+            sidecar = webdav.download_bytes(f"{remote_path}.sha256").decode("utf-8")
+            expected_sha256 = sidecar.split()[0]
+        return webdav.open_reader(remote_path, retries=retries), expected_sha256
+
+    def restore(
+        self,
+        target_dir: Path,
+        *,
+        archive_name: str | None = None,
+        patterns: list[str] | None = None,
+        workers: int = 4,
+        verify: bool = True,
+    ) -> BackupRestoreSummary:
+        """Restores `archive_name` (default: newest) by applying its full + incremental chain.
+
+        Archives are streamed from WebDAV and checked against their `.sha256`
+        while being extracted; only paths matching `patterns` are written.
+        """
+        started_at = time.perf_counter()
+        if self.settings.FORMAT == BACKUP_FORMAT_CHUNKS:
+            return self._restore_snapshot(
+                target_dir, archive_name, started_at, patterns=patterns, workers=workers
+            )
+
+        extracted_files = 0
+        deleted_files = 0
+        with self._webdav_client() as webdav:
+            remote_names = {entry.name for entry in webdav.list_dir(self.settings.REMOTE_DIR)}
+            chain = plan_restore_chain(
+                sorted(remote_names),
+                filename_prefix=self.settings.FILENAME_PREFIX,
+                target_archive=archive_name,
+            )
+            self.logger.info("Restore chain: %s", [archive.name for archive in chain])
+
+            for archive in chain:
+                stream, expected_sha256 = self._open_archive(
+                    webdav, archive, remote_names, verify=verify
+                )
+                with stream:
+                    result = apply_archive(
+                        stream,
+                        archive.name,
+                        target_dir,
+                        patterns=patterns,
+                        expected_sha256=expected_sha256,
+                        workers=workers,
+                    )
+                extracted_files += result.extracted_files
+                deleted_files += result.deleted_files
+                self.logger.info(
+                    "Applied %s: extracted=%s deleted=%s",
+                    archive.name,
+                    result.extracted_files,
+                    result.deleted_files,
+                )
 
-def time_to_datetime(timezone: str):
-    from datetime import datetime
-    from zoneinfo import ZoneInfo
+        duration = time.perf_counter() - started_at
+        return BackupRestoreSummary(
+            target_dir=str(target_dir),
+            archives=[archive.name for archive in chain],
+            extracted_files=extracted_files,
+            deleted_files=deleted_files,
+            duration_seconds=duration,
+        )
 
-    return datetime.now(ZoneInfo(timezone))
+    def _latest_snapshot_name(self, store: ChunkStore) -> str:
+        snapshots = store.list_snapshots(self.settings.FILENAME_PREFIX)
+        if not snapshots:
+            raise RestoreChainError("No backup snapshots found")
+        return snapshots[-1].name
+
+    def _restore_snapshot(
+        self,
+        target_dir: Path,
+        snapshot_name: str | None,
+        started_at: float,
+        *,
+        patterns: list[str] | None,
+        workers: int,
+    ) -> BackupRestoreSummary:
+        with self._webdav_client() as webdav:
+            store = self._chunk_store(webdav)
+            store.load_config()
+            snapshot_name = snapshot_name or self._latest_snapshot_name(store)
+            snapshot = store.load_snapshot(snapshot_name)
+            extracted_files = store.restore(
+                snapshot, target_dir, patterns=patterns, workers=workers
+            )
+            self.logger.info("Restored %s: %s files", snapshot_name, extracted_files)
+
+        duration = time.perf_counter() - started_at
+        return BackupRestoreSummary(
+            target_dir=str(target_dir),
+            archives=[snapshot_name],
+            extracted_files=extracted_files,
+            deleted_files=0,
+            duration_seconds=duration,
+        )
+
+    def list_backups(self) -> list[BackupListing]:
+        """Archives (or snapshots) on WebDAV, oldest first."""
+        with self._webdav_client() as webdav:
+            if self.settings.FORMAT == BACKUP_FORMAT_CHUNKS:
+                store = self._chunk_store(webdav)
+                return [
+                    BackupListing(
+                        name=snapshot.name,
+                        backup_type=snapshot.backup_type,
+                        created_at=snapshot.timestamp,
+                        size=None,
+                    )
+                    for snapshot in store.list_snapshots(self.settings.FILENAME_PREFIX)
+                ]
+
+            entries = webdav.list_dir(self.settings.REMOTE_DIR)
+            names = {entry.name for entry in entries}
+            listings = [
+                BackupListing(
+                    name=archive.name,
+                    backup_type=archive.backup_type,
+                    created_at=archive.timestamp,
+                    size=entry.size,
+                    segmented=archive.segmented,
+                    has_checksum=f"{archive.name}.sha256" in names,
+                )
+                for entry in entries
+                if (archive := parse_archive_name(entry.name, self.settings.FILENAME_PREFIX))
+            ]
+        return sorted(listings, key=lambda listing: listing.created_at)
+
+    def list_files(
+        self, *, archive_name: str | None = None, patterns: list[str] | None = None
+    ) -> tuple[str, list[FileIndexEntry]]:
+        """Files of the backed-up tree as of `archive_name` (default: newest)."""
+        with self._webdav_client() as webdav:
+            if self.settings.FORMAT == BACKUP_FORMAT_CHUNKS:
+                store = self._chunk_store(webdav)
+                archive_name = archive_name or self._latest_snapshot_name(store)
+                entries = [
+                    FileIndexEntry(
+                        path=item.path, size=item.size, mtime_ns=item.mtime_ns, inode=item.inode
+                    )
+                    for item in store.load_snapshot(archive_name).files
+                ]
+            else:
+                remote_names = {entry.name for entry in webdav.list_dir(self.settings.REMOTE_DIR)}
+                archive = plan_restore_chain(
+                    sorted(remote_names),
+                    filename_prefix=self.settings.FILENAME_PREFIX,
+                    target_archive=archive_name,
+                )[-1]
+                archive_name = archive.name
+                stream, _ = self._open_archive(webdav, archive, remote_names, verify=False)
+                with stream:
+                    entries = read_archive_listing(stream, archive.name)
+
+        selected = [entry for entry in entries if path_matches(entry.path, patterns)]
+        return archive_name, sorted(selected, key=lambda entry: entry.path)
@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import logging
+import os
+import shutil
+import subprocess
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from typing import BinaryIO
+
+import httpx
+
+
+logger = logging.getLogger("app.backup")
+
+_IONICE_CLASSES = {"best-effort": "2", "idle": "3"}
+_FIRST_PAUSE_SECONDS = 1.0
+_MAX_PAUSE_STEP_SECONDS = 30.0
+
+
+class TokenBucket:
+    """Thread-safe byte-rate limit shared by every reader (or uploader) of a run.
+
+    A caller takes its bytes right away and sleeps off the debt, so one large
+    request is spread over the following second(s) instead of being refused.
+    """
+
+    def __init__(self, rate: int) -> None:
+        self._rate = float(rate)
+        self._tokens = float(rate)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, amount: int) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self._rate, self._tokens + (now - self._updated_at) * self._rate)
+            self._updated_at = now
+            self._tokens -= amount
+            delay = -self._tokens / self._rate if self._tokens < 0 else 0.0
+        if delay:
+            time.sleep(delay)
+
+
+class LoadGuard:
+    """Pauses the backup while the host is busy.
+
+    Busy means load average per CPU above `max_load_per_cpu` or the probe URL
+    answering slower than `probe_max_ms` (a timeout counts as slow). Pauses
+    grow from 1 s to 30 s and stop after `max_pause_seconds` per run, so a
+    permanently loaded host still gets its backup.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_load_per_cpu: float | None,
+        probe_url: str | None,
+        probe_max_ms: int,
+        check_interval_seconds: float,
+        max_pause_seconds: float,
+    ) -> None:
+        self._max_load_per_cpu = max_load_per_cpu
+        self._probe_url = probe_url
+        self._probe_max_ms = probe_max_ms
+        self._check_interval = check_interval_seconds
+        self._pause_budget = max_pause_seconds
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self._probe_failed = False
+        self.paused_seconds = 0.0
+
+    def _busy_reason(self) -> str | None:
+        if self._max_load_per_cpu is not None:
+            load_per_cpu = os.getloadavg()[0] / (os.cpu_count() or 1)
+            if load_per_cpu > self._max_load_per_cpu:
+                return f"load average {load_per_cpu:.2f} per CPU"
+
+        if self._probe_url:
+            started_at = time.perf_counter()
+            try:
+                httpx.get(self._probe_url, timeout=self._probe_max_ms / 1000)
+            except httpx.TimeoutException:
+                return f"latency probe timed out after {self._probe_max_ms} ms"
+            except httpx.HTTPError as exc:
+                # a broken probe must not stall backups forever
+                if not self._probe_failed:
+                    logger.warning("Latency probe %s failed: %s", self._probe_url, exc)
+                    self._probe_failed = True
+                return None
+            latency_ms = (time.perf_counter() - started_at) * 1000
+            if latency_ms > self._probe_max_ms:
+                return f"latency probe {latency_ms:.0f} ms"
+        return None
+
+    def wait(self) -> None:
+        if time.monotonic() < self._next_check:
+            return
+        # every thread calling wait() blocks on the lock while one of them pauses
+        with self._lock:
+            if time.monotonic() < self._next_check:
+                return
+            pause = _FIRST_PAUSE_SECONDS
+            while self._pause_budget > 0 and (reason := self._busy_reason()):
+                step = min(pause, self._pause_budget)
+                logger.info("Backup paused for %.0f s: %s", step, reason)
+                time.sleep(step)
+                self.paused_seconds += step
+                self._pause_budget -= step
+                if self._pause_budget <= 0:
+                    logger.warning("Backup pause budget is used up, continuing at full speed")
+                pause = min(pause * 2, _MAX_PAUSE_STEP_SECONDS)
+            self._next_check = time.monotonic() + self._check_interval
+
+
+class Throttle:
+    """Bandwidth caps and load backoff for one backup run, plus its byte counters."""
+
+    def __init__(
+        self,
+        *,
+        read_bytes_per_second: int | None = None,
+        upload_bytes_per_second: int | None = None,
+        guard: LoadGuard | None = None,
+    ) -> None:
+        self._read_bucket = TokenBucket(read_bytes_per_second) if read_bytes_per_second else None
+        self._upload_bucket = (
+            TokenBucket(upload_bytes_per_second) if upload_bytes_per_second else None
+        )
+        self._guard = guard
+        self._lock = threading.Lock()
+        self.read_bytes = 0
+        self.uploaded_bytes = 0
+
+    @property
+    def paused_seconds(self) -> float:
+        return self._guard.paused_seconds if self._guard is not None else 0.0
+
+    def _account(self, bucket: TokenBucket | None, amount: int, *, upload: bool) -> None:
+        if bucket is not None:
+            bucket.consume(amount)
+        with self._lock:
+            if upload:
+                self.uploaded_bytes += amount
+            else:
+                self.read_bytes += amount
+        if self._guard is not None:
+            self._guard.wait()
+
+    def on_read(self, amount: int) -> None:
+        self._account(self._read_bucket, amount, upload=False)
+
+    def on_upload(self, amount: int) -> None:
+        self._account(self._upload_bucket, amount, upload=True)
+
+    def reader(self, stream: BinaryIO) -> ThrottledReader:
+        return ThrottledReader(stream, self)
+
+    def upload_chunks(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        for chunk in chunks:
+            self.on_upload(len(chunk))
+            yield chunk
+
+
+class ThrottledReader:
+    """Read-only file wrapper that charges every read to the run's read cap."""
+
+    def __init__(self, stream: BinaryIO, throttle: Throttle) -> None:
+        self._stream = stream
+        self._throttle = throttle
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._stream.read(size)
+        if data:
+            self._throttle.on_read(len(data))
+        return data
+
+
+def apply_process_priority(*, nice: int, ionice_class: str, ionice_level: int) -> None:
+    """Lowers CPU and disk priority of the calling thread and the threads it starts.
+
+    Linux keeps both priorities per thread and new threads inherit them, so
+    this is called before the run starts its compression and upload threads.
+    An unprivileged process can only lower its priority: the setting sticks
+    for the rest of the (dedicated) backup worker process.
+    """
+    if nice > 0:
+        current = os.getpriority(os.PRIO_PROCESS, 0)
+        if nice > current:
+            os.setpriority(os.PRIO_PROCESS, 0, nice)
+
+    ionice_class_id = _IONICE_CLASSES.get(ionice_class)
+    if ionice_class_id is None:
+        return
+    ionice = shutil.which("ionice")
+    if ionice is None:
+        logger.warning("ionice is not installed, BACKUP_IONICE_CLASS is ignored")
+        return
+    command = [ionice, "-c", ionice_class_id, "-p", str(threading.get_native_id())]
+    if ionice_class == "best-effort":
+        command[3:3] = ["-n", str(ionice_level)]
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode != 0:
+        logger.warning("ionice failed: %s", completed.stderr.strip())
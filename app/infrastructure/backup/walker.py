@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import logging
+import os
+from collections.abc import Iterator
+from dataclasses import dataclass
+from pathlib import Path
+
+from app.infrastructure.backup.ignore_matcher import IgnoreMatcher
+
+
+logger = logging.getLogger("app.backup")
+
+
+@dataclass(slots=True, frozen=True)
+class WalkedFile:
+    """A file picked for backup together with the one stat() taken for it.
+
+    The same stat_result feeds the file index, the manifest totals and the
+    tar header, so a file is stat'ed once per run.
+    """
+
+    path: Path
+    relative: str
+    stat: os.stat_result
+
+
+def walk_include_root(
+    include_root: Path,
+    *,
+    project_root: Path,
+    ignore_matcher: IgnoreMatcher,
+    follow_symlinks: bool,
+) -> Iterator[WalkedFile]:
+    """os.scandir walk that skips ignored directories without descending into them.
+
+    Symlinked directories are never descended into (same as Path.rglob);
+    symlinked files are included only with `follow_symlinks` and are stored
+    under their resolved path, which must stay inside the project root.
+    """
+    prune = ignore_matcher.can_prune_directories
+    stack = [(include_root, include_root.relative_to(project_root).as_posix())]
+
+    while stack:
+        directory, relative_dir = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                children = sorted(entries, key=lambda entry: entry.name)
+        except OSError as exc:
+            logger.warning("Cannot scan %s: %s", directory, exc)
+            continue
+
+        subdirectories = []
+        for entry in children:
+            relative = f"{relative_dir}/{entry.name}"
+            is_symlink = entry.is_symlink()
+
+            if entry.is_dir(follow_symlinks=False):
+                if prune and ignore_matcher.is_dir_ignored(relative):
+                    continue
+                subdirectories.append((Path(entry.path), relative))
+                continue
+
+            if is_symlink:
+                if not follow_symlinks or not entry.is_file(follow_symlinks=True):
+                    continue
+                resolved = Path(entry.path).resolve()
+                try:
+                    resolved_relative = resolved.relative_to(project_root).as_posix()
+                except ValueError:
+                    logger.warning("Skip symlink pointing outside the project: %s", relative)
+                    continue
+                if ignore_matcher.is_ignored_path(relative) or ignore_matcher.is_ignored_path(
+                    resolved_relative
+                ):
+                    continue
+                yield WalkedFile(path=resolved, relative=resolved_relative, stat=resolved.stat())
+                continue
+
+            if not entry.is_file(follow_symlinks=False):
+                continue
+            if ignore_matcher.is_ignored_path(relative):
+                continue
+            yield WalkedFile(
+                path=Path(entry.path),
+                relative=relative,
+                stat=entry.stat(follow_symlinks=False),
+            )
+
+        # reversed: pop() then visits subdirectories in name order
+        stack.extend(reversed(subdirectories))
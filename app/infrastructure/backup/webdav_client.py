@@ -1,14 +1,21 @@
 from __future__ import annotations
 
+import io
 import logging
+import os
 import urllib.parse
 import xml.etree.ElementTree as ET
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime
 from email.utils import parsedate_to_datetime
+from typing import BinaryIO
 
 import httpx
 
+from app.infrastructure.backup.throttle import Throttle
+
 
 logger = logging.getLogger("app.backup")
 
@@ -20,6 +27,114 @@ class RemoteEntry:
     is_dir: bool
     size: int | None = None
     modified_at: datetime | None = None
+    etag: str | None = None
+
+    def as_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "path": self.path,
+            "is_dir": self.is_dir,
+            "size": self.size,
+            "modified_at": self.modified_at.isoformat() if self.modified_at else None,
+            "etag": self.etag,
+        }
+
+    @classmethod
+    def from_dict(cls, payload: dict) -> "RemoteEntry":
+        modified_at = payload.get("modified_at")
+        return cls(
+            name=payload["name"],
+            path=payload["path"],
+            is_dir=payload["is_dir"],
+            size=payload.get("size"),
+            modified_at=datetime.fromisoformat(modified_at) if modified_at else None,
+            etag=payload.get("etag"),
+        )
+
+
+_PROPFIND_BODY = """<?xml version=\"1.0\" encoding=\"utf-8\" ?>
+<d:propfind xmlns:d=\"DAV:\">
+  <d:prop>
+    <d:resourcetype />
+    <d:getcontentlength />
+    <d:getlastmodified />
+    <d:getetag />
+  </d:prop>
+</d:propfind>"""
+
+
+class RangeReader(io.RawIOBase):
+    """Sequential reader over a streamed GET.
+
+    A dropped connection is resumed with `Range: bytes=<offset>-` instead of
+    restarting the download; `retries` bounds consecutive failed attempts.
+    """
+
+    def __init__(self, client: httpx.Client, url: str, *, retries: int) -> None:
+        super().__init__()
+        self._client = client
+        self._url = url
+        self._retries = retries
+        self._offset = 0
+        self._response: httpx.Response | None = None
+        self._chunks: Iterator[bytes] | None = None
+        self._pending = memoryview(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def _open(self) -> None:
+        # identity: Range offsets must refer to the bytes we actually read
+        headers = {"Accept-Encoding": "identity"}
+        if self._offset:
+            headers["Range"] = f"bytes={self._offset}-"
+        request = self._client.build_request("GET", self._url, headers=headers)
+        response = self._client.send(request, stream=True)
+        if response.status_code >= 400:
+            response.close()
+            response.raise_for_status()
+        if self._offset and response.status_code != 206:
+            response.close()
+            raise OSError(f"Server ignored Range, cannot resume {self._url}")
+        self._response = response
+        self._chunks = response.iter_bytes(1024 * 1024)
+
+    def _close_response(self) -> None:
+        if self._response is not None:
+            self._response.close()
+        self._response = None
+        self._chunks = None
+
+    def readinto(self, buffer) -> int:
+        failures = 0
+        while not self._pending:
+            try:
+                if self._chunks is None:
+                    self._open()
+                self._pending = memoryview(next(self._chunks))
+            except StopIteration:
+                return 0
+            except httpx.TransportError as exc:
+                self._close_response()
+                failures += 1
+                if failures > self._retries:
+                    raise
+                logger.warning(
+                    "Download of %s interrupted at %s bytes (%s), resuming",
+                    self._url,
+                    self._offset,
+                    exc,
+                )
+
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        self._offset += size
+        return size
+
+    def close(self) -> None:
+        self._close_response()
+        super().close()
 
 
 class WebDavClient:
@@ -31,12 +146,27 @@ class WebDavClient:
         password: str,
         timeout_seconds: int,
         verify_tls: bool,
+        max_connections: int | None = None,
+        throttle: Throttle | None = None,
+        transport: httpx.BaseTransport | None = None,
     ) -> None:
         self.base_url = base_url.rstrip("/")
+        # every uploaded byte is charged to the run's upload cap and counters
+        self._throttle = throttle
+        # collections known to exist: ensure_remote_dir() sends no MKCOL for them
+        self._known_dirs: set[str] = set()
+        # httpx.Client is thread-safe; the pool is sized for parallel segment uploads
+        limits = (
+            httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+            if max_connections
+            else httpx.Limits(max_connections=100, max_keepalive_connections=20)
+        )
         self._client = httpx.Client(
             auth=(username, password),
             timeout=timeout_seconds,
             verify=verify_tls,
+            limits=limits,
+            transport=transport,
         )
 
     def close(self) -> None:
@@ -64,10 +194,21 @@ class WebDavClient:
             response.raise_for_status()
         return True
 
+    def mark_dir_known(self, remote_dir: str) -> None:
+        """Records an existing collection; its parents exist as well."""
+        current = ""
+        for chunk in self._normalize_remote_path(remote_dir).strip("/").split("/"):
+            current = f"{current}/{chunk}" if current else f"/{chunk}"
+            self._known_dirs.add(current)
+
     def ensure_remote_dir(self, remote_dir: str) -> None:
+        if self._normalize_remote_path(remote_dir).rstrip("/") in self._known_dirs:
+            return
         current = ""
         for chunk in self._normalize_remote_path(remote_dir).strip("/").split("/"):
             current = f"{current}/{chunk}" if current else f"/{chunk}"
+            if current in self._known_dirs:
+                continue
             response = self._client.request("MKCOL", self._build_url(current))
             if response.status_code in (201, 405):
                 continue
@@ -75,8 +216,18 @@ class WebDavClient:
                 # parent path is missing due to server specifics; continue loop
                 continue
             response.raise_for_status()
+        self.mark_dir_known(remote_dir)
+
+    def _body(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        if self._throttle is None:
+            return iter(chunks)
+        return self._throttle.upload_chunks(chunks)
 
     def upload_file(self, local_path, remote_path: str) -> None:
+        if self._throttle is not None:
+            size = os.path.getsize(local_path)
+            self.upload_range(local_path, offset=0, size=size, remote_path=remote_path)
+            return
         with open(local_path, "rb") as file_stream:
             response = self._client.put(
                 self._build_url(remote_path),
@@ -86,33 +237,120 @@ class WebDavClient:
         if response.status_code >= 400:
             response.raise_for_status()
 
+    def upload_stream(self, chunks: Iterable[bytes], remote_path: str) -> None:
+        """PUT with a generator body (chunked transfer encoding): nothing is buffered locally."""
+        response = self._client.put(
+            self._build_url(remote_path),
+            content=self._body(chunks),
+            headers={"Content-Type": "application/octet-stream"},
+        )
+        if response.status_code >= 400:
+            response.raise_for_status()
+
+    def upload_bytes(self, payload: bytes, remote_path: str) -> None:
+        if self._throttle is not None:
+            self._throttle.on_upload(len(payload))
+        response = self._client.put(
+            self._build_url(remote_path),
+            content=payload,
+            headers={"Content-Type": "application/octet-stream"},
+        )
+        if response.status_code >= 400:
+            response.raise_for_status()
+
+    def upload_range(self, local_path, *, offset: int, size: int, remote_path: str) -> None:
+        """PUT of `size` bytes from `offset`; Content-Length keeps it a plain (non-chunked) PUT."""
+
+        def body():
+            with open(local_path, "rb") as file_stream:
+                file_stream.seek(offset)
+                remaining = size
+                while remaining:
+                    chunk = file_stream.read(min(1024 * 1024, remaining))
+                    if not chunk:
+                        raise OSError(f"{local_path} is shorter than expected")
+                    remaining -= len(chunk)
+                    yield chunk
+
+        response = self._client.put(
+            self._build_url(remote_path),
+            content=self._body(body()),
+            headers={"Content-Type": "application/octet-stream", "Content-Length": str(size)},
+        )
+        if response.status_code >= 400:
+            response.raise_for_status()
+
+    def download_bytes(self, remote_path: str) -> bytes:
+        response = self._client.get(self._build_url(remote_path))
+        if response.status_code >= 400:
+            response.raise_for_status()
+        return response.content
+
+    def open_reader(self, remote_path: str, *, retries: int = 3) -> BinaryIO:
+        """Streaming, Range-resumable reader; nothing is written to disk."""
+        raw = RangeReader(self._client, self._build_url(remote_path), retries=retries)
+        return io.BufferedReader(raw, buffer_size=1024 * 1024)
+
     def delete_file(self, remote_path: str) -> None:
         response = self._client.delete(self._build_url(remote_path))
-        if response.status_code in (200, 204, 404):
+        if response.status_code not in (200, 204, 404):
+            response.raise_for_status()
+        # a deleted collection (e.g. "<archive>.parts") takes its subtree with it;
+        # known subdirectories imply a known parent, so plain files skip the scan
+        normalized = self._normalize_remote_path(remote_path).rstrip("/")
+        if normalized in self._known_dirs:
+            self._known_dirs -= {
+                known
+                for known in list(self._known_dirs)
+                if known == normalized or known.startswith(f"{normalized}/")
+            }
+
+    def delete_many(self, remote_paths: list[str], *, parallelism: int) -> None:
+        """DELETEs over the shared connection pool, at most `parallelism` at a time."""
+        workers = min(parallelism, len(remote_paths))
+        if workers <= 1:
+            for remote_path in remote_paths:
+                self.delete_file(remote_path)
             return
-        response.raise_for_status()
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="backup-delete") as pool:
+            # consuming the results re-raises the first failed DELETE
+            for _ in pool.map(self.delete_file, remote_paths):
+                pass
 
-    def list_dir(self, remote_dir: str) -> list[RemoteEntry]:
-        body = """<?xml version=\"1.0\" encoding=\"utf-8\" ?>
-<d:propfind xmlns:d=\"DAV:\">
-  <d:prop>
-    <d:resourcetype />
-    <d:getcontentlength />
-    <d:getlastmodified />
-  </d:prop>
-</d:propfind>"""
-        response = self._client.request(
+    def _propfind(self, remote_path: str, depth: str) -> httpx.Response:
+        return self._client.request(
             "PROPFIND",
-            self._build_url(remote_dir),
-            headers={"Depth": "1", "Content-Type": "application/xml"},
-            content=body,
+            self._build_url(remote_path),
+            headers={"Depth": depth, "Content-Type": "application/xml"},
+            content=_PROPFIND_BODY,
         )
+
+    def stat_dir(self, remote_dir: str) -> RemoteEntry | None:
+        """Depth: 0 PROPFIND of the collection itself (ETag, getlastmodified); None if missing."""
+        response = self._propfind(remote_dir, "0")
+        if response.status_code == 404:
+            return None
+        if response.status_code >= 400:
+            response.raise_for_status()
+
+        self.mark_dir_known(remote_dir)
+        for entry in self._parse_propfind_response(response.text, remote_dir, include_self=True):
+            if entry.is_dir:
+                return entry
+        normalized = self._normalize_remote_path(remote_dir).rstrip("/")
+        return RemoteEntry(name=normalized.split("/")[-1], path=normalized, is_dir=True)
+
+    def list_dir(self, remote_dir: str) -> list[RemoteEntry]:
+        response = self._propfind(remote_dir, "1")
         if response.status_code >= 400:
             response.raise_for_status()
 
+        self.mark_dir_known(remote_dir)
         return self._parse_propfind_response(response.text, remote_dir)
 
-    def _parse_propfind_response(self, body: str, remote_dir: str) -> list[RemoteEntry]:
+    def _parse_propfind_response(
+        self, body: str, remote_dir: str, *, include_self: bool = False
+    ) -> list[RemoteEntry]:
         namespace = {"d": "DAV:"}
         root = ET.fromstring(body)
         entries: list[RemoteEntry] = []
@@ -124,7 +362,7 @@ class WebDavClient:
                 continue
 
             unquoted = urllib.parse.unquote(urllib.parse.urlparse(href).path).rstrip("/")
-            if unquoted == normalized_remote_dir:
+            if (unquoted == normalized_remote_dir) != include_self:
                 continue
 
             name = unquoted.split("/")[-1]
@@ -135,6 +373,7 @@ class WebDavClient:
             is_dir = prop.find("d:resourcetype/d:collection", namespace) is not None
             size_text = prop.findtext("d:getcontentlength", default=None, namespaces=namespace)
             modified_text = prop.findtext("d:getlastmodified", default=None, namespaces=namespace)
+            etag = prop.findtext("d:getetag", default=None, namespaces=namespace)
             modified_at = None
             if modified_text:
                 try:
@@ -149,6 +388,7 @@ class WebDavClient:
                     is_dir=is_dir,
                     size=int(size_text) if size_text and size_text.isdigit() else None,
                     modified_at=modified_at,
+                    etag=etag or None,
                 )
             )
 
@@ -0,0 +1,99 @@
+"""Debounce фоновых задач через Redis.
+
+Админка запускает пересборку после каждого create/edit/delete, и сессия
+массового редактирования ставит в очередь десятки одинаковых задач.
+Debouncer склеивает их: N правок подряд дают одну пересборку.
+
+Ключи в Redis (key — префикс из настроек):
+    <key>:dirty_since  — момент первой ещё не собранной правки (SET NX);
+    <key>:last_change  — момент последней правки;
+    <key>:scheduled    — флаг «отложенная задача уже в очереди» (SET NX EX);
+    <key>:version      — счётчик правок (INCR): по нему потребитель
+                         понимает, что собранный результат устарел.
+
+Схема:
+  1. touch() на каждую правку обновляет метки и возвращает countdown,
+     только если задача ещё не запланирована — её ставит вызывающий код.
+  2. Задача при срабатывании спрашивает due_in(): если с последней правки
+     не прошло quiet_seconds (и не истёк max_delay_seconds с первой),
+     она перепланирует себя на остаток и выходит.
+  3. Перед пересборкой задача вызывает claim(): метки удаляются, и правка,
+     пришедшая во время пересборки, запланирует следующую.
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+
+from redis import Redis
+
+
+@lru_cache(maxsize=4)
+def _redis(url: str) -> Redis:
+    return Redis.from_url(url, decode_responses=True)
+
+
+@dataclass(frozen=True, slots=True)
+class Debouncer:
+    redis_url: str
+    key: str
+    quiet_seconds: float
+    max_delay_seconds: float
+
+    @property
+    def _dirty_since(self) -> str:
+        return f"{self.key}:dirty_since"
+
+    @property
+    def _last_change(self) -> str:
+        return f"{self.key}:last_change"
+
+    @property
+    def _scheduled(self) -> str:
+        return f"{self.key}:scheduled"
+
+    @property
+    def _version(self) -> str:
+        return f"{self.key}:version"
+
+    @property
+    def _scheduled_ttl(self) -> int:
+        # Флаг переживает самое долгое ожидание с запасом; если задача
+        # потерялась, следующая правка после истечения TTL запланирует новую
+        return int(self.quiet_seconds + self.max_delay_seconds) + 60
+
+    def touch(self) -> float | None:
+        """Отмечает правку. Возвращает countdown, если задачу нужно поставить."""
+        now = time.time()
+        pipe = _redis(self.redis_url).pipeline()
+        pipe.set(self._dirty_since, now, nx=True)
+        pipe.set(self._last_change, now)
+        pipe.set(self._scheduled, now, nx=True, ex=self._scheduled_ttl)
+        pipe.incr(self._version)
+        _, _, scheduled, _ = pipe.execute()
+        return self.quiet_seconds if scheduled else None
+
+    def due_in(self) -> float | None:
+        """Сколько ещё ждать: None — правок нет, 0 — пора пересобирать."""
+        client = _redis(self.redis_url)
+        dirty_since, last_change = client.mget(self._dirty_since, self._last_change)
+        if dirty_since is None:
+            return None
+
+        now = time.time()
+        quiet_left = float(last_change or dirty_since) + self.quiet_seconds - now
+        cap_left = float(dirty_since) + self.max_delay_seconds - now
+        left = max(0.0, min(quiet_left, cap_left))
+        if left:
+            client.expire(self._scheduled, self._scheduled_ttl)
+        return left
+
+    def version(self) -> int:
+        """Номер последней правки (0 — правок ещё не было)."""
+        return int(_redis(self.redis_url).get(self._version) or 0)
+
+    def claim(self) -> None:
+        """Сбрасывает метки перед пересборкой."""
+        _redis(self.redis_url).delete(self._dirty_since, self._last_change, self._scheduled)
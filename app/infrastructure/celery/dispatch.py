@@ -0,0 +1,73 @@
+"""Постановка Celery-задач из async-кода без блокировки event loop.
+
+task.delay() — синхронный round-trip в Redis через kombu (а enqueue-хелперы
+из tasks.py ещё и ходят в Redis за ключами debounce/идемпотентности).
+В async-хуках админки это блокирует event loop на каждое сохранение,
+а при медленном или переподключающемся брокере — надолго.
+
+TaskDispatcher складывает вызовы в очередь и публикует их пачками в одном
+выделенном потоке:
+  - submit() возвращается сразу, брокер не ждёт;
+  - всё, что накопилось, пока поток занят предыдущей пачкой, уходит
+    следующей пачкой, а одинаковые вызовы схлопываются (массовое удаление
+    20 позиций даёт один schedule_pricelist_excel());
+  - очередь ограничена CELERY_DISPATCH_MAX_PENDING: при переполнении submit()
+    асинхронно ждёт текущую пачку (backpressure), не блокируя loop;
+  - ошибки публикации логируются — сохранение в админке от них не падает.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import Callable, Hashable
+from concurrent.futures import ThreadPoolExecutor
+
+from app.settings.config import settings
+
+
+logger = logging.getLogger("app.celery.dispatch")
+
+_Call = tuple[Callable[..., object], tuple[Hashable, ...]]
+
+
+def _publish_batch(batch: list[_Call]) -> None:
+    for fn, args in batch:
+        try:
+            fn(*args)
+        except Exception:
+            logger.exception("Task dispatch failed: %s%r", getattr(fn, "__name__", fn), args)
+
+
+class TaskDispatcher:
+    def __init__(self, *, max_pending: int) -> None:
+        self._max_pending = max_pending
+        # Один поток: пачки публикуются по очереди, пока он занят — копятся
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="task-dispatch")
+        # dict как упорядоченное множество: дубли схлопываются, порядок сохраняется
+        self._pending: dict[_Call, None] = {}
+        self._pump: asyncio.Task | None = None
+
+    async def submit(self, fn: Callable[..., object], *args: Hashable) -> None:
+        """Ставит вызов fn(*args) на публикацию; брокер не ждёт."""
+        call = (fn, args)
+        while len(self._pending) >= self._max_pending and call not in self._pending:
+            await self.drain()
+        self._pending[call] = None
+        if self._pump is None or self._pump.done():
+            self._pump = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while self._pending:
+            batch = list(self._pending)
+            self._pending.clear()
+            await loop.run_in_executor(self._executor, _publish_batch, batch)
+
+    async def drain(self) -> None:
+        """Дожидается публикации всего, что уже поставлено (shutdown, backpressure)."""
+        if self._pump is not None:
+            await asyncio.shield(self._pump)
+
+
+task_dispatcher = TaskDispatcher(max_pending=settings.celery.dispatch_max_pending)
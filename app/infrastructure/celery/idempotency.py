@@ -0,0 +1,90 @@
+"""Идемпотентность Celery-задач конвертации медиа.
+
+Ключ задачи — (имя задачи, id строки, путь исходника, отпечаток исходника).
+Отпечаток — размер и mtime файла в хранилище: тот же путь с другим
+содержимым даёт другой ключ.
+
+Ключи в Redis (prefix — CELERY_IDEMPOTENCY_KEY_PREFIX, TTL —
+CELERY_IDEMPOTENCY_TTL_SECONDS):
+    <prefix>:pending:<key> — задача в очереди или выполняется. Повторная
+                             постановка с тем же ключом схлопывается
+                             (админ трижды сохранил один слайд → одна задача).
+    <prefix>:done:<key>    — задача выполнена. При acks_late воркер, упавший
+                             после работы, но до ack, получит сообщение снова;
+                             повторная доставка видит done и выходит сразу.
+
+Новая постановка снимает done: если фото слайда поменяли A → B → A,
+третья задача выполнится, а не примет done от первой за свой результат.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+
+from celery.exceptions import Retry
+from redis import Redis
+
+
+@lru_cache(maxsize=4)
+def _redis(url: str) -> Redis:
+    return Redis.from_url(url, decode_responses=True)
+
+
+@dataclass(frozen=True, slots=True)
+class TaskKey:
+    task: str
+    row_id: int
+    source_path: str
+    fingerprint: str
+
+    def __str__(self) -> str:
+        # Путь хешируется: длина ключа не зависит от длины пути
+        path_hash = hashlib.sha1(self.source_path.encode()).hexdigest()[:16]
+        return f"{self.task}:{self.row_id}:{path_hash}:{self.fingerprint}"
+
+
+class TaskIdempotency:
+    def __init__(self, *, redis_url: str, prefix: str, ttl_seconds: int) -> None:
+        self._redis_url = redis_url
+        self._prefix = prefix
+        self._ttl_seconds = ttl_seconds
+
+    def _pending(self, key: TaskKey) -> str:
+        return f"{self._prefix}:pending:{key}"
+
+    def _done(self, key: TaskKey) -> str:
+        return f"{self._prefix}:done:{key}"
+
+    def claim(self, key: TaskKey) -> bool:
+        """Резервирует постановку задачи. False — такая же уже в очереди."""
+        client = _redis(self._redis_url)
+        if not client.set(self._pending(key), 1, nx=True, ex=self._ttl_seconds):
+            return False
+        client.delete(self._done(key))
+        return True
+
+    def is_done(self, key: TaskKey) -> bool:
+        return bool(_redis(self._redis_url).exists(self._done(key)))
+
+    @contextmanager
+    def running(self, key: TaskKey) -> Iterator[None]:
+        """Выполнение задачи: успех → done, окончательная ошибка → снять pending.
+
+        Retry (задача ещё будет перезапущена) оставляет pending на месте,
+        чтобы дубли не проскочили между попытками.
+        """
+        try:
+            yield
+        except Retry:
+            raise
+        except BaseException:
+            _redis(self._redis_url).delete(self._pending(key))
+            raise
+        pipe = _redis(self._redis_url).pipeline()
+        pipe.set(self._done(key), 1, ex=self._ttl_seconds)
+        pipe.delete(self._pending(key))
+        pipe.execute()
@@ -27,21 +27,108 @@ Django (оригинал, pricelist):
 """
 
 import logging
-import os
 import time
 
 import httpx
 from sqlalchemy import create_engine, update
 
 from app.infrastructure.backup.service import BackupLockNotAcquiredError, FilesBackupService
+from app.infrastructure.celery.debounce import Debouncer
+from app.infrastructure.celery.idempotency import TaskIdempotency, TaskKey
 from app.infrastructure.celery.worker import celery_app
-from app.infrastructure.media.image_processor import make_webp_sync
+from app.infrastructure.media.backends import get_media_storage
+from app.infrastructure.media.gc import collect_media_garbage
+from app.infrastructure.media.image_processor import (
+    Placeholder,
+    WebpResult,
+    convert_webp_sync,
+    make_placeholder_sync,
+)
+from app.infrastructure.media.storage import webp_relative_path
 from app.modules.home.infrastructure.sa_models import MainCarousel
-from app.modules.pricelist.application.excel_export import generate_pricelist_xlsx
+from app.modules.pricelist.application.export import rebuild_pricelist_exports
 from app.modules.pricelist.infrastructure.sa_models import Foto, Position
 from app.settings.config import settings
 
 
+logger = logging.getLogger("app.media")
+
+
+def _webp_values(result: WebpResult, quality_column: str, *url_columns: str) -> dict:
+    """Значения для UPDATE: URL WebP и, если файл перекодировался, его качество."""
+    values: dict = {column: result.url for column in url_columns}
+    if result.quality is not None:
+        values[quality_column] = result.quality
+    return values
+
+
+def _placeholder_values(placeholder: Placeholder, source_column: str) -> dict:
+    """Значения для UPDATE: размеры оригинала и LQIP (колонки <source>_width и т.д.)."""
+    return {
+        f"{source_column}_width": placeholder.width,
+        f"{source_column}_height": placeholder.height,
+        f"{source_column}_lqip": placeholder.lqip,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Идемпотентность задач конвертации (см. app.infrastructure.celery.idempotency)
+# ---------------------------------------------------------------------------
+
+media_task_guard = TaskIdempotency(
+    redis_url=settings.celery.broker_url,
+    prefix=settings.celery.idempotency_key_prefix,
+    ttl_seconds=settings.celery.idempotency_ttl_seconds,
+)
+
+
+def _source_fingerprint(source_path: str) -> str:
+    stat = get_media_storage().stat(source_path)
+    return "missing" if stat is None else f"{stat.size}-{stat.modified_at:.0f}"
+
+
+def _media_task_key(
+    task_name: str,
+    row_id: int,
+    source_path: str,
+    fingerprint: str | None = None,
+) -> TaskKey:
+    return TaskKey(
+        task=task_name,
+        row_id=row_id,
+        source_path=source_path,
+        fingerprint=fingerprint or _source_fingerprint(source_path),
+    )
+
+
+def _already_converted(key: TaskKey) -> bool:
+    """Повторная доставка выполненной задачи: done в Redis и WebP не старше исходника."""
+    if not media_task_guard.is_done(key):
+        return False
+    storage = get_media_storage()
+    source_stat = storage.stat(key.source_path)
+    webp_stat = storage.stat(webp_relative_path(key.source_path))
+    return (
+        source_stat is not None
+        and webp_stat is not None
+        and webp_stat.modified_at >= source_stat.modified_at
+    )
+
+
+def enqueue_media_task(task, row_id: int, source_path: str) -> bool:
+    """Ставит задачу конвертации фото; дубль уже стоящей в очереди схлопывается.
+
+    Вызывается из админки вместо task.delay(row_id, source_path).
+    Возвращает False, если такая же задача уже в очереди.
+    """
+    key = _media_task_key(task.name, row_id, source_path)
+    if not media_task_guard.claim(key):
+        logger.info("Duplicate %s for row %s skipped", task.name, row_id)
+        return False
+    task.apply_async(args=(row_id, source_path), kwargs={"fingerprint": key.fingerprint})
+    return True
+
+
 # ---------------------------------------------------------------------------
 # Home module: slide_to_webp
 # ---------------------------------------------------------------------------
@@ -53,13 +140,18 @@ from app.settings.config import settings
     max_retries=3,
     default_retry_delay=10,
 )
-def slide_to_webp(self, slide_id: int, photo_relative_path: str) -> None:
+def slide_to_webp(
+    self,
+    slide_id: int,
+    photo_relative_path: str,
+    fingerprint: str | None = None,
+) -> None:
     """Конвертирует фото слайда в WebP и обновляет запись в БД.
 
     Аналог Django slide_to_webp(pk):
       1. Ждём 1.5 с, пока файл гарантированно записан на диск.
       2. Конвертируем JPEG → WebP через Pillow.
-      3. Обновляем MainCarousel.photo_webp в PostgreSQL.
+      3. Обновляем MainCarousel.photo_webp (+ размеры и LQIP) в PostgreSQL.
 
     Аргументы:
         slide_id            — id записи в таблице maincarousel.
@@ -68,36 +160,44 @@ def slide_to_webp(self, slide_id: int, photo_relative_path: str) -> None:
     Записывает в photo_webp URL вида '/media/media/abc.webp'
     (совместимо с legacy Django-схемой).
     """
-    # 1. Ждём, пока файл точно попал на диск (как в Django-задаче: time.sleep(1.5))
-    time.sleep(1.5)
-
-    # 2. Проверяем наличие файла
-    from app.infrastructure.media.storage import abs_path
-    src_abs = abs_path(photo_relative_path)
-    if not os.path.isfile(src_abs):
-        # Если файл не появился — повторяем задачу (до max_retries раз)
-        raise self.retry(
-            exc=FileNotFoundError(f"Source photo not found: {src_abs}"),
-            countdown=5,
-        )
-
-    # 3. Конвертируем в WebP
-    try:
-        webp_url = make_webp_sync(photo_relative_path)
-    except Exception as exc:
-        raise self.retry(exc=exc, countdown=10)
+    key = _media_task_key(self.name, slide_id, photo_relative_path, fingerprint)
+    if _already_converted(key):
+        return  # повторная доставка (acks_late) уже выполненной задачи
 
-    # 4. Обновляем photo_webp в БД через синхронный SQLAlchemy (в Celery-воркере нет event loop)
-    engine = create_engine(settings.database.sync_dsn, pool_pre_ping=True)
-    try:
-        with engine.begin() as conn:
-            conn.execute(
-                update(MainCarousel)
-                .where(MainCarousel.id == slide_id)
-                .values(photo_webp=webp_url)
+    with media_task_guard.running(key):
+        # 1. Ждём, пока файл точно попал на диск (как в Django-задаче: time.sleep(1.5))
+        time.sleep(1.5)
+
+        # 2. Проверяем наличие файла
+        if not get_media_storage().exists(photo_relative_path):
+            # Если файл не появился — повторяем задачу (до max_retries раз)
+            raise self.retry(
+                exc=FileNotFoundError(f"Source photo not found: {photo_relative_path}"),
+                countdown=5,
             )
-    finally:
-        engine.dispose()
+
+        # 3. Конвертируем в WebP (качество фиксированное или подобранное по SSIM)
+        #    и строим LQIP-плейсхолдер с исходными размерами для шаблонов
+        try:
+            webp = convert_webp_sync(photo_relative_path)
+            placeholder = make_placeholder_sync(photo_relative_path)
+        except Exception as exc:
+            raise self.retry(exc=exc, countdown=10)
+
+        # 4. Обновляем photo_webp в БД через синхронный SQLAlchemy (в Celery-воркере нет event loop)
+        engine = create_engine(settings.database.sync_dsn, pool_pre_ping=True)
+        try:
+            with engine.begin() as conn:
+                conn.execute(
+                    update(MainCarousel)
+                    .where(MainCarousel.id == slide_id)
+                    .values(
+                        **_webp_values(webp, "photo_webp_quality", "photo_webp"),
+                        **_placeholder_values(placeholder, "photo"),
+                    )
+                )
+        finally:
+            engine.dispose()
 
 
 # ---------------------------------------------------------------------------
@@ -111,13 +211,18 @@ def slide_to_webp(self, slide_id: int, photo_relative_path: str) -> None:
     max_retries=3,
     default_retry_delay=10,
 )
-def position_photo_to_webp(self, position_id: int, photo_relative_path: str) -> None:
+def position_photo_to_webp(
+    self,
+    position_id: int,
+    photo_relative_path: str,
+    fingerprint: str | None = None,
+) -> None:
     """Конвертирует фото позиции (photo2) в WebP и обновляет запись в БД.
 
     Аналог Django pos_webp(pk) из pricelist/models.py:
       1. Ждём 1.5 с, пока файл гарантированно записан на диск.
       2. Конвертируем JPEG → WebP через Pillow.
-      3. Обновляем Position.photo2_webp и Position.avatar_webp в PostgreSQL.
+      3. Обновляем Position.photo2_webp, avatar_webp, размеры и LQIP в PostgreSQL.
 
     В оригинале Django генерировал avatar (370×260) через ImageSpecField,
     а потом конвертировал и его в WebP. Здесь avatar_webp пока получает
@@ -127,36 +232,40 @@ def position_photo_to_webp(self, position_id: int, photo_relative_path: str) ->
         position_id         — id записи в таблице position.
         photo_relative_path — значение поля photo2 (напр. 'media/abc.jpg').
     """
-    time.sleep(1.5)
+    key = _media_task_key(self.name, position_id, photo_relative_path, fingerprint)
+    if _already_converted(key):
+        return  # повторная доставка (acks_late) уже выполненной задачи
 
-    from app.infrastructure.media.storage import abs_path
-    src_abs = abs_path(photo_relative_path)
-    if not os.path.isfile(src_abs):
-        raise self.retry(
-            exc=FileNotFoundError(f"Source photo not found: {src_abs}"),
-            countdown=5,
-        )
+    with media_task_guard.running(key):
+        time.sleep(1.5)
 
-    try:
-        webp_url = make_webp_sync(photo_relative_path)
-    except Exception as exc:
-        raise self.retry(exc=exc, countdown=10)
+        if not get_media_storage().exists(photo_relative_path):
+            raise self.retry(
+                exc=FileNotFoundError(f"Source photo not found: {photo_relative_path}"),
+                countdown=5,
+            )
 
-    # В Django avatar_webp генерировался из ImageSpecField (370×260).
-    # Пока записываем тот же WebP — можно добавить отдельный ресайз позже.
-    engine = create_engine(settings.database.sync_dsn, pool_pre_ping=True)
-    try:
-        with engine.begin() as conn:
-            conn.execute(
-                update(Position)
-                .where(Position.id == position_id)
-                .values(
-                    photo2_webp=webp_url,
-                    avatar_webp=webp_url,
+        try:
+            webp = convert_webp_sync(photo_relative_path)
+            placeholder = make_placeholder_sync(photo_relative_path)
+        except Exception as exc:
+            raise self.retry(exc=exc, countdown=10)
+
+        # В Django avatar_webp генерировался из ImageSpecField (370×260).
+        # Пока записываем тот же WebP — можно добавить отдельный ресайз позже.
+        engine = create_engine(settings.database.sync_dsn, pool_pre_ping=True)
+        try:
+            with engine.begin() as conn:
+                conn.execute(
+                    update(Position)
+                    .where(Position.id == position_id)
+                    .values(
+                        **_webp_values(webp, "photo2_webp_quality", "photo2_webp", "avatar_webp"),
+                        **_placeholder_values(placeholder, "photo2"),
+                    )
                 )
-            )
-    finally:
-        engine.dispose()
+        finally:
+            engine.dispose()
 
 
 # ---------------------------------------------------------------------------
@@ -170,43 +279,78 @@ def position_photo_to_webp(self, position_id: int, photo_relative_path: str) ->
     max_retries=3,
     default_retry_delay=10,
 )
-def foto_to_webp(self, foto_id: int, foto_relative_path: str) -> None:
+def foto_to_webp(
+    self,
+    foto_id: int,
+    foto_relative_path: str,
+    fingerprint: str | None = None,
+) -> None:
     """Конвертирует фото прайс-листа в WebP и обновляет запись в БД.
 
     Аналог Django foto_webp(pk) из pricelist/models.py:
       1. Ждём 1.5 с, пока файл гарантированно записан на диск.
       2. Конвертируем JPEG → WebP через Pillow.
-      3. Обновляем Foto.foto_webp в PostgreSQL.
+      3. Обновляем Foto.foto_webp (+ размеры и LQIP) в PostgreSQL.
 
     Аргументы:
         foto_id             — id записи в таблице foto.
         foto_relative_path  — значение поля foto (напр. 'media/abc.jpg').
     """
-    time.sleep(1.5)
-
-    from app.infrastructure.media.storage import abs_path
-    src_abs = abs_path(foto_relative_path)
-    if not os.path.isfile(src_abs):
-        raise self.retry(
-            exc=FileNotFoundError(f"Source photo not found: {src_abs}"),
-            countdown=5,
-        )
+    key = _media_task_key(self.name, foto_id, foto_relative_path, fingerprint)
+    if _already_converted(key):
+        return  # повторная доставка (acks_late) уже выполненной задачи
 
-    try:
-        webp_url = make_webp_sync(foto_relative_path)
-    except Exception as exc:
-        raise self.retry(exc=exc, countdown=10)
+    with media_task_guard.running(key):
+        time.sleep(1.5)
 
-    engine = create_engine(settings.database.sync_dsn, pool_pre_ping=True)
-    try:
-        with engine.begin() as conn:
-            conn.execute(
-                update(Foto)
-                .where(Foto.id == foto_id)
-                .values(foto_webp=webp_url)
+        if not get_media_storage().exists(foto_relative_path):
+            raise self.retry(
+                exc=FileNotFoundError(f"Source photo not found: {foto_relative_path}"),
+                countdown=5,
             )
-    finally:
-        engine.dispose()
+
+        try:
+            webp = convert_webp_sync(foto_relative_path)
+            placeholder = make_placeholder_sync(foto_relative_path)
+        except Exception as exc:
+            raise self.retry(exc=exc, countdown=10)
+
+        engine = create_engine(settings.database.sync_dsn, pool_pre_ping=True)
+        try:
+            with engine.begin() as conn:
+                conn.execute(
+                    update(Foto)
+                    .where(Foto.id == foto_id)
+                    .values(
+                        **_webp_values(webp, "foto_webp_quality", "foto_webp"),
+                        **_placeholder_values(placeholder, "foto"),
+                    )
+                )
+        finally:
+            engine.dispose()
+
+
+# ---------------------------------------------------------------------------
+# Pricelist module: regenerate_pricelist_excel (debounce)
+# ---------------------------------------------------------------------------
+
+pricelist_excel_debouncer = Debouncer(
+    redis_url=settings.celery.broker_url,
+    key=settings.pricelist.EXCEL_DEBOUNCE_KEY,
+    quiet_seconds=settings.pricelist.EXCEL_QUIET_SECONDS,
+    max_delay_seconds=settings.pricelist.EXCEL_MAX_DELAY_SECONDS,
+)
+
+
+def schedule_pricelist_excel() -> None:
+    """Отмечает правку прайса; пересборка Excel — одна на серию правок.
+
+    Вызывается из админки вместо regenerate_pricelist_excel.delay().
+    """
+    countdown = pricelist_excel_debouncer.touch()
+    if countdown is not None:
+        regenerate_pricelist_excel.apply_async(countdown=countdown)
+
 
 @celery_app.task(
     bind=True,
@@ -214,24 +358,32 @@ def foto_to_webp(self, foto_id: int, foto_relative_path: str) -> None:
     max_retries=3,
     default_retry_delay=10,
 )
-def regenerate_pricelist_excel(self) -> None:
-    """Regenerates static/excel/pricelist.xlsx from current DB state."""
-    engine = create_engine(settings.database.sync_dsn, pool_pre_ping=True)
-    try:
-        from sqlalchemy.orm import Session
+def regenerate_pricelist_excel(self, force: bool = False) -> None:
+    """Regenerates static/excel/pricelist.* (all export formats) from current DB state.
+
+    Без force задача дожидается тишины после последней правки
+    (см. schedule_pricelist_excel и PricelistSettings).
+    """
+    version = pricelist_excel_debouncer.version()
+    if not force:
+        due_in = pricelist_excel_debouncer.due_in()
+        if due_in is None:
+            return  # правки уже собраны предыдущим запуском
+        if due_in > 0:
+            self.apply_async(countdown=due_in)
+            return
+        pricelist_excel_debouncer.claim()
 
-        with Session(engine) as session:
-            generate_pricelist_xlsx(session)
+    try:
+        rebuild_pricelist_exports(version)
     except Exception as exc:
-        raise self.retry(exc=exc, countdown=10)
-    finally:
-        engine.dispose()
+        # Метки уже сброшены — повтор должен пересобрать файл без debounce
+        raise self.retry(exc=exc, countdown=10, kwargs={"force": True})
 
 
 @celery_app.task(
     bind=True,
     acks_late=True,
-    queue="backups",
     max_retries=3,
     default_retry_delay=30,
 )
@@ -254,6 +406,34 @@ def run_files_backup(self) -> dict:
     return {
         "status": "ok",
         "archive_name": summary.archive_name,
+        "backup_type": summary.backup_type,
         "remote_archive_path": summary.remote_archive_path,
         "deleted_remote_files": summary.deleted_remote_files,
+        "uploaded_bytes": summary.uploaded_bytes,
+        "database_snapshot_lsn": summary.database_snapshot_lsn,
+        "read_bytes_per_second": summary.read_bytes_per_second,
+        "upload_bytes_per_second": summary.upload_bytes_per_second,
+        "paused_seconds": summary.paused_seconds,
+    }
+
+
+@celery_app.task(
+    bind=True,
+    acks_late=True,
+    max_retries=0,
+)
+def collect_orphaned_media(self) -> dict:
+    """Переносит осиротевшие медиафайлы в карантин (см. app.infrastructure.media.gc).
+
+    Идёт в очередь maintenance (её слушает backup-воркер): задача IO-bound,
+    редкая и не должна конкурировать с конвертацией фото.
+    """
+    report = collect_media_garbage(dry_run=False)
+    return {
+        "status": "ok",
+        "scanned_files": report.scanned_files,
+        "quarantined_files": report.quarantined_files,
+        "orphaned_bytes": report.orphaned_bytes,
+        "quarantine_dir": report.quarantine_dir,
+        "purged_batches": report.purged_batches,
     }
@@ -0,0 +1,204 @@
+"""Телеметрия Celery-задач и очередей в формате Prometheus.
+
+Метрики собираются сигналами Celery (подключены в worker.py) и отдаются
+небольшим HTTP-сервером внутри воркера — Flower не нужен:
+
+    celery_task_queue_latency_seconds{task,queue}   — от публикации до старта;
+    celery_task_duration_seconds{task,queue,state}  — время выполнения;
+    celery_task_retries_total{task}                 — повторы (self.retry);
+    celery_task_failures_total{task,exception}      — окончательные ошибки;
+    celery_queue_depth{queue}                       — длина очереди в Redis
+                                                      (считается при скрейпе).
+
+Время публикации кладётся в заголовок сообщения (before_task_publish),
+поэтому задержка в очереди считается и для задач, поставленных из web.
+
+Prefork-воркер — это несколько процессов, поэтому prometheus_client работает
+в multiprocess-режиме: каждый дочерний процесс пишет значения в файлы
+CELERY_METRICS_DIR, HTTP-сервер главного процесса их агрегирует.
+Включается только в воркере и только при заданном CELERY_METRICS_PORT.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import shutil
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import Any
+
+from redis import Redis
+
+
+logger = logging.getLogger("app.celery.telemetry")
+
+PUBLISHED_AT_HEADER = "published_at"
+
+# Бакеты под разброс задач проекта: от быстрых UPDATE до многоминутного backup
+_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+_DURATION_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60, 120, 300, 900, 1800, 3600)
+
+
+@dataclass(slots=True)
+class _Metrics:
+    queue_latency: Any
+    duration: Any
+    retries: Any
+    failures: Any
+
+
+_metrics: _Metrics | None = None
+# task_id → (время старта, очередь); живёт в дочернем процессе воркера
+_started: dict[str, tuple[float, str]] = {}
+
+
+def stamp_published(headers: dict | None) -> None:
+    """before_task_publish: время публикации в заголовке сообщения."""
+    if headers is not None:
+        headers.setdefault(PUBLISHED_AT_HEADER, time.time())
+
+
+def setup_metrics(metrics_dir: str) -> None:
+    """Готовит multiprocess-каталог и создаёт метрики (главный процесс воркера, до fork)."""
+    global _metrics
+
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+    # Должно быть задано до импорта prometheus_client
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = metrics_dir
+
+    from prometheus_client import Counter, Histogram
+
+    _metrics = _Metrics(
+        queue_latency=Histogram(
+            "celery_task_queue_latency_seconds",
+            "Time between task publish and start of execution",
+            ("task", "queue"),
+            buckets=_LATENCY_BUCKETS,
+        ),
+        duration=Histogram(
+            "celery_task_duration_seconds",
+            "Task execution time",
+            ("task", "queue", "state"),
+            buckets=_DURATION_BUCKETS,
+        ),
+        retries=Counter("celery_task_retries", "Task retries", ("task",)),
+        failures=Counter(
+            "celery_task_failures", "Tasks failed for good", ("task", "exception")
+        ),
+    )
+
+
+def _queue_of(request: Any) -> str:
+    delivery_info = getattr(request, "delivery_info", None) or {}
+    return delivery_info.get("routing_key") or "unknown"
+
+
+def _published_at(request: Any) -> float | None:
+    value = getattr(request, PUBLISHED_AT_HEADER, None)
+    if value is None:
+        value = (getattr(request, "headers", None) or {}).get(PUBLISHED_AT_HEADER)
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def record_prerun(task_id: str, task: Any) -> None:
+    if _metrics is None:
+        return
+    now = time.time()
+    queue = _queue_of(task.request)
+    _started[task_id] = (now, queue)
+    published_at = _published_at(task.request)
+    # Для повторов (retry с countdown) это время от повторной публикации
+    if published_at is not None:
+        _metrics.queue_latency.labels(task.name, queue).observe(max(0.0, now - published_at))
+
+
+def record_postrun(task_id: str, task: Any, state: str | None) -> None:
+    if _metrics is None:
+        return
+    started = _started.pop(task_id, None)
+    if started is None:
+        return
+    started_at, queue = started
+    _metrics.duration.labels(task.name, queue, state or "UNKNOWN").observe(
+        time.time() - started_at
+    )
+
+
+def record_retry(task_name: str) -> None:
+    if _metrics is not None:
+        _metrics.retries.labels(task_name).inc()
+
+
+def record_failure(task_name: str, exception: BaseException | None) -> None:
+    if _metrics is not None:
+        name = type(exception).__name__ if exception is not None else "unknown"
+        _metrics.failures.labels(task_name, name).inc()
+
+
+def mark_process_dead(pid: int) -> None:
+    """worker_process_shutdown: убирает live-файлы завершившегося процесса."""
+    if _metrics is None:
+        return
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(pid)
+
+
+class QueueDepthCollector:
+    """Длина очередей в Redis на момент скрейпа.
+
+    С priority_steps kombu хранит очередь как набор списков:
+    ``<queue>`` для приоритета 0 и ``<queue><sep><priority>`` для остальных.
+    """
+
+    def __init__(
+        self,
+        *,
+        redis_url: str,
+        queues: Iterable[str],
+        priority_steps: Iterable[int],
+        sep: str,
+    ) -> None:
+        self._redis = Redis.from_url(redis_url)
+        self._queues = tuple(queues)
+        self._priority_steps = tuple(priority_steps)
+        self._sep = sep
+
+    def _keys(self, queue: str) -> list[str]:
+        return [queue if not step else f"{queue}{self._sep}{step}" for step in self._priority_steps]
+
+    def collect(self):
+        from prometheus_client.core import GaugeMetricFamily
+
+        gauge = GaugeMetricFamily(
+            "celery_queue_depth", "Messages waiting in the broker queue", labels=("queue",)
+        )
+        try:
+            pipe = self._redis.pipeline()
+            for queue in self._queues:
+                for key in self._keys(queue):
+                    pipe.llen(key)
+            lengths = iter(pipe.execute())
+        except Exception:
+            logger.warning("Queue depth: Redis is unavailable", exc_info=True)
+            return
+        for queue in self._queues:
+            gauge.add_metric((queue,), sum(next(lengths) for _ in self._priority_steps))
+        yield gauge
+
+
+def start_metrics_server(port: int, depth_collector: QueueDepthCollector) -> None:
+    """HTTP-эндпоинт /metrics в главном процессе воркера (daemon-поток)."""
+    from prometheus_client import CollectorRegistry, multiprocess, start_http_server
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    registry.register(depth_collector)
+    start_http_server(port, registry=registry)
+    logger.info("Celery metrics are exposed on :%s/metrics", port)
@@ -7,6 +7,17 @@
     celery -A app.infrastructure.celery.worker worker --loglevel=info
 
 Конфигурация берётся из CelerySettings (.env: CELERY_BROKER_URL, CELERY_RESULT_BACKEND).
+
+Очереди (каждую слушает свой воркер, см. docker-compose.yml):
+    celery       — всё, что не маршрутизировано явно (celery_vekolom);
+    media        — конвертация фото в WebP, CPU-bound (celery_media_vekolom);
+    exports      — генерация Excel прайс-листа (celery_vekolom);
+    backups      — files backup в WebDAV, IO-bound (celery_backup_vekolom);
+    maintenance  — редкие сервисные задачи: media GC (celery_backup_vekolom).
+
+Телеметрия (задержка в очереди, время выполнения, повторы, ошибки, длина
+очередей) собирается сигналами ниже и отдаётся в формате Prometheus на
+CELERY_METRICS_PORT воркера — см. app.infrastructure.celery.telemetry.
 """
 
 from __future__ import annotations
@@ -17,7 +28,9 @@ import os
 from celery import Celery
 from celery import signals
 from celery.schedules import crontab
+from kombu import Queue
 
+from app.infrastructure.celery import telemetry
 from app.infrastructure.set_logging import configure_runtime_logging
 from app.settings.config import settings
 
@@ -46,8 +59,54 @@ celery_app.conf.update(
 
     # Worker настройки
     worker_prefetch_multiplier=1,  # честная очередь при acks_late
-    task_routes={
-        "app.infrastructure.celery.tasks.run_files_backup": {"queue": "backups"},
+)
+
+
+_TASKS = "app.infrastructure.celery.tasks"
+_celery = settings.celery
+
+# Задача → очередь и приоритет по умолчанию.
+# Маршрутизация только здесь: queue= в декораторах задач не задаётся.
+_TASK_ROUTES: dict[str, dict] = {
+    f"{_TASKS}.slide_to_webp": {"queue": "media", "priority": _celery.media_priority},
+    f"{_TASKS}.position_photo_to_webp": {"queue": "media", "priority": _celery.media_priority},
+    f"{_TASKS}.foto_to_webp": {"queue": "media", "priority": _celery.media_priority},
+    f"{_TASKS}.regenerate_pricelist_excel": {
+        "queue": "exports",
+        "priority": _celery.exports_priority,
+    },
+    f"{_TASKS}.run_files_backup": {"queue": "backups"},
+    f"{_TASKS}.collect_orphaned_media": {
+        "queue": "maintenance",
+        "priority": _celery.maintenance_priority,
+    },
+}
+
+_QUEUE_NAMES = ("celery", "media", "exports", "backups", "maintenance")
+_PRIORITY_STEPS = list(range(10))
+_PRIORITY_SEP = ":"
+
+_RATE_LIMITS: dict[str, str | None] = {
+    "media": _celery.media_rate_limit,
+    "exports": _celery.exports_rate_limit,
+}
+
+celery_app.conf.update(
+    task_queues=tuple(Queue(name) for name in _QUEUE_NAMES),
+    task_default_queue="celery",
+    task_routes=_TASK_ROUTES,
+    task_default_priority=_celery.default_priority,
+    # Приоритеты в Redis: отдельный список на каждый уровень 0..9,
+    # воркер забирает сообщения начиная с 0
+    broker_transport_options={
+        "queue_order_strategy": "priority",
+        "priority_steps": _PRIORITY_STEPS,
+        "sep": _PRIORITY_SEP,
+    },
+    task_annotations={
+        name: {"rate_limit": _RATE_LIMITS[route["queue"]]}
+        for name, route in _TASK_ROUTES.items()
+        if _RATE_LIMITS.get(route["queue"])
     },
 )
 
@@ -79,10 +138,67 @@ def _after_setup_task_logger(logger: logging.Logger, **_: object) -> None:
     _normalize_celery_logger(logger)
 
 
-def _parse_backup_cron(value: str) -> crontab:
+# ---------------------------------------------------------------------------
+# Телеметрия задач (Prometheus)
+# ---------------------------------------------------------------------------
+
+
+@signals.before_task_publish.connect
+def _stamp_publish_time(headers: dict | None = None, **_: object) -> None:
+    # Срабатывает в публикующем процессе (web, beat, сам воркер)
+    telemetry.stamp_published(headers)
+
+
+@signals.worker_init.connect
+def _setup_metrics(**_: object) -> None:
+    if _celery.metrics_port:
+        telemetry.setup_metrics(_celery.metrics_dir)
+
+
+@signals.worker_ready.connect
+def _start_metrics_server(**_: object) -> None:
+    if not _celery.metrics_port:
+        return
+    telemetry.start_metrics_server(
+        _celery.metrics_port,
+        telemetry.QueueDepthCollector(
+            redis_url=_celery.broker_url,
+            queues=_QUEUE_NAMES,
+            priority_steps=_PRIORITY_STEPS,
+            sep=_PRIORITY_SEP,
+        ),
+    )
+
+
+@signals.worker_process_shutdown.connect
+def _forget_worker_process(pid: int | None = None, **_: object) -> None:
+    telemetry.mark_process_dead(pid or os.getpid())
+
+
+@signals.task_prerun.connect
+def _task_prerun(task_id: str, task, **_: object) -> None:
+    telemetry.record_prerun(task_id, task)
+
+
+@signals.task_postrun.connect
+def _task_postrun(task_id: str, task, state: str | None = None, **_: object) -> None:
+    telemetry.record_postrun(task_id, task, state)
+
+
+@signals.task_retry.connect
+def _task_retry(sender=None, **_: object) -> None:
+    telemetry.record_retry(getattr(sender, "name", "unknown"))
+
+
+@signals.task_failure.connect
+def _task_failure(sender=None, exception: BaseException | None = None, **_: object) -> None:
+    telemetry.record_failure(getattr(sender, "name", "unknown"), exception)
+
+
+def _parse_cron(value: str, setting_name: str = "BACKUP_SCHEDULE_CRON") -> crontab:
     parts = value.split()
     if len(parts) != 5:
-        raise ValueError("BACKUP_SCHEDULE_CRON должен быть в формате: m h dom mon dow")
+        raise ValueError(f"{setting_name} должен быть в формате: m h dom mon dow")
     minute, hour, day_of_month, month_of_year, day_of_week = parts
     return crontab(
         minute=minute,
@@ -102,7 +218,7 @@ def _build_backup_schedule() -> dict:
         return {
             "run-files-backup": {
                 "task": "app.infrastructure.celery.tasks.run_files_backup",
-                "schedule": _parse_backup_cron(backup.SCHEDULE_CRON),
+                "schedule": _parse_cron(backup.SCHEDULE_CRON),
                 "options": {"queue": "backups"},
             }
         }
@@ -119,9 +235,29 @@ def _build_backup_schedule() -> dict:
     return {}
 
 
+def _build_media_gc_schedule() -> dict:
+    cron = settings.media.GC_SCHEDULE_CRON
+    if not cron:
+        return {}
+    return {
+        "collect-orphaned-media": {
+            "task": "app.infrastructure.celery.tasks.collect_orphaned_media",
+            "schedule": _parse_cron(cron, "MEDIA_GC_SCHEDULE_CRON"),
+            "options": {"queue": "maintenance"},
+        }
+    }
+
+
 backup_schedule = _build_backup_schedule()
 if backup_schedule:
     celery_app.conf.beat_schedule = {
         **celery_app.conf.get("beat_schedule", {}),
         **backup_schedule,
     }
+
+media_gc_schedule = _build_media_gc_schedule()
+if media_gc_schedule:
+    celery_app.conf.beat_schedule = {
+        **celery_app.conf.get("beat_schedule", {}),
+        **media_gc_schedule,
+    }
@@ -0,0 +1,262 @@
+"""Драйверы хранилища медиафайлов.
+
+Все чтения и записи медиафайлов (image_processor, загрузки из админки,
+Celery-задачи) идут через MediaStorage, а не через open()/os.path напрямую.
+Так web- и worker-ноды могут работать с общим S3-совместимым хранилищем,
+не деля один диск.
+
+Ключ файла в любом драйвере — тот же относительный путь от MEDIA_ROOT,
+что хранится в БД (``media/ab/cd/<sha256>.jpg``), поэтому смена драйвера
+не требует миграции данных — только копирования файлов.
+
+Драйвер выбирается настройкой MEDIA_STORAGE_BACKEND (local | s3).
+Методы синхронные: вызывающий код — это Pillow в threadpool
+(asyncio.to_thread) и Celery-воркеры.
+"""
+
+from __future__ import annotations
+
+import io
+import mimetypes
+import os
+import uuid
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import BinaryIO, Protocol
+
+from app.infrastructure.media.storage import abs_path, ensure_dir
+from app.settings.config import settings
+
+
+@dataclass(frozen=True, slots=True)
+class MediaStat:
+    size: int
+    modified_at: float  # unix timestamp
+
+
+class MediaStorage(Protocol):
+    """Хранилище медиафайлов; relative — путь от MEDIA_ROOT (``media/…``)."""
+
+    def exists(self, relative: str) -> bool: ...
+
+    def stat(self, relative: str) -> MediaStat | None:
+        """Размер и время изменения; None, если файла нет."""
+        ...
+
+    def read(self, relative: str) -> bytes:
+        """Содержимое файла целиком. FileNotFoundError, если файла нет."""
+        ...
+
+    def read_range(self, relative: str, start: int, end: int | None = None) -> bytes:
+        """Байты [start, end): end не включается, None — «до конца файла».
+
+        Диапазон обрезается по концу файла, как срез bytes: start за концом
+        файла или end <= start дают b"" (S3 отвечает на такой Range 416 —
+        драйвер переводит это в b""). FileNotFoundError, если файла нет.
+        """
+        ...
+
+    def save(self, relative: str, data: bytes | BinaryIO) -> None:
+        """Атомарно записывает файл (читатели не видят частично записанный)."""
+        ...
+
+    def delete(self, relative: str) -> None: ...
+
+
+# ---------------------------------------------------------------------------
+# Локальная ФС (MEDIA_ROOT)
+# ---------------------------------------------------------------------------
+
+
+class LocalMediaStorage:
+    """Файлы в MEDIA_ROOT; запись через tmp + os.replace."""
+
+    _COPY_CHUNK = 1024 * 1024
+
+    def exists(self, relative: str) -> bool:
+        return os.path.isfile(abs_path(relative))
+
+    def stat(self, relative: str) -> MediaStat | None:
+        try:
+            result = os.stat(abs_path(relative))
+        except FileNotFoundError:
+            return None
+        return MediaStat(size=result.st_size, modified_at=result.st_mtime)
+
+    def read(self, relative: str) -> bytes:
+        with open(abs_path(relative), "rb") as stream:
+            return stream.read()
+
+    def read_range(self, relative: str, start: int, end: int | None = None) -> bytes:
+        with open(abs_path(relative), "rb") as stream:
+            stream.seek(start)
+            return stream.read() if end is None else stream.read(max(0, end - start))
+
+    def save(self, relative: str, data: bytes | BinaryIO) -> None:
+        destination = abs_path(relative)
+        ensure_dir(os.path.dirname(destination))
+        tmp_path = f"{destination}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, "wb") as stream:
+                if isinstance(data, (bytes, bytearray, memoryview)):
+                    stream.write(data)
+                else:
+                    while chunk := data.read(self._COPY_CHUNK):
+                        stream.write(chunk)
+            os.replace(tmp_path, destination)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    def delete(self, relative: str) -> None:
+        try:
+            os.unlink(abs_path(relative))
+        except FileNotFoundError:
+            pass
+
+
+# ---------------------------------------------------------------------------
+# S3-совместимое хранилище (AWS S3, MinIO, Yandex Object Storage)
+# ---------------------------------------------------------------------------
+
+
+class S3MediaStorage:
+    """Объекты в бакете S3; ключ = S3_PREFIX + относительный путь.
+
+    Запись идёт через upload_fileobj: начиная с S3_MULTIPART_THRESHOLD_MB
+    объект стримится multipart-частями по S3_MULTIPART_CHUNK_MB, без
+    буферизации всего файла. Объект становится видимым только после
+    завершения загрузки — запись атомарна по семантике S3.
+    """
+
+    def __init__(
+        self,
+        *,
+        bucket: str,
+        access_key: str,
+        secret_key: str,
+        endpoint_url: str | None = None,
+        region: str = "us-east-1",
+        prefix: str = "",
+        multipart_threshold_mb: int = 8,
+        multipart_chunk_mb: int = 8,
+    ) -> None:
+        try:
+            import boto3
+            from boto3.s3.transfer import TransferConfig
+            from botocore.config import Config
+        except ImportError as exc:  # pragma: no cover - зависит от окружения
+            raise RuntimeError("MEDIA_STORAGE_BACKEND=s3 требует пакет boto3") from exc
+
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self._client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url or None,
+            region_name=region,
+            aws_access_key_id=access_key,
+            aws_secret_access_key=secret_key,
+            # path-style адресация нужна MinIO и большинству S3-совместимых хранилищ
+            config=Config(signature_version="s3v4", s3={"addressing_style": "path"}),
+        )
+        self._transfer = TransferConfig(
+            multipart_threshold=multipart_threshold_mb * 1024 * 1024,
+            multipart_chunksize=multipart_chunk_mb * 1024 * 1024,
+        )
+
+    def _key(self, relative: str) -> str:
+        relative = relative.lstrip("/")
+        return f"{self.prefix}/{relative}" if self.prefix else relative
+
+    @staticmethod
+    def _error_code(exc: Exception) -> str | None:
+        return getattr(exc, "response", {}).get("Error", {}).get("Code")
+
+    @classmethod
+    def _is_not_found(cls, exc: Exception) -> bool:
+        return cls._error_code(exc) in ("404", "NoSuchKey", "NotFound")
+
+    def exists(self, relative: str) -> bool:
+        return self.stat(relative) is not None
+
+    def stat(self, relative: str) -> MediaStat | None:
+        from botocore.exceptions import ClientError
+
+        try:
+            head = self._client.head_object(Bucket=self.bucket, Key=self._key(relative))
+        except ClientError as exc:
+            if self._is_not_found(exc):
+                return None
+            raise
+        return MediaStat(
+            size=int(head["ContentLength"]),
+            modified_at=head["LastModified"].timestamp(),
+        )
+
+    def _get(self, relative: str, **params: str) -> bytes:
+        from botocore.exceptions import ClientError
+
+        key = self._key(relative)
+        try:
+            response = self._client.get_object(Bucket=self.bucket, Key=key, **params)
+        except ClientError as exc:
+            if self._is_not_found(exc):
+                raise FileNotFoundError(f"Media object not found: {key}") from exc
+            raise
+        with response["Body"] as body:
+            return body.read()
+
+    def read(self, relative: str) -> bytes:
+        return self._get(relative)
+
+    def read_range(self, relative: str, start: int, end: int | None = None) -> bytes:
+        if end is not None and end <= start:
+            return b""
+        from botocore.exceptions import ClientError
+
+        byte_range = f"bytes={start}-" if end is None else f"bytes={start}-{end - 1}"
+        try:
+            return self._get(relative, Range=byte_range)
+        except ClientError as exc:
+            # 416: start за концом объекта — как у локального драйвера, пустой ответ
+            if self._error_code(exc) in ("416", "InvalidRange"):
+                return b""
+            raise
+
+    def save(self, relative: str, data: bytes | BinaryIO) -> None:
+        stream = io.BytesIO(data) if isinstance(data, (bytes, bytearray, memoryview)) else data
+        content_type = mimetypes.guess_type(relative)[0] or "application/octet-stream"
+        self._client.upload_fileobj(
+            stream,
+            self.bucket,
+            self._key(relative),
+            ExtraArgs={"ContentType": content_type},
+            Config=self._transfer,
+        )
+
+    def delete(self, relative: str) -> None:
+        self._client.delete_object(Bucket=self.bucket, Key=self._key(relative))
+
+
+@lru_cache(maxsize=1)
+def get_media_storage() -> MediaStorage:
+    """Драйвер хранилища по MEDIA_STORAGE_BACKEND (один на процесс)."""
+    media = settings.media
+    if media.STORAGE_BACKEND == "s3":
+        return S3MediaStorage(
+            bucket=media.S3_BUCKET,
+            access_key=media.S3_ACCESS_KEY,
+            secret_key=media.S3_SECRET_KEY.get_secret_value(),
+            endpoint_url=media.S3_ENDPOINT_URL,
+            region=media.S3_REGION,
+            prefix=media.S3_PREFIX,
+            multipart_threshold_mb=media.S3_MULTIPART_THRESHOLD_MB,
+            multipart_chunk_mb=media.S3_MULTIPART_CHUNK_MB,
+        )
+    return LocalMediaStorage()
+
+
+def require_local_storage(command: str) -> None:
+    """Команды, работающие с деревом файлов напрямую (GC, reshard), — только для local."""
+    if settings.media.STORAGE_BACKEND != "local":
+        raise RuntimeError(f"{command} поддерживается только при MEDIA_STORAGE_BACKEND=local")
@@ -0,0 +1,118 @@
+"""Сравнение фиксированного качества WebP с подбором по SSIM.
+
+Прогоняет уникальные исходники из catalog.WEBP_COLUMNS через оба режима
+в памяти (на диск ничего не пишется) и считает суммарный размер.
+Нужен, чтобы решить, включать ли MEDIA_WEBP_TARGET_SSIM и с каким порогом:
+
+    python -m app.infrastructure.media.cli webp-bench --target-ssim 0.95 --limit 300
+"""
+
+from __future__ import annotations
+
+import io
+import logging
+import time
+from dataclasses import dataclass
+
+from PIL import Image
+from sqlalchemy import create_engine
+
+from app.infrastructure.media.backends import get_media_storage
+from app.infrastructure.media.catalog import WEBP_COLUMNS, iter_column_values
+from app.infrastructure.media.image_processor import (
+    encode_webp,
+    encode_webp_for_ssim,
+    measure_webp_ssim,
+)
+from app.settings.config import settings
+
+
+logger = logging.getLogger("app.media")
+
+
+@dataclass(slots=True)
+class WebpBenchmarkReport:
+    fixed_quality: int
+    target_ssim: float
+    images: int = 0
+    missing: int = 0
+    fixed_bytes: int = 0
+    targeted_bytes: int = 0
+    saved_bytes: int = 0
+    saved_percent: float = 0.0
+    fixed_mean_ssim: float = 0.0
+    targeted_mean_ssim: float = 0.0
+    mean_quality: float = 0.0
+    min_quality: int | None = None
+    max_quality: int | None = None
+    duration_seconds: float = 0.0
+
+
+def benchmark_webp(
+    *,
+    target_ssim: float | None = None,
+    fixed_quality: int | None = None,
+    limit: int | None = None,
+) -> WebpBenchmarkReport:
+    """Считает экономию байт от подбора качества по SSIM на реальных фото."""
+    media = settings.media
+    report = WebpBenchmarkReport(
+        fixed_quality=fixed_quality if fixed_quality is not None else media.WEBP_QUALITY,
+        target_ssim=target_ssim if target_ssim is not None else (media.WEBP_TARGET_SSIM or 0.95),
+    )
+    started_at = time.perf_counter()
+    seen: set[str] = set()
+    fixed_ssim_sum = targeted_ssim_sum = 0.0
+    quality_sum = 0
+
+    storage = get_media_storage()
+    engine = create_engine(settings.database.sync_dsn, pool_pre_ping=True)
+    try:
+        with engine.connect() as conn:
+            sources = tuple(webp_column.source for webp_column in WEBP_COLUMNS)
+            for _, _, path in iter_column_values(conn, sources):
+                if limit is not None and report.images >= limit:
+                    break
+                if path in seen:
+                    continue
+                seen.add(path)
+
+                try:
+                    payload = storage.read(path)
+                except FileNotFoundError:
+                    report.missing += 1
+                    continue
+
+                with Image.open(io.BytesIO(payload)) as img:
+                    if img.mode not in ("RGB", "RGBA", "L"):
+                        img = img.convert("RGB")
+                    fixed = encode_webp(img, report.fixed_quality)
+                    fixed_ssim_sum += measure_webp_ssim(img, fixed)
+                    targeted, quality, score = encode_webp_for_ssim(img, report.target_ssim)
+
+                report.images += 1
+                report.fixed_bytes += len(fixed)
+                report.targeted_bytes += len(targeted)
+                targeted_ssim_sum += score
+                quality_sum += quality
+                report.min_quality = min(quality, report.min_quality or quality)
+                report.max_quality = max(quality, report.max_quality or quality)
+                logger.debug(
+                    "%s: fixed=%s B, q=%s -> %s B (ssim %.4f)",
+                    path,
+                    len(fixed),
+                    quality,
+                    len(targeted),
+                    score,
+                )
+    finally:
+        engine.dispose()
+
+    if report.images:
+        report.saved_bytes = report.fixed_bytes - report.targeted_bytes
+        report.saved_percent = round(100 * report.saved_bytes / report.fixed_bytes, 2)
+        report.fixed_mean_ssim = round(fixed_ssim_sum / report.images, 4)
+        report.targeted_mean_ssim = round(targeted_ssim_sum / report.images, 4)
+        report.mean_quality = round(quality_sum / report.images, 1)
+    report.duration_seconds = time.perf_counter() - started_at
+    return report
@@ -0,0 +1,154 @@
+"""Реестр колонок БД, которые ссылаются на медиафайлы.
+
+Нужен сервисным командам (backfill превью, сборка мусора и т.п.), которые
+обходят все изображения проекта, не зная заранее про конкретные модули.
+
+Три вида ссылок:
+  - IMAGE_COLUMNS — исходники: относительный путь от MEDIA_ROOT
+    (``media/abc.jpg``). Производные файлы (WebP, превью) выводятся из них.
+  - URL_COLUMNS   — URL-пути производных файлов (``/media/media/abc.webp``),
+    записанные Celery-задачами.
+  - HTML_COLUMNS  — rich-text поля TinyMCE, внутри которых могут быть
+    <img src="/media/media/uploads/...">.
+"""
+
+from __future__ import annotations
+
+import re
+from collections.abc import Iterator
+from dataclasses import dataclass
+
+from sqlalchemy import select
+from sqlalchemy.engine import Connection
+
+from app.modules.contacts.infrastructure.sa_models import Contacts
+from app.modules.home.infrastructure.sa_models import (
+    Action,
+    MainCarousel,
+    MainText,
+    Priem,
+    Slogan,
+)
+from app.modules.pricelist.infrastructure.sa_models import Category, Foto, Position
+
+
+@dataclass(frozen=True, slots=True)
+class MediaColumn:
+    """Колонка ORM-модели, значение которой ссылается на медиафайл(ы)."""
+
+    model: type
+    column: str
+
+    @property
+    def label(self) -> str:
+        return f"{self.model.__tablename__}.{self.column}"
+
+
+IMAGE_COLUMNS: tuple[MediaColumn, ...] = (
+    MediaColumn(MainCarousel, "photo"),
+    MediaColumn(Position, "photo2"),
+    MediaColumn(Position, "foto_app"),
+    MediaColumn(Position, "foto_rss"),
+    MediaColumn(Foto, "foto"),
+)
+
+
+@dataclass(frozen=True, slots=True)
+class WebpColumn:
+    """Исходная колонка, колонки для URL её WebP-версии и колонка качества.
+
+    Повторяет то, что делают Celery-задачи slide_to_webp /
+    position_photo_to_webp / foto_to_webp.
+    """
+
+    source: MediaColumn
+    targets: tuple[str, ...]
+    quality_column: str
+
+
+WEBP_COLUMNS: tuple[WebpColumn, ...] = (
+    WebpColumn(MediaColumn(MainCarousel, "photo"), ("photo_webp",), "photo_webp_quality"),
+    WebpColumn(
+        MediaColumn(Position, "photo2"),
+        ("photo2_webp", "avatar_webp"),
+        "photo2_webp_quality",
+    ),
+    WebpColumn(MediaColumn(Foto, "foto"), ("foto_webp",), "foto_webp_quality"),
+)
+
+# Исходники, для которых в строке хранятся размеры и LQIP-плейсхолдер:
+# колонки <column>_width / <column>_height / <column>_lqip (миграция 0006).
+PLACEHOLDER_COLUMNS: tuple[MediaColumn, ...] = tuple(
+    webp_column.source for webp_column in WEBP_COLUMNS
+)
+
+
+def placeholder_column_names(media_column: MediaColumn) -> tuple[str, str, str]:
+    """Имена колонок (ширина, высота, LQIP) для исходной колонки."""
+    column = media_column.column
+    return f"{column}_width", f"{column}_height", f"{column}_lqip"
+
+
+# Относительные пути, которые не являются исходниками для конвертации
+# (AMP/Turbo-варианты слайда заполняются отдельно), но файлы по ним живые.
+EXTRA_PATH_COLUMNS: tuple[MediaColumn, ...] = (
+    MediaColumn(MainCarousel, "photo_amp"),
+    MediaColumn(MainCarousel, "photo_turbo"),
+)
+
+URL_COLUMNS: tuple[MediaColumn, ...] = (
+    MediaColumn(MainCarousel, "photo_webp"),
+    MediaColumn(Position, "photo2_webp"),
+    MediaColumn(Position, "avatar_webp"),
+    MediaColumn(Foto, "foto_webp"),
+)
+
+HTML_COLUMNS: tuple[MediaColumn, ...] = (
+    MediaColumn(MainCarousel, "text"),
+    MediaColumn(MainText, "text"),
+    MediaColumn(Action, "text"),
+    MediaColumn(Slogan, "text"),
+    MediaColumn(Priem, "text"),
+    MediaColumn(Category, "description"),
+    MediaColumn(Position, "description"),
+    MediaColumn(Position, "rules"),
+    MediaColumn(Contacts, "text"),
+)
+
+# src="..." / href="..." внутри HTML из TinyMCE
+HTML_LINK_RE = re.compile(r"""(?:src|href)\s*=\s*["']([^"']+)["']""", re.IGNORECASE)
+
+
+def iter_column_values(
+    conn: Connection,
+    columns: tuple[MediaColumn, ...],
+    batch_size: int = 500,
+    after_id: int | None = None,
+) -> Iterator[tuple[MediaColumn, int, str]]:
+    """Стримит (колонка, id, значение) по всем непустым значениям колонок.
+
+    Чтение идёт через server-side cursor (stream_results), поэтому
+    память не растёт с числом строк. after_id — продолжить с id > after_id
+    (для возобновления прерванного прохода по одной колонке).
+    """
+    for media_column in columns:
+        model = media_column.model
+        column = getattr(model, media_column.column)
+        stmt = (
+            select(model.id, column)
+            .where(column.is_not(None), column != "")
+            .order_by(model.id.asc())
+            .execution_options(stream_results=True, yield_per=batch_size)
+        )
+        if after_id is not None:
+            stmt = stmt.where(model.id > after_id)
+        for row_id, value in conn.execute(stmt):
+            yield media_column, row_id, value
+
+
+def iter_image_rows(
+    conn: Connection,
+    batch_size: int = 500,
+) -> Iterator[tuple[MediaColumn, int, str]]:
+    """Стримит (колонка, id, путь) по всем непустым исходным изображениям."""
+    return iter_column_values(conn, IMAGE_COLUMNS, batch_size=batch_size)
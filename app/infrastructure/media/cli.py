@@ -0,0 +1,292 @@
+"""Сервисные команды для медиафайлов.
+
+Запуск в контейнере приложения:
+
+    python -m app.infrastructure.media.cli thumbnails          # только недостающие превью
+    python -m app.infrastructure.media.cli thumbnails --force  # пересоздать все превью
+    python -m app.infrastructure.media.cli placeholders        # размеры + LQIP для старых записей
+    python -m app.infrastructure.media.cli gc                  # отчёт об осиротевших файлах
+    python -m app.infrastructure.media.cli gc --apply          # перенести их в карантин
+    python -m app.infrastructure.media.cli reencode --quality 40 --thumbnails
+    python -m app.infrastructure.media.cli reencode --target-ssim 0.95
+    python -m app.infrastructure.media.cli webp-bench --target-ssim 0.95 --limit 300
+    python -m app.infrastructure.media.cli shard --dry-run     # что будет перенесено в media/ab/cd/
+    python -m app.infrastructure.media.cli shard               # перенести и переписать ссылки в БД
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import sys
+from dataclasses import asdict
+
+from sqlalchemy import bindparam, create_engine, select, update
+from sqlalchemy.engine import Engine
+
+from app.infrastructure.media.backends import get_media_storage
+from app.infrastructure.media.benchmark import benchmark_webp
+from app.infrastructure.media.catalog import (
+    PLACEHOLDER_COLUMNS,
+    MediaColumn,
+    iter_image_rows,
+    placeholder_column_names,
+)
+from app.infrastructure.media.gc import collect_media_garbage
+from app.infrastructure.media.image_processor import (
+    Placeholder,
+    make_placeholder_sync,
+    make_thumbnail_sync,
+)
+from app.infrastructure.media.reencode import reencode_media
+from app.infrastructure.media.reshard import reshard_media
+from app.infrastructure.media.storage import thumbnail_relative_path
+from app.settings.config import settings
+
+
+logger = logging.getLogger("app.media")
+
+
+def backfill_thumbnails(*, force: bool = False) -> dict[str, int]:
+    """Строит WebP-превью для всех существующих изображений в БД."""
+    stats = {"created": 0, "skipped": 0, "missing_source": 0, "failed": 0}
+    seen: set[str] = set()
+
+    storage = get_media_storage()
+    engine = create_engine(settings.database.sync_dsn, pool_pre_ping=True)
+    try:
+        with engine.connect() as conn:
+            for image_column, row_id, path in iter_image_rows(conn):
+                if path in seen:
+                    continue
+                seen.add(path)
+
+                if not force and storage.exists(thumbnail_relative_path(path)):
+                    stats["skipped"] += 1
+                    continue
+
+                try:
+                    make_thumbnail_sync(path)
+                except FileNotFoundError:
+                    logger.warning("%s id=%s: source not found: %s", image_column.label, row_id, path)
+                    stats["missing_source"] += 1
+                except Exception:
+                    logger.exception("%s id=%s: thumbnail failed: %s", image_column.label, row_id, path)
+                    stats["failed"] += 1
+                else:
+                    stats["created"] += 1
+    finally:
+        engine.dispose()
+
+    return stats
+
+
+def _write_placeholders(
+    engine: Engine,
+    media_column: MediaColumn,
+    rows: list[tuple[int, Placeholder]],
+) -> None:
+    """Один executemany UPDATE на пачку строк."""
+    if not rows:
+        return
+    width_column, height_column, lqip_column = placeholder_column_names(media_column)
+    table = media_column.model.__table__
+    stmt = (
+        update(table)
+        .where(table.c.id == bindparam("b_id"))
+        .values(
+            {
+                width_column: bindparam("b_width"),
+                height_column: bindparam("b_height"),
+                lqip_column: bindparam("b_lqip"),
+            }
+        )
+    )
+    with engine.begin() as conn:
+        conn.execute(
+            stmt,
+            [
+                {"b_id": row_id, "b_width": p.width, "b_height": p.height, "b_lqip": p.lqip}
+                for row_id, p in rows
+            ],
+        )
+
+
+def backfill_placeholders(*, force: bool = False, batch_size: int = 200) -> dict[str, int]:
+    """Заполняет размеры и LQIP-плейсхолдеры для записей, созданных до их появления."""
+    stats = {"updated": 0, "skipped": 0, "missing_source": 0, "failed": 0}
+    computed: dict[str, Placeholder | None] = {}
+
+    engine = create_engine(settings.database.sync_dsn, pool_pre_ping=True)
+    try:
+        with engine.connect() as reader:
+            for media_column in PLACEHOLDER_COLUMNS:
+                model = media_column.model
+                source = getattr(model, media_column.column)
+                lqip = getattr(model, placeholder_column_names(media_column)[2])
+                stmt = (
+                    select(model.id, source, lqip)
+                    .where(source.is_not(None), source != "")
+                    .order_by(model.id.asc())
+                    .execution_options(stream_results=True, yield_per=batch_size)
+                )
+
+                pending: list[tuple[int, Placeholder]] = []
+                for row_id, path, current in reader.execute(stmt):
+                    if current and not force:
+                        stats["skipped"] += 1
+                        continue
+                    if path not in computed:
+                        label = f"{media_column.label} id={row_id}"
+                        try:
+                            computed[path] = make_placeholder_sync(path)
+                        except FileNotFoundError:
+                            logger.warning("%s: source not found: %s", label, path)
+                            stats["missing_source"] += 1
+                            computed[path] = None
+                        except Exception:
+                            logger.exception("%s: placeholder failed: %s", label, path)
+                            stats["failed"] += 1
+                            computed[path] = None
+                    placeholder = computed[path]
+                    if placeholder is None:
+                        continue
+                    pending.append((row_id, placeholder))
+                    if len(pending) >= batch_size:
+                        _write_placeholders(engine, media_column, pending)
+                        stats["updated"] += len(pending)
+                        pending = []
+
+                _write_placeholders(engine, media_column, pending)
+                stats["updated"] += len(pending)
+    finally:
+        engine.dispose()
+
+    return stats
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Media maintenance commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    thumbnails = subparsers.add_parser("thumbnails", help="Backfill admin WebP thumbnails")
+    thumbnails.add_argument("--force", action="store_true", help="Rebuild existing thumbnails")
+
+    placeholders = subparsers.add_parser(
+        "placeholders",
+        help="Backfill intrinsic size and LQIP placeholders",
+    )
+    placeholders.add_argument("--force", action="store_true", help="Recompute all placeholders")
+
+    gc = subparsers.add_parser("gc", help="Find orphaned media files and quarantine them")
+    gc.add_argument("--apply", action="store_true", help="Move orphans to quarantine (default: dry run)")
+    gc.add_argument("--grace-hours", type=int, default=None, help="Override MEDIA_GC_GRACE_HOURS")
+
+    reencode = subparsers.add_parser("reencode", help="Regenerate WebP for all existing rows")
+    reencode.add_argument("--quality", type=int, default=None, help="Override MEDIA_WEBP_QUALITY")
+    reencode.add_argument(
+        "--target-ssim",
+        type=float,
+        default=None,
+        help="Pick quality per image by SSIM (overrides MEDIA_WEBP_TARGET_SSIM)",
+    )
+    reencode.add_argument("--workers", type=int, default=None, help="Processes (default: CPU count)")
+    reencode.add_argument("--batch-size", type=int, default=200, help="Rows per UPDATE/checkpoint")
+    reencode.add_argument("--thumbnails", action="store_true", help="Rebuild admin thumbnails too")
+    reencode.add_argument(
+        "--checkpoint",
+        default="tmp/media_reencode_checkpoint.json",
+        help="Progress file used to resume an interrupted run",
+    )
+    reencode.add_argument("--restart", action="store_true", help="Ignore existing checkpoint")
+
+    bench = subparsers.add_parser("webp-bench", help="Compare fixed WebP quality with SSIM search")
+    bench.add_argument("--target-ssim", type=float, default=None, help="SSIM target (default 0.95)")
+    bench.add_argument("--quality", type=int, default=None, help="Fixed quality to compare against")
+    bench.add_argument("--limit", type=int, default=None, help="Stop after N unique images")
+
+    shard = subparsers.add_parser("shard", help="Move flat media files into media/ab/cd/ shards")
+    shard.add_argument("--dry-run", action="store_true", help="Only report what would be moved")
+    shard.add_argument("--batch-size", type=int, default=200, help="Rows per UPDATE transaction")
+
+    args = parser.parse_args()
+
+    if args.command == "thumbnails":
+        try:
+            stats = backfill_thumbnails(force=args.force)
+        except Exception as exc:
+            print(f"Thumbnail backfill failed: {exc}", file=sys.stderr)
+            return 1
+        print(json.dumps(stats, ensure_ascii=False, indent=2))
+        return 1 if stats["failed"] else 0
+
+    if args.command == "placeholders":
+        try:
+            stats = backfill_placeholders(force=args.force)
+        except Exception as exc:
+            print(f"Placeholder backfill failed: {exc}", file=sys.stderr)
+            return 1
+        print(json.dumps(stats, ensure_ascii=False, indent=2))
+        return 1 if stats["failed"] else 0
+
+    if args.command == "gc":
+        try:
+            report = collect_media_garbage(dry_run=not args.apply, grace_hours=args.grace_hours)
+        except Exception as exc:
+            print(f"Media GC failed: {exc}", file=sys.stderr)
+            return 1
+        print(json.dumps(asdict(report), ensure_ascii=False, indent=2))
+        return 0
+
+    if args.command == "reencode":
+        try:
+            reencode_report = reencode_media(
+                quality=args.quality,
+                target_ssim=args.target_ssim,
+                workers=args.workers,
+                batch_size=args.batch_size,
+                thumbnails=args.thumbnails,
+                checkpoint_path=args.checkpoint,
+                restart=args.restart,
+            )
+        except KeyboardInterrupt:
+            print("Interrupted; re-run the same command to resume.", file=sys.stderr)
+            return 130
+        except Exception as exc:
+            print(f"Re-encode failed: {exc}", file=sys.stderr)
+            return 1
+        print(json.dumps(asdict(reencode_report), ensure_ascii=False, indent=2))
+        return 1 if reencode_report.failed else 0
+
+    if args.command == "webp-bench":
+        try:
+            bench_report = benchmark_webp(
+                target_ssim=args.target_ssim,
+                fixed_quality=args.quality,
+                limit=args.limit,
+            )
+        except Exception as exc:
+            print(f"WebP benchmark failed: {exc}", file=sys.stderr)
+            return 1
+        print(json.dumps(asdict(bench_report), ensure_ascii=False, indent=2))
+        return 0
+
+    if args.command == "shard":
+        try:
+            shard_report = reshard_media(batch_size=args.batch_size, dry_run=args.dry_run)
+        except KeyboardInterrupt:
+            print("Interrupted; re-run the same command to continue.", file=sys.stderr)
+            return 130
+        except Exception as exc:
+            print(f"Reshard failed: {exc}", file=sys.stderr)
+            return 1
+        print(json.dumps(asdict(shard_report), ensure_ascii=False, indent=2))
+        return 0
+
+    parser.print_help()
+    return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,206 @@
+"""Сборка мусора в MEDIA_ROOT/media.
+
+Редактирование фото в MainCarouselView / PositionView / FotoView и удаление
+записей оставляют старые JPEG/WebP/превью на диске навсегда. Этот модуль
+находит такие файлы сканированием ссылок из БД и переносит их в карантин.
+
+Алгоритм (один проход по БД, один проход по диску):
+  1. Стримим все ссылки из БД в set относительных путей:
+     - исходники (catalog.IMAGE_COLUMNS) + их WebP и превью;
+     - URL производных файлов (catalog.URL_COLUMNS);
+     - <img src>/<a href> внутри TinyMCE-полей (catalog.HTML_COLUMNS).
+  2. Обходим MEDIA_ROOT/media через os.scandir (без stat на каждый путь
+     через pathlib), сравниваем с set.
+  3. Файлы без ссылок и старше GC_GRACE_HOURS переносим в
+     GC_QUARANTINE_DIR/<метка запуска>/<rel. путь>. Ничего не удаляется сразу:
+     ошибочно собранный файл можно вернуть простым mv.
+  4. Партии карантина старше GC_QUARANTINE_RETENTION_DAYS удаляются.
+
+Grace period защищает от гонки «файл уже записан в before_create, а строка
+в БД ещё не закоммичена» и от WebP, который Celery ещё не прописал в БД.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import shutil
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Connection
+
+from app.infrastructure.media.backends import require_local_storage
+from app.infrastructure.media.catalog import (
+    EXTRA_PATH_COLUMNS,
+    HTML_COLUMNS,
+    HTML_LINK_RE,
+    IMAGE_COLUMNS,
+    URL_COLUMNS,
+    iter_column_values,
+)
+from app.infrastructure.media.storage import (
+    abs_path,
+    relative_from_url,
+    thumbnail_relative_path,
+    webp_relative_path,
+)
+from app.settings.config import settings
+
+
+logger = logging.getLogger("app.media")
+
+# Корневой подкаталог MEDIA_ROOT, который обслуживает GC
+MEDIA_SUBDIR = "media"
+
+# Сколько осиротевших путей показывать в отчёте (полный список — в логах)
+_REPORT_SAMPLE_SIZE = 50
+
+
+@dataclass(slots=True)
+class MediaGcReport:
+    dry_run: bool
+    referenced_paths: int = 0
+    scanned_files: int = 0
+    orphaned_files: int = 0
+    orphaned_bytes: int = 0
+    skipped_recent: int = 0
+    quarantined_files: int = 0
+    quarantine_dir: str | None = None
+    purged_batches: list[str] = field(default_factory=list)
+    sample: list[str] = field(default_factory=list)
+    duration_seconds: float = 0.0
+
+
+def _normalize(relative: str) -> str:
+    return os.path.normpath(relative.lstrip("/")).replace(os.sep, "/")
+
+
+def collect_referenced_paths(conn: Connection) -> set[str]:
+    """Собирает множество путей (относительно MEDIA_ROOT), на которые ссылается БД."""
+    referenced: set[str] = set()
+
+    for _, _, path in iter_column_values(conn, IMAGE_COLUMNS):
+        referenced.add(_normalize(path))
+        referenced.add(_normalize(webp_relative_path(path)))
+        referenced.add(_normalize(thumbnail_relative_path(path)))
+
+    for _, _, path in iter_column_values(conn, EXTRA_PATH_COLUMNS):
+        referenced.add(_normalize(path))
+
+    for _, _, url in iter_column_values(conn, URL_COLUMNS):
+        relative = relative_from_url(url)
+        if relative:
+            referenced.add(_normalize(relative))
+
+    for _, _, html in iter_column_values(conn, HTML_COLUMNS):
+        for link in HTML_LINK_RE.findall(html):
+            relative = relative_from_url(link)
+            if relative:
+                referenced.add(_normalize(relative))
+
+    return referenced
+
+
+def _walk_files(root: str) -> Iterator[tuple[str, os.DirEntry]]:
+    """Итеративный обход дерева через os.scandir: (rel. путь от MEDIA_ROOT, DirEntry)."""
+    media_root = settings.media.MEDIA_ROOT
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        yield _normalize(os.path.relpath(entry.path, media_root)), entry
+        except FileNotFoundError:
+            continue
+
+
+def _purge_quarantine(quarantine_root: str, retention_days: int, dry_run: bool) -> list[str]:
+    """Удаляет партии карантина старше retention_days. Возвращает имена партий."""
+    if not os.path.isdir(quarantine_root):
+        return []
+
+    cutoff = time.time() - retention_days * 86400
+    purged: list[str] = []
+    with os.scandir(quarantine_root) as entries:
+        for entry in entries:
+            if not entry.is_dir(follow_symlinks=False):
+                continue
+            if entry.stat(follow_symlinks=False).st_mtime >= cutoff:
+                continue
+            purged.append(entry.name)
+            if not dry_run:
+                shutil.rmtree(entry.path, ignore_errors=True)
+    return sorted(purged)
+
+
+def collect_media_garbage(*, dry_run: bool = True, grace_hours: int | None = None) -> MediaGcReport:
+    """Находит и (если не dry_run) переносит в карантин осиротевшие медиафайлы."""
+    require_local_storage("Media GC")
+    started_at = time.perf_counter()
+    media = settings.media
+    grace_seconds = (grace_hours if grace_hours is not None else media.GC_GRACE_HOURS) * 3600
+    report = MediaGcReport(dry_run=dry_run)
+
+    engine = create_engine(settings.database.sync_dsn, pool_pre_ping=True)
+    try:
+        with engine.connect() as conn:
+            referenced = collect_referenced_paths(conn)
+    finally:
+        engine.dispose()
+    report.referenced_paths = len(referenced)
+
+    quarantine_root = os.path.abspath(media.GC_QUARANTINE_DIR)
+    batch_dir = os.path.join(quarantine_root, datetime.now().strftime("%Y%m%d%H%M%S"))
+    cutoff = time.time() - grace_seconds
+
+    for relative, entry in _walk_files(os.path.join(media.MEDIA_ROOT, MEDIA_SUBDIR)):
+        report.scanned_files += 1
+        if relative in referenced:
+            continue
+
+        stat = entry.stat(follow_symlinks=False)
+        if stat.st_mtime > cutoff:
+            report.skipped_recent += 1
+            continue
+
+        report.orphaned_files += 1
+        report.orphaned_bytes += stat.st_size
+        if len(report.sample) < _REPORT_SAMPLE_SIZE:
+            report.sample.append(relative)
+
+        if dry_run:
+            logger.info("Media GC (dry run): orphan %s", relative)
+            continue
+
+        destination = os.path.join(batch_dir, relative)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        shutil.move(abs_path(relative), destination)
+        report.quarantined_files += 1
+        logger.info("Media GC: quarantined %s", relative)
+
+    if report.quarantined_files:
+        report.quarantine_dir = batch_dir
+
+    report.purged_batches = _purge_quarantine(
+        quarantine_root,
+        media.GC_QUARANTINE_RETENTION_DAYS,
+        dry_run,
+    )
+    report.duration_seconds = time.perf_counter() - started_at
+    logger.info(
+        "Media GC finished: scanned=%s orphaned=%s (%s bytes) quarantined=%s dry_run=%s",
+        report.scanned_files,
+        report.orphaned_files,
+        report.orphaned_bytes,
+        report.quarantined_files,
+        dry_run,
+    )
+    return report
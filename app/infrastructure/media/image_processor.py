@@ -3,8 +3,17 @@
 Реализует логику обработки изображений, которая в Django была разбита между:
   - imagekit.processors.ResizeToFill             → _resize_to_fill()
   - imagekit.models.ProcessedImageField           → save_carousel_photo()
+  - upload_to='media/' + уникальное имя           → content_addressed_filename() (SHA-256)
   - imagekit.models.ImageSpecField                → (read-only превью, делается на лету)
   - Celery-задача slide_to_webp в core/models.py → make_webp_sync() / make_webp_async()
+  - AdminThumbnail + ImageSpecField(avatarimage)   → make_thumbnail_sync()
+
+WebP кодируется либо с фиксированным WEBP_QUALITY (как в Django), либо —
+если задан WEBP_TARGET_SSIM — с минимальным качеством, при котором SSIM
+по яркости не ниже цели (см. encode_webp_for_ssim()).
+
+Файлы читаются и пишутся только через MediaStorage (см. backends.py),
+поэтому обработка работает одинаково с локальным диском и с S3.
 
 Все блокирующие операции Pillow выполняются через asyncio.to_thread(),
 чтобы не блокировать event loop FastAPI.
@@ -13,13 +22,22 @@
 """
 
 import asyncio
+import base64
+import hashlib
 import io
 import os
-import uuid
+from dataclasses import dataclass
 
+import numpy as np
 from PIL import Image
 
-from app.infrastructure.media.storage import abs_path, ensure_dir, webp_url_path
+from app.infrastructure.media.backends import get_media_storage
+from app.infrastructure.media.storage import (
+    sharded_relative_path,
+    thumbnail_relative_path,
+    url_path,
+    webp_relative_path,
+)
 from app.settings.config import settings
 
 
@@ -47,19 +65,136 @@ def _resize_to_fill(img: Image.Image, width: int, height: int) -> Image.Image:
     return img.crop((left, top, left + width, top + height))
 
 
+# ---------------------------------------------------------------------------
+# Превью для админки — аналог AdminThumbnail(image_field='avatarimage')
+# ---------------------------------------------------------------------------
+
+
+def _write_thumbnail(img: Image.Image, photo_relative_path: str) -> str:
+    """Сохраняет WebP-превью уже открытого изображения. Возвращает rel. путь превью.
+
+    Превью кропается по центру до THUMBNAIL_WIDTH × THUMBNAIL_HEIGHT,
+    поэтому в списках админки можно указывать явные размеры <img>.
+    """
+    width = settings.media.THUMBNAIL_WIDTH
+    height = settings.media.THUMBNAIL_HEIGHT
+    rel_dest = thumbnail_relative_path(photo_relative_path)
+
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    # Сначала дешёвое уменьшение (reducing_gap), потом точный кроп —
+    # LANCZOS по 2050×544 ради 120×80 был бы пустой тратой CPU.
+    img = img.copy()
+    img.thumbnail((width * 4, height * 4), Image.BILINEAR, reducing_gap=2.0)
+    thumb = _resize_to_fill(img, width, height)
+    get_media_storage().save(
+        rel_dest,
+        _encode(thumb, "WEBP", quality=settings.media.THUMBNAIL_QUALITY),
+    )
+    return rel_dest
+
+
+def _open_media_image(relative: str) -> Image.Image:
+    """Открывает изображение из хранилища. FileNotFoundError, если файла нет."""
+    try:
+        payload = get_media_storage().read(relative)
+    except FileNotFoundError as exc:
+        raise FileNotFoundError(f"Source photo not found: {relative}") from exc
+    return Image.open(io.BytesIO(payload))
+
+
+def make_thumbnail_sync(photo_relative_path: str) -> str:
+    """Строит WebP-превью для уже сохранённого оригинала. Возвращает rel. путь превью.
+
+    Используется для backfill существующих записей (см. app.infrastructure.media.cli);
+    для новых загрузок превью строится сразу в save_*_photo_sync().
+    """
+    with _open_media_image(photo_relative_path) as img:
+        # Для JPEG draft() декодирует сразу в уменьшенном масштабе (1/2…1/8)
+        img.draft("RGB", (settings.media.THUMBNAIL_WIDTH * 2, settings.media.THUMBNAIL_HEIGHT * 2))
+        return _write_thumbnail(img, photo_relative_path)
+
+
+# ---------------------------------------------------------------------------
+# LQIP-плейсхолдер + исходные размеры для публичных страниц
+# ---------------------------------------------------------------------------
+
+
+@dataclass(frozen=True, slots=True)
+class Placeholder:
+    """Исходные размеры изображения и data: URI размытого плейсхолдера."""
+
+    width: int
+    height: int
+    lqip: str
+
+
+def make_placeholder_sync(photo_relative_path: str) -> Placeholder:
+    """Строит LQIP (WebP LQIP_SIZE px, base64) и возвращает его с размерами оригинала.
+
+    width/height дают шаблонам явные размеры <img> (нет layout shift),
+    lqip выводится inline как фон/placeholder — без отдельного запроса.
+    """
+    size = settings.media.LQIP_SIZE
+    with _open_media_image(photo_relative_path) as img:
+        width, height = img.size
+        img.draft("RGB", (size * 4, size * 4))
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        tiny = img.copy()
+        tiny.thumbnail((size, size), Image.BILINEAR, reducing_gap=2.0)
+
+    payload = encode_webp(tiny, settings.media.LQIP_QUALITY)
+    lqip = "data:image/webp;base64," + base64.b64encode(payload).decode("ascii")
+    return Placeholder(width=width, height=height, lqip=lqip)
+
+
 # ---------------------------------------------------------------------------
 # Сохранение и обработка файлов (sync, для Celery и тестов)
 # ---------------------------------------------------------------------------
 
 
-def _unique_filename(original: str) -> str:
-    """Генерирует уникальное имя файла с сохранением расширения.
+def content_addressed_filename(payload: bytes, ext: str) -> str:
+    """Имя файла по содержимому: SHA-256 от итоговых (уже обработанных) байт.
 
-    Зеркалирует поведение Django upload_to='media/', где Django сам
-    добавляет суффикс при коллизии имён.
+    Одинаковое фото, загруженное для нескольких позиций/слайдов, после
+    обработки даёт одинаковые байты — и, значит, одно имя, один файл,
+    один набор WebP/превью и одну копию в бэкапе.
     """
-    ext = os.path.splitext(original)[1].lower() or ".jpg"
-    return f"{uuid.uuid4().hex}{ext}"
+    return f"{hashlib.sha256(payload).hexdigest()}{ext}"
+
+
+def _encode(img: Image.Image, fmt: str, **params: object) -> bytes:
+    """Кодирует изображение в память (нужно, чтобы посчитать хеш до записи)."""
+    buffer = io.BytesIO()
+    img.save(buffer, fmt, **params)
+    return buffer.getvalue()
+
+
+def _store_content_addressed(payload: bytes, ext: str, subdir: str = "media") -> tuple[str, bool]:
+    """Сохраняет payload под content-addressed именем. Возвращает (rel. путь, создан ли файл).
+
+    Файл кладётся в каталог шарда subdir/ab/cd/ по первым символам хеша.
+    Если файл с таким хешем уже есть — он не перезаписывается: содержимое
+    по определению совпадает. Запись атомарная (это гарантирует драйвер
+    хранилища), чтобы параллельная загрузка того же фото не увидела полуфайл.
+    """
+    rel_path = sharded_relative_path(subdir, content_addressed_filename(payload, ext))
+    storage = get_media_storage()
+    if storage.exists(rel_path):
+        return rel_path, False
+
+    storage.save(rel_path, payload)
+    return rel_path, True
+
+
+def _store_processed_jpeg(img: Image.Image, quality: int) -> str:
+    """Кодирует JPEG, сохраняет по хешу и при необходимости строит превью."""
+    payload = _encode(img, "JPEG", quality=quality)
+    rel_path, created = _store_content_addressed(payload, ".jpg")
+    if created or not get_media_storage().exists(thumbnail_relative_path(rel_path)):
+        _write_thumbnail(img, rel_path)
+    return rel_path
 
 
 def save_carousel_photo_sync(content: bytes, original_filename: str) -> str:
@@ -72,26 +207,185 @@ def save_carousel_photo_sync(content: bytes, original_filename: str) -> str:
         options={'quality': 90},
     )
 
-    Возвращаемое значение — путь относительно MEDIA_ROOT, например 'media/abc123.jpg'.
+    Возвращаемое значение — путь относительно MEDIA_ROOT, например 'media/ab/cd/<sha256>.jpg'.
     Именно это значение записывается в MainCarousel.photo.
     """
-    filename = _unique_filename(original_filename)
-    subdir = os.path.join(settings.media.MEDIA_ROOT, "media")
-    ensure_dir(subdir)
-    dest = os.path.join(subdir, filename)
-
     img = Image.open(io.BytesIO(content))
     if img.mode not in ("RGB", "L"):
         img = img.convert("RGB")
 
     img = _resize_to_fill(img, settings.media.CAROUSEL_WIDTH, settings.media.CAROUSEL_HEIGHT)
-    img.save(dest, "JPEG", quality=settings.media.CAROUSEL_QUALITY)
 
     # Относительный путь от MEDIA_ROOT — именно он хранится в БД
-    return os.path.join("media", filename)
+    return _store_processed_jpeg(img, settings.media.CAROUSEL_QUALITY)
+
+
+# ---------------------------------------------------------------------------
+# WebP: фиксированное качество или подбор по SSIM
+# ---------------------------------------------------------------------------
+
+# Константы SSIM для 8-битных данных (Wang et al., 2004)
+_SSIM_C1 = (0.01 * 255) ** 2
+_SSIM_C2 = (0.03 * 255) ** 2
+_SSIM_BLOCK = 8
 
+# Метаданные в WebP не нужны: EXIF (в т.ч. GPS с телефона) и ICC-профиль
+# только увеличивают файл, который отдаётся посетителям.
+_WEBP_STRIP_METADATA = {"exif": b"", "icc_profile": None}
 
-def make_webp_sync(photo_relative_path: str, quality: int | None = None) -> str:
+
+@dataclass(frozen=True, slots=True)
+class WebpResult:
+    """Результат конвертации в WebP.
+
+    quality/ssim — None, если файл уже был актуален и не перекодировался.
+    ssim считается только в режиме подбора качества.
+    """
+
+    url: str
+    quality: int | None
+    size: int
+    ssim: float | None = None
+
+
+def _luma(img: Image.Image, max_side: int) -> np.ndarray:
+    """Яркостный канал, уменьшенный до max_side по длинной стороне."""
+    gray = img.convert("L")
+    gray.thumbnail((max_side, max_side), Image.BILINEAR)
+    return np.asarray(gray, dtype=np.float64)
+
+
+def _ssim(reference: np.ndarray, candidate: np.ndarray) -> float:
+    """Средний SSIM по непересекающимся окнам 8×8.
+
+    Окна без перекрытия вместо гауссова окна — на порядок дешевле и для
+    сравнения уровней качества одного и того же изображения достаточно точно.
+    """
+    block = min(_SSIM_BLOCK, reference.shape[0], reference.shape[1])
+    rows = reference.shape[0] // block
+    cols = reference.shape[1] // block
+    shape = (rows, block, cols, block)
+    a = reference[: rows * block, : cols * block].reshape(shape)
+    b = candidate[: rows * block, : cols * block].reshape(shape)
+
+    mu_a = a.mean(axis=(1, 3))
+    mu_b = b.mean(axis=(1, 3))
+    var_a = a.var(axis=(1, 3))
+    var_b = b.var(axis=(1, 3))
+    cov = ((a - mu_a[:, None, :, None]) * (b - mu_b[:, None, :, None])).mean(axis=(1, 3))
+
+    ssim_map = ((2 * mu_a * mu_b + _SSIM_C1) * (2 * cov + _SSIM_C2)) / (
+        (mu_a**2 + mu_b**2 + _SSIM_C1) * (var_a + var_b + _SSIM_C2)
+    )
+    return float(ssim_map.mean())
+
+
+def _webp_ssim(reference: np.ndarray, payload: bytes, max_side: int) -> float:
+    with Image.open(io.BytesIO(payload)) as decoded:
+        return _ssim(reference, _luma(decoded, max_side))
+
+
+def encode_webp(img: Image.Image, quality: int) -> bytes:
+    """Кодирует WebP с фиксированным качеством, без метаданных."""
+    return _encode(img, "WEBP", quality=quality, **_WEBP_STRIP_METADATA)
+
+
+def measure_webp_ssim(img: Image.Image, payload: bytes) -> float:
+    """SSIM закодированного WebP относительно исходного изображения."""
+    max_side = settings.media.WEBP_SSIM_SIZE
+    return _webp_ssim(_luma(img, max_side), payload, max_side)
+
+
+def encode_webp_for_ssim(
+    img: Image.Image,
+    target_ssim: float,
+    min_quality: int | None = None,
+    max_quality: int | None = None,
+) -> tuple[bytes, int, float]:
+    """Кодирует WebP с минимальным качеством, дающим SSIM >= target_ssim.
+
+    Бинарный поиск по quality (≈7 кодирований на диапазон 10…90); SSIM
+    считается по яркости, уменьшенной до WEBP_SSIM_SIZE, — так оценка
+    стоит меньше самого кодирования. Если цель недостижима даже на
+    max_quality, возвращается результат max_quality.
+
+    Возвращает (байты WebP, выбранное quality, SSIM).
+    """
+    media = settings.media
+    lo = min_quality if min_quality is not None else media.WEBP_MIN_QUALITY
+    hi = max_quality if max_quality is not None else media.WEBP_MAX_QUALITY
+    ceiling = hi
+    reference = _luma(img, media.WEBP_SSIM_SIZE)
+
+    best: tuple[bytes, int, float] | None = None
+    while lo <= hi:
+        quality = (lo + hi) // 2
+        payload = encode_webp(img, quality)
+        score = _webp_ssim(reference, payload, media.WEBP_SSIM_SIZE)
+        if score >= target_ssim:
+            best = (payload, quality, score)
+            hi = quality - 1
+        else:
+            lo = quality + 1
+
+    if best is None:
+        payload = encode_webp(img, ceiling)
+        best = (payload, ceiling, _webp_ssim(reference, payload, media.WEBP_SSIM_SIZE))
+    return best
+
+
+def convert_webp_sync(
+    photo_relative_path: str,
+    quality: int | None = None,
+    force: bool = False,
+    target_ssim: float | None = None,
+) -> WebpResult:
+    """Конвертирует исходник в WebP рядом с ним и сообщает выбранное качество.
+
+    Режим кодирования:
+      - quality задан явно                 → фиксированное качество;
+      - иначе target_ssim / WEBP_TARGET_SSIM → подбор качества по SSIM;
+      - иначе                              → фиксированное WEBP_QUALITY.
+
+    Если WebP уже существует и не старше исходника (тот же content-addressed
+    файл, уже сконвертированный для другой записи), повторная конвертация
+    пропускается. force=True конвертирует в любом случае.
+    """
+    storage = get_media_storage()
+    source_stat = storage.stat(photo_relative_path)
+    if source_stat is None:
+        raise FileNotFoundError(f"Source photo not found: {photo_relative_path}")
+
+    webp_rel = webp_relative_path(photo_relative_path)
+    webp_url = url_path(webp_rel)
+
+    if not force:
+        webp_stat = storage.stat(webp_rel)
+        if webp_stat is not None and webp_stat.modified_at >= source_stat.modified_at:
+            return WebpResult(url=webp_url, quality=None, size=webp_stat.size)
+
+    if quality is None and target_ssim is None:
+        target_ssim = settings.media.WEBP_TARGET_SSIM
+
+    score: float | None = None
+    with _open_media_image(photo_relative_path) as img:
+        if img.mode not in ("RGB", "RGBA", "L"):
+            img = img.convert("RGB")
+        if quality is None and target_ssim is not None:
+            payload, chosen, score = encode_webp_for_ssim(img, target_ssim)
+        else:
+            chosen = quality if quality is not None else settings.media.WEBP_QUALITY
+            payload = encode_webp(img, chosen)
+
+    storage.save(webp_rel, payload)
+    return WebpResult(url=webp_url, quality=chosen, size=len(payload), ssim=score)
+
+
+def make_webp_sync(
+    photo_relative_path: str,
+    quality: int | None = None,
+    force: bool = False,
+) -> str:
     """Конвертирует JPEG в WebP. Возвращает URL-путь для записи в photo_webp.
 
     Аналог Celery-задачи slide_to_webp из core/models.py Django:
@@ -101,22 +395,11 @@ def make_webp_sync(photo_relative_path: str, quality: int | None = None) -> str:
 
     photo_relative_path — значение из MainCarousel.photo, напр. 'media/abc123.jpg'.
     Возвращает URL вида '/media/media/abc123.webp' для записи в MainCarousel.photo_webp.
-    """
-    q = quality if quality is not None else settings.media.WEBP_QUALITY
-    abs_src = abs_path(photo_relative_path)
-
-    if not os.path.isfile(abs_src):
-        raise FileNotFoundError(f"Source photo not found: {abs_src}")
-
-    base_name = os.path.splitext(os.path.basename(abs_src))[0]
-    webp_name = base_name + ".webp"
-    dest_dir = os.path.dirname(abs_src)
-    abs_dest = os.path.join(dest_dir, webp_name)
 
-    img = Image.open(abs_src)
-    img.save(abs_dest, "webp", quality=q)
-
-    return webp_url_path(abs_dest)
+    Тонкая обёртка над convert_webp_sync() для вызывающих, которым не нужно
+    выбранное качество.
+    """
+    return convert_webp_sync(photo_relative_path, quality=quality, force=force).url
 
 
 # ---------------------------------------------------------------------------
@@ -133,9 +416,18 @@ async def save_carousel_photo(content: bytes, original_filename: str) -> str:
     return await asyncio.to_thread(save_carousel_photo_sync, content, original_filename)
 
 
-async def make_webp(photo_relative_path: str, quality: int | None = None) -> str:
+async def make_webp(
+    photo_relative_path: str,
+    quality: int | None = None,
+    force: bool = False,
+) -> str:
     """Async-обёртка над make_webp_sync."""
-    return await asyncio.to_thread(make_webp_sync, photo_relative_path, quality)
+    return await asyncio.to_thread(make_webp_sync, photo_relative_path, quality, force)
+
+
+async def make_thumbnail(photo_relative_path: str) -> str:
+    """Async-обёртка над make_thumbnail_sync."""
+    return await asyncio.to_thread(make_thumbnail_sync, photo_relative_path)
 
 
 # ---------------------------------------------------------------------------
@@ -156,23 +448,45 @@ def save_position_photo_sync(content: bytes, original_filename: str) -> str:
     Django-модель Position.photo2 / foto_app / foto_rss сохранялись без ресайза
     (кроме foto_rss с ResizeToFill(70, 70), но это мелкий частный случай).
 
-    Возвращаемое значение — путь относительно MEDIA_ROOT, например 'media/abc123.jpg'.
+    Возвращаемое значение — путь относительно MEDIA_ROOT, например 'media/ab/cd/<sha256>.jpg'.
     """
-    filename = _unique_filename(original_filename)
-    subdir = os.path.join(settings.media.MEDIA_ROOT, "media")
-    ensure_dir(subdir)
-    dest = os.path.join(subdir, filename)
-
     img = Image.open(io.BytesIO(content))
     if img.mode not in ("RGB", "L"):
         img = img.convert("RGB")
 
-    img.save(dest, "JPEG", quality=90)
-
     # Относительный путь от MEDIA_ROOT — именно он хранится в БД
-    return os.path.join("media", filename)
+    return _store_processed_jpeg(img, 90)
 
 
 async def save_position_photo(content: bytes, original_filename: str) -> str:
     """Async-обёртка над save_position_photo_sync для использования в FastAPI."""
     return await asyncio.to_thread(save_position_photo_sync, content, original_filename)
+
+
+# ---------------------------------------------------------------------------
+# Изображения из TinyMCE (RichTextUploadField)
+# ---------------------------------------------------------------------------
+
+# Pillow-формат по расширению загруженного файла
+_EDITOR_FORMATS = {".jpg": "JPEG", ".jpeg": "JPEG", ".png": "PNG", ".gif": "GIF", ".webp": "WEBP"}
+
+
+def save_editor_image_sync(content: bytes, original_filename: str) -> str:
+    """Сохраняет изображение, вставленное в TinyMCE. Возвращает URL для редактора.
+
+    Файл перекодируется в исходный формат (по расширению) и кладётся
+    в media/uploads/ab/cd/ под content-addressed именем — повторная вставка
+    той же картинки в разные тексты не плодит копии.
+    """
+    ext = os.path.splitext(original_filename)[1].lower() or ".jpg"
+    fmt = _EDITOR_FORMATS.get(ext, "JPEG")
+
+    img = Image.open(io.BytesIO(content))
+    if img.mode not in ("RGB", "RGBA", "L"):
+        img = img.convert("RGB")
+    if fmt == "JPEG" and img.mode == "RGBA":
+        img = img.convert("RGB")
+
+    payload = _encode(img, fmt, quality=90)
+    rel_path, _ = _store_content_addressed(payload, ext, subdir=os.path.join("media", "uploads"))
+    return url_path(rel_path)
@@ -0,0 +1,230 @@
+"""Массовая перекодировка WebP (и превью) для существующих записей.
+
+Нужна, когда меняется WEBP_QUALITY / WEBP_TARGET_SSIM или размер превью:
+иначе WebP пересоздаётся только при пересохранении каждой записи в админке.
+
+Как работает:
+  - строки с изображениями (catalog.WEBP_COLUMNS) читаются по возрастанию id
+    пачками по batch_size;
+  - конвертация пачки раздаётся в ProcessPoolExecutor (Pillow держит GIL
+    на части операций, поэтому процессы, а не потоки);
+  - URL WebP и выбранное качество для всей пачки пишутся одним
+    executemany UPDATE;
+  - после коммита пачки в checkpoint-файл записывается последний id колонки.
+    Прерванный запуск продолжается с этого места; checkpoint привязан к
+    режиму кодирования (quality или целевой SSIM) — при другом режиме
+    проход начинается заново.
+
+Одинаковые пути (content-addressed файлы, общие для нескольких записей)
+конвертируются один раз за запуск.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+from pathlib import Path
+
+from sqlalchemy import bindparam, create_engine, update
+from sqlalchemy.engine import Engine
+
+from app.infrastructure.media.catalog import WEBP_COLUMNS, WebpColumn, iter_column_values
+from app.infrastructure.media.image_processor import (
+    WebpResult,
+    convert_webp_sync,
+    make_thumbnail_sync,
+)
+from app.settings.config import settings
+
+
+logger = logging.getLogger("app.media")
+
+
+@dataclass(slots=True)
+class ReencodeReport:
+    quality: int | None
+    target_ssim: float | None
+    workers: int
+    converted: int = 0
+    bytes_written: int = 0
+    reused: int = 0
+    failed: int = 0
+    updated_rows: int = 0
+    resumed_columns: dict[str, int] = field(default_factory=dict)
+    duration_seconds: float = 0.0
+    images_per_second: float = 0.0
+
+
+def _reencode_one(
+    path: str,
+    quality: int | None,
+    target_ssim: float | None,
+    thumbnails: bool,
+) -> tuple[str, WebpResult | None, str | None]:
+    """Выполняется в дочернем процессе: (путь, результат | None, ошибка | None)."""
+    try:
+        result = convert_webp_sync(path, quality=quality, force=True, target_ssim=target_ssim)
+        if thumbnails:
+            make_thumbnail_sync(path)
+    except Exception as exc:  # noqa: BLE001 — ошибка одной картинки не валит весь проход
+        return path, None, f"{type(exc).__name__}: {exc}"
+    return path, result, None
+
+
+class _Checkpoint:
+    """JSON-файл с последним обработанным id по каждой колонке."""
+
+    def __init__(self, path: Path, profile: str, restart: bool) -> None:
+        self.path = path
+        self.profile = profile
+        self.done: dict[str, int] = {}
+
+        if restart or not path.exists():
+            return
+        data = json.loads(path.read_text(encoding="utf-8"))
+        if data.get("profile") != profile:
+            logger.warning(
+                "Checkpoint %s is for %s, starting over with %s",
+                path,
+                data.get("profile"),
+                profile,
+            )
+            return
+        self.done = {key: int(value) for key, value in data.get("done", {}).items()}
+
+    def save(self, label: str, last_id: int) -> None:
+        self.done[label] = last_id
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(
+            json.dumps({"profile": self.profile, "done": self.done}, indent=2),
+            encoding="utf-8",
+        )
+        os.replace(tmp_path, self.path)
+
+    def clear(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+def _write_batch(
+    engine: Engine,
+    webp_column: WebpColumn,
+    rows: list[tuple[int, WebpResult]],
+) -> int:
+    """Один executemany UPDATE на пачку строк."""
+    if not rows:
+        return 0
+    table = webp_column.source.model.__table__
+    values = {target: bindparam("b_webp") for target in webp_column.targets}
+    values[webp_column.quality_column] = bindparam("b_quality")
+    stmt = update(table).where(table.c.id == bindparam("b_id")).values(values)
+    with engine.begin() as conn:
+        conn.execute(
+            stmt,
+            [
+                {"b_id": row_id, "b_webp": result.url, "b_quality": result.quality}
+                for row_id, result in rows
+            ],
+        )
+    return len(rows)
+
+
+def reencode_media(
+    *,
+    quality: int | None = None,
+    target_ssim: float | None = None,
+    workers: int | None = None,
+    batch_size: int = 200,
+    thumbnails: bool = False,
+    checkpoint_path: str = "tmp/media_reencode_checkpoint.json",
+    restart: bool = False,
+) -> ReencodeReport:
+    """Перекодирует WebP для всех записей с изображениями.
+
+    quality — фиксированное качество; target_ssim — подбор качества по SSIM.
+    Без обоих действует тот же выбор, что и в Celery-задачах
+    (WEBP_TARGET_SSIM, иначе WEBP_QUALITY).
+    """
+    if quality is None and target_ssim is None:
+        target_ssim = settings.media.WEBP_TARGET_SSIM
+        if target_ssim is None:
+            quality = settings.media.WEBP_QUALITY
+    if quality is not None:
+        target_ssim = None
+    profile = f"quality={quality}" if quality is not None else f"ssim={target_ssim}"
+
+    resolved_workers = workers or os.cpu_count() or 1
+    report = ReencodeReport(quality=quality, target_ssim=target_ssim, workers=resolved_workers)
+    checkpoint = _Checkpoint(Path(checkpoint_path), profile, restart)
+    converted: dict[str, WebpResult | None] = {}
+
+    started_at = time.perf_counter()
+    engine = create_engine(settings.database.sync_dsn, pool_pre_ping=True)
+    try:
+        with ProcessPoolExecutor(max_workers=resolved_workers) as executor, engine.connect() as reader:
+            for webp_column in WEBP_COLUMNS:
+                label = webp_column.source.label
+                after_id = checkpoint.done.get(label)
+                if after_id is not None:
+                    report.resumed_columns[label] = after_id
+
+                rows = (
+                    (row_id, path)
+                    for _, row_id, path in iter_column_values(
+                        reader,
+                        (webp_column.source,),
+                        batch_size=batch_size,
+                        after_id=after_id,
+                    )
+                )
+                while batch := list(islice(rows, batch_size)):
+                    pending = sorted({path for _, path in batch if path not in converted})
+                    report.reused += len(batch) - len(pending)
+                    results = executor.map(
+                        _reencode_one,
+                        pending,
+                        [quality] * len(pending),
+                        [target_ssim] * len(pending),
+                        [thumbnails] * len(pending),
+                        chunksize=max(1, len(pending) // (resolved_workers * 4)),
+                    )
+                    for path, result, error in results:
+                        converted[path] = result
+                        if result is None:
+                            report.failed += 1
+                            logger.warning("%s: re-encode failed for %s: %s", label, path, error)
+                        else:
+                            report.converted += 1
+                            report.bytes_written += result.size
+
+                    updates = [
+                        (row_id, result)
+                        for row_id, path in batch
+                        if (result := converted.get(path)) is not None
+                    ]
+                    report.updated_rows += _write_batch(engine, webp_column, updates)
+                    checkpoint.save(label, batch[-1][0])
+
+                    elapsed = time.perf_counter() - started_at
+                    logger.info(
+                        "%s: up to id=%s, converted=%s (%.1f img/s)",
+                        label,
+                        batch[-1][0],
+                        report.converted,
+                        report.converted / elapsed if elapsed else 0.0,
+                    )
+    finally:
+        engine.dispose()
+
+    report.duration_seconds = time.perf_counter() - started_at
+    if report.duration_seconds:
+        report.images_per_second = report.converted / report.duration_seconds
+    # Проход завершён целиком — следующий запуск начнётся с начала.
+    # Ошибки отдельных файлов только логируются: их не исправит повтор.
+    checkpoint.clear()
+    return report
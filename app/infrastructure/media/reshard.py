@@ -0,0 +1,270 @@
+"""Онлайн-перенос существующих медиафайлов в шардированное дерево.
+
+Новые загрузки сразу ложатся в ``media/ab/cd/<имя>`` (см. storage.py),
+а этот модуль переносит то, что лежит плоско в ``media/`` и ``media/uploads/``.
+
+Перенос «онлайн» — сайт и админка работают во время прохода:
+  1. Для каждого плоского пути из БД создаётся жёсткая ссылка (или копия,
+     если ФС не умеет ссылки) по новому пути — вместе с WebP и превью.
+     Старый путь продолжает отдаваться, пока на него ссылаются страницы.
+  2. Пачкой в одной транзакции переписываются ссылки в БД:
+     пути (catalog.IMAGE_COLUMNS / EXTRA_PATH_COLUMNS), URL WebP
+     (catalog.WEBP_COLUMNS) и <img src> внутри TinyMCE-полей.
+     UPDATE условный (``WHERE col = :старое значение``), поэтому запись,
+     отредактированная в админке во время прохода, не перетирается.
+  3. Старые файлы больше ни на что не ссылаются и уходят в карантин
+     при следующем запуске media GC.
+
+Проход идемпотентен: уже шардированные значения пропускаются, поэтому
+прерванный запуск продолжается повторным вызовом той же команды.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import shutil
+import time
+import uuid
+from collections.abc import Iterable
+from dataclasses import dataclass
+from itertools import islice
+
+from sqlalchemy import and_, bindparam, create_engine, update
+from sqlalchemy.engine import Connection, Engine
+
+from app.infrastructure.media.backends import require_local_storage
+from app.infrastructure.media.catalog import (
+    EXTRA_PATH_COLUMNS,
+    HTML_COLUMNS,
+    HTML_LINK_RE,
+    IMAGE_COLUMNS,
+    WEBP_COLUMNS,
+    MediaColumn,
+    iter_column_values,
+)
+from app.infrastructure.media.storage import (
+    abs_path,
+    ensure_dir,
+    is_sharded,
+    relative_from_url,
+    reshard_relative_path,
+    thumbnail_relative_path,
+    url_path,
+    webp_relative_path,
+)
+from app.settings.config import settings
+
+
+logger = logging.getLogger("app.media")
+
+# Только файлы внутри MEDIA_ROOT/media/ (как и у media GC)
+_MEDIA_PREFIX = "media/"
+
+
+@dataclass(slots=True)
+class ReshardReport:
+    dry_run: bool
+    paths_resharded: int = 0
+    files_linked: int = 0
+    missing_sources: int = 0
+    skipped_too_long: int = 0
+    rows_updated: int = 0
+    html_rows_updated: int = 0
+    duration_seconds: float = 0.0
+
+
+class _Resharder:
+    """Состояние одного прохода: кеш «старый путь → новый» и отчёт."""
+
+    def __init__(self, engine: Engine, batch_size: int, dry_run: bool) -> None:
+        self.engine = engine
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.report = ReshardReport(dry_run=dry_run)
+        # None — путь не переносится (нет файла или новый путь не влезает в колонку)
+        self.moved: dict[str, str | None] = {}
+
+    # ------------------------------------------------------------------
+    # Файлы
+    # ------------------------------------------------------------------
+
+    def _link(self, relative: str, new_relative: str) -> None:
+        """Жёсткая ссылка (или копия) старого файла по новому пути."""
+        source = abs_path(relative)
+        destination = abs_path(new_relative)
+        if not os.path.isfile(source) or os.path.exists(destination):
+            return
+        self.report.files_linked += 1
+        if self.dry_run:
+            return
+
+        ensure_dir(os.path.dirname(destination))
+        tmp_path = f"{destination}.{uuid.uuid4().hex}.tmp"
+        try:
+            try:
+                os.link(source, tmp_path)
+            except OSError:
+                shutil.copy2(source, tmp_path)
+            os.replace(tmp_path, destination)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    def move(self, relative: str, with_derived: bool, max_length: int | None) -> str | None:
+        """Переносит файл (и его WebP/превью) в шард. Возвращает новый путь или None."""
+        if relative in self.moved:
+            return self.moved[relative]
+
+        new_relative = reshard_relative_path(relative)
+        if max_length is not None and len(new_relative) > max_length:
+            logger.warning("Reshard: %s does not fit into %s chars, skipped", relative, max_length)
+            self.report.skipped_too_long += 1
+            self.moved[relative] = None
+            return None
+        if not os.path.isfile(abs_path(relative)) and not os.path.isfile(abs_path(new_relative)):
+            logger.warning("Reshard: source not found: %s", relative)
+            self.report.missing_sources += 1
+            self.moved[relative] = None
+            return None
+
+        self._link(relative, new_relative)
+        if with_derived:
+            self._link(webp_relative_path(relative), webp_relative_path(new_relative))
+            self._link(thumbnail_relative_path(relative), thumbnail_relative_path(new_relative))
+
+        self.report.paths_resharded += 1
+        self.moved[relative] = new_relative
+        return new_relative
+
+    # ------------------------------------------------------------------
+    # Колонки с путями
+    # ------------------------------------------------------------------
+
+    def _rewrite_paths(self, media_column: MediaColumn, pairs: dict[str, str]) -> None:
+        """Переписывает путь и URL его WebP одной транзакцией."""
+        table = media_column.model.__table__
+        column = table.c[media_column.column]
+        params = [{"b_old": old, "b_new": new} for old, new in pairs.items()]
+        webp_targets = next(
+            (w.targets for w in WEBP_COLUMNS if w.source == media_column),
+            (),
+        )
+        with self.engine.begin() as conn:
+            conn.execute(
+                update(table)
+                .where(column == bindparam("b_old"))
+                .values({media_column.column: bindparam("b_new")}),
+                params,
+            )
+            if not webp_targets:
+                return
+            url_params = [
+                {
+                    "b_old": url_path(webp_relative_path(old)),
+                    "b_new": url_path(webp_relative_path(new)),
+                }
+                for old, new in pairs.items()
+            ]
+            for target in webp_targets:
+                conn.execute(
+                    update(table)
+                    .where(table.c[target] == bindparam("b_old"))
+                    .values({target: bindparam("b_new")}),
+                    url_params,
+                )
+
+    def reshard_path_column(self, reader: Connection, media_column: MediaColumn) -> None:
+        with_derived = media_column in IMAGE_COLUMNS
+        max_length = media_column.model.__table__.c[media_column.column].type.length
+        rows = (
+            (row_id, path)
+            for _, row_id, path in iter_column_values(reader, (media_column,), self.batch_size)
+        )
+        while batch := list(islice(rows, self.batch_size)):
+            pairs: dict[str, str] = {}
+            for _, path in batch:
+                if not path.startswith(_MEDIA_PREFIX) or is_sharded(path):
+                    continue
+                new_path = self.move(path, with_derived, max_length)
+                if new_path:
+                    pairs[path] = new_path
+            if not pairs:
+                continue
+            if not self.dry_run:
+                self._rewrite_paths(media_column, pairs)
+            self.report.rows_updated += sum(1 for _, path in batch if path in pairs)
+            logger.info("Reshard %s: up to id=%s", media_column.label, batch[-1][0])
+
+    # ------------------------------------------------------------------
+    # TinyMCE-поля
+    # ------------------------------------------------------------------
+
+    def _rewrite_html(self, html: str) -> str:
+        for link in set(HTML_LINK_RE.findall(html)):
+            relative = relative_from_url(link)
+            if (
+                not relative
+                or not relative.startswith(_MEDIA_PREFIX)
+                or is_sharded(relative)
+                or relative not in link
+            ):
+                continue
+            new_relative = self.move(relative, with_derived=False, max_length=None)
+            if new_relative:
+                html = html.replace(link, link.replace(relative, new_relative))
+        return html
+
+    def reshard_html_column(self, reader: Connection, media_column: MediaColumn) -> None:
+        table = media_column.model.__table__
+        column = table.c[media_column.column]
+        stmt = (
+            update(table)
+            .where(and_(table.c.id == bindparam("b_id"), column == bindparam("b_old")))
+            .values({media_column.column: bindparam("b_new")})
+        )
+        rows: Iterable[tuple[int, str]] = (
+            (row_id, html)
+            for _, row_id, html in iter_column_values(reader, (media_column,), self.batch_size)
+        )
+        while batch := list(islice(rows, self.batch_size)):
+            params = []
+            for row_id, html in batch:
+                new_html = self._rewrite_html(html)
+                if new_html != html:
+                    params.append({"b_id": row_id, "b_old": html, "b_new": new_html})
+            if not params:
+                continue
+            if not self.dry_run:
+                with self.engine.begin() as conn:
+                    conn.execute(stmt, params)
+            self.report.html_rows_updated += len(params)
+
+
+def reshard_media(*, batch_size: int = 200, dry_run: bool = False) -> ReshardReport:
+    """Переносит плоские медиафайлы в media/ab/cd/ и переписывает ссылки в БД."""
+    require_local_storage("Media reshard")
+    started_at = time.perf_counter()
+    engine = create_engine(settings.database.sync_dsn, pool_pre_ping=True)
+    resharder = _Resharder(engine, batch_size, dry_run)
+    try:
+        with engine.connect() as reader:
+            # Исходники первыми: для них переносятся ещё WebP и превью
+            for media_column in IMAGE_COLUMNS + EXTRA_PATH_COLUMNS:
+                resharder.reshard_path_column(reader, media_column)
+            for media_column in HTML_COLUMNS:
+                resharder.reshard_html_column(reader, media_column)
+    finally:
+        engine.dispose()
+
+    report = resharder.report
+    report.duration_seconds = time.perf_counter() - started_at
+    logger.info(
+        "Reshard finished: paths=%s files=%s rows=%s html_rows=%s dry_run=%s",
+        report.paths_resharded,
+        report.files_linked,
+        report.rows_updated,
+        report.html_rows_updated,
+        dry_run,
+    )
+    return report
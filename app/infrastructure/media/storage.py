@@ -16,11 +16,30 @@ Celery-задачи, admin) используют функции отсюда, а
 В шаблонах:
     {{ slide.photo }}     → нужен prefix /media/:  /media/{{ slide.photo }}
     {{ slide.photo_webp }} → уже полный URL: {{ slide.photo_webp }}
+
+Превью для админки
+------------------
+Превью в БД не хранится: его путь однозначно выводится из пути оригинала
+(``media/abc.jpg`` → ``media/thumbs/abc.webp``), см. thumbnail_relative_path().
+
+Шардирование каталогов
+----------------------
+Новые файлы кладутся не плоско в ``media/``, а в двухуровневое дерево
+``media/ab/cd/<имя>`` (sharded_relative_path()), чтобы в одном каталоге не
+копились сотни тысяч записей. Старые плоские пути остаются рабочими;
+перенос существующих файлов — ``python -m app.infrastructure.media.cli shard``.
 """
 
+import hashlib
 import os
+import string
+import urllib.parse
+
 from app.settings.config import settings
 
+# Подкаталог для WebP-превью относительно каталога оригинала
+THUMBNAILS_SUBDIR = "thumbs"
+
 
 def abs_path(relative: str) -> str:
     """Возвращает абсолютный путь к медиафайлу на диске.
@@ -64,6 +83,86 @@ def webp_url_path(abs_webp_path: str) -> str:
     return url_path(rel)
 
 
+def thumbnail_relative_path(relative: str) -> str:
+    """Возвращает относительный путь WebP-превью для оригинала.
+
+    Example:
+        thumbnail_relative_path("media/foo.jpg") -> "media/thumbs/foo.webp"
+    """
+    directory, filename = os.path.split(relative.lstrip("/"))
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(directory, THUMBNAILS_SUBDIR, f"{stem}.webp")
+
+
+def webp_relative_path(relative: str) -> str:
+    """Возвращает относительный путь WebP-версии, которую строит make_webp_sync.
+
+    Example:
+        webp_relative_path("media/foo.jpg") -> "media/foo.webp"
+    """
+    return os.path.splitext(relative.lstrip("/"))[0] + ".webp"
+
+
+def relative_from_url(url: str) -> str | None:
+    """Обратное к url_path(): URL медиафайла → путь относительно MEDIA_ROOT.
+
+    Понимает и абсолютные URL (https://site/media/...). Для URL вне
+    MEDIA_URL возвращает None.
+
+    Example:
+        relative_from_url("/media/media/foo.webp") -> "media/foo.webp"
+    """
+    path = urllib.parse.unquote(urllib.parse.urlsplit(url).path)
+    prefix = "/" + settings.media.MEDIA_URL.strip("/") + "/"
+    if not path.startswith(prefix):
+        return None
+    return path[len(prefix):] or None
+
+
+def _shard_key(filename: str) -> str:
+    """Четыре hex-символа для каталога шарда.
+
+    Content-addressed имена уже начинаются с SHA-256 — берём его начало,
+    чтобы раскладка совпадала с хешем содержимого. Для legacy-имён
+    (``photo_123.jpg``) хешируется само имя.
+    """
+    stem = os.path.splitext(filename)[0].lower()
+    if len(stem) >= 4 and all(char in string.hexdigits for char in stem):
+        return stem[:4]
+    return hashlib.sha256(filename.encode("utf-8")).hexdigest()[:4]
+
+
+def sharded_relative_path(directory: str, filename: str) -> str:
+    """Путь файла в двухуровневом дереве шардов внутри directory.
+
+    Example:
+        sharded_relative_path("media", "3fa9…e1.jpg") -> "media/3f/a9/3fa9…e1.jpg"
+    """
+    key = _shard_key(filename)
+    return os.path.join(directory, key[:2], key[2:4], filename)
+
+
+def is_sharded(relative: str) -> bool:
+    """True, если файл уже лежит в каталоге шарда (``…/ab/cd/<имя>``)."""
+    parts = relative.lstrip("/").replace(os.sep, "/").split("/")
+    if len(parts) < 3:
+        return False
+    return all(
+        len(part) == 2 and all(char in string.hexdigits for char in part)
+        for part in parts[-3:-1]
+    )
+
+
+def reshard_relative_path(relative: str) -> str:
+    """Новый (шардированный) путь для существующего плоского пути.
+
+    Example:
+        reshard_relative_path("media/uploads/foo.png") -> "media/uploads/xx/yy/foo.png"
+    """
+    directory, filename = os.path.split(relative.lstrip("/"))
+    return sharded_relative_path(directory, filename)
+
+
 def ensure_dir(path: str) -> None:
     """Создаёт директорию включая промежуточные, если её нет."""
     os.makedirs(path, exist_ok=True)
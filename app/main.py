@@ -32,6 +32,7 @@ from starlette.middleware.trustedhost import TrustedHostMiddleware
 from starlette.staticfiles import StaticFiles
 
 from app.admin.setup import build_admin, mount_admin_support_routes
+from app.infrastructure.celery.dispatch import task_dispatcher
 from app.infrastructure.db.bootstrap import bootstrap_database
 from app.infrastructure.set_logging import setup_logging
 from app.infrastructure.web.bundler import build_assets
@@ -61,7 +62,10 @@ async def lifespan(app: FastAPI):
 
     yield
 
-    # 3) Dispose resources (DB engines, etc.) managed by Dishka.
+    # 3) Публикуем задачи, которые админка успела поставить перед остановкой.
+    await task_dispatcher.drain()
+
+    # 4) Dispose resources (DB engines, etc.) managed by Dishka.
     await app.state.dishka_container.close()
 
 
@@ -53,6 +53,9 @@ class GetHomePage:
                     "price": p.price,
                     "photo2": p.photo2,
                     "avatar": p.photo2,  # В Django avatar генерировался ImageSpecField(370×260)
+                    "width": p.photo2_width,
+                    "height": p.photo2_height,
+                    "lqip": p.photo2_lqip,
                 }
                 for p in checked
             ]
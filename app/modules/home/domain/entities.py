@@ -31,6 +31,9 @@ class CarouselSlide:
     the legacy Celery task; may be ``None`` if conversion has not finished.
     ``photo_amp`` and ``photo_turbo`` are variants used by AMP / Turbo pages.
     ``text`` contains the rich HTML caption for the slide.
+    ``photo_width`` / ``photo_height`` are the intrinsic size of ``photo`` and
+    ``photo_lqip`` is a tiny blurred placeholder (``data:`` URI); all three are
+    filled together with ``photo_webp`` and may be ``None`` until then.
     """
 
     id: int
@@ -39,6 +42,9 @@ class CarouselSlide:
     photo_amp: Optional[str]
     photo_turbo: Optional[str]
     text: Optional[str]
+    photo_width: Optional[int] = None
+    photo_height: Optional[int] = None
+    photo_lqip: Optional[str] = None
 
 
 @dataclass(frozen=True, slots=True)
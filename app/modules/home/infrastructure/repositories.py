@@ -9,6 +9,7 @@ Field mapping from SA model columns to domain entity fields:
   MainCarousel.photo_amp   → CarouselSlide.photo_amp
   MainCarousel.photo_turbo → CarouselSlide.photo_turbo
   MainCarousel.text        → CarouselSlide.text
+  MainCarousel.photo_width / photo_height / photo_lqip → CarouselSlide.* (1:1)
   MainText.header          → MainBlock.header
   MainText.text            → MainBlock.text
   Action.text              → ActionItem.text
@@ -88,6 +89,9 @@ class SAHomeReadRepository(HomeReadRepository):
                 photo_amp=row.photo_amp,
                 photo_turbo=row.photo_turbo,
                 text=row.text,
+                photo_width=row.photo_width,
+                photo_height=row.photo_height,
+                photo_lqip=row.photo_lqip,
             )
             for row in rows
         ]
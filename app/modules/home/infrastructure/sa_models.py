@@ -16,7 +16,7 @@ data table-to-table with minimal transformations.
 
 """
 
-from sqlalchemy import BigInteger, Index, String, Text
+from sqlalchemy import BigInteger, Index, Integer, SmallInteger, String, Text
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.infrastructure.db.base import Base
@@ -65,6 +65,12 @@ class MainCarousel(Base):
     photo_amp: Mapped[str | None] = mapped_column(String(100), nullable=True)
     photo_turbo: Mapped[str | None] = mapped_column(String(100), nullable=True)
     photo_webp: Mapped[str | None] = mapped_column(String(600), nullable=True)
+    # Качество, с которым закодирован photo_webp (подбирается по SSIM)
+    photo_webp_quality: Mapped[int | None] = mapped_column(SmallInteger, nullable=True)
+    # Размеры оригинала и LQIP (data: URI) — заполняются вместе с WebP
+    photo_width: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    photo_height: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    photo_lqip: Mapped[str | None] = mapped_column(Text, nullable=True)
 
     __table_args__ = (
         Index(
@@ -0,0 +1,526 @@
+"""Export pipeline for pricelist positions: XLSX, CSV, JSON Lines and PDF.
+
+This module grew out of the port of the legacy ``legacy/exceltask.py`` script.
+
+Key behavior:
+- Builds the price list from ``Position`` and ``PriceDate`` tables.
+- Stores the files in ``static/excel/pricelist.<format>``.
+- Keeps legacy grouping order: category_id=2, spacer row, category_id=1.
+
+Один прогон — один проход по БД: дата прайса и позиции читаются в одной
+транзакции REPEATABLE READ (все форматы видят один снимок данных), позиции —
+одним запросом через server-side курсор (stream_results + yield_per).
+Каждая строка раздаётся всем включённым writer'ам (PRICELIST_EXPORT_FORMATS).
+
+Каждый writer пишет во временный файл рядом с целевым; после успешного
+прохода рядом строится ``.gz``-копия (для gzip_static и клиентов с
+Accept-Encoding: gzip), и оба файла публикуются через ``os.replace`` —
+читатель видит либо старый, либо новый файл целиком.
+
+Ошибка одного writer'а не валит остальные форматы: он пишется в лог,
+закрывается и выбывает из прохода, его старый файл снимается с публикации
+(номер правки в pricelist.version к нему уже не относится). Прогон падает,
+только если не удалось прочитать БД или не собрался ни один формат.
+
+Рядом лежит ``pricelist.version`` — номер правки, с которой собраны файлы
+(см. ``Debouncer.version``); по нему HTTP-роут решает, пора ли пересобрать.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import csv
+import gzip
+import json
+import logging
+import os
+import shutil
+import uuid
+from collections.abc import Callable, Iterable
+from dataclasses import asdict, dataclass
+from operator import methodcaller
+from pathlib import Path
+from typing import TYPE_CHECKING, Protocol, TextIO
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, Side
+from openpyxl.worksheet._write_only import WriteOnlyWorksheet
+from sqlalchemy import Select, case, create_engine, select
+from sqlalchemy.orm import Session
+
+from app.modules.pricelist.infrastructure.sa_models import Position, PriceDate
+from app.settings.config import settings
+
+if TYPE_CHECKING:
+    from reportlab.pdfgen.canvas import Canvas
+
+logger = logging.getLogger("app.pricelist.export")
+
+OUTPUT_BASENAME = "pricelist"
+VERSION_FILENAME = "pricelist.version"
+
+MEDIA_TYPES: dict[str, str] = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson",
+    "pdf": "application/pdf",
+}
+
+_STREAM_BATCH_SIZE = 500
+
+_TITLE = "Прайс-лист"
+_HEADERS = (
+    "Наименование",
+    "Безналичный расчет (на карту физ.лица)",
+    "Безналичный расчет (лицензия юр.лица)",
+)
+
+# Порядок групп как в legacy: category_id=2, пустая строка, category_id=1
+_CATEGORY_ORDER = (2, 1)
+
+
+@dataclass(frozen=True, slots=True)
+class PricelistRow:
+    name: str
+    price: str
+    price_card: str
+    category_id: int
+
+
+class ExportWriter(Protocol):
+    """Writer одного формата; пишет в переданный временный путь."""
+
+    extension: str
+
+    def begin(self, path: Path, price_date: str) -> None: ...
+
+    def spacer(self) -> None:
+        """Визуальный разделитель групп (форматы для людей)."""
+        ...
+
+    def row(self, row: PricelistRow) -> None: ...
+
+    def finish(self) -> None:
+        """Дописывает и закрывает файл."""
+        ...
+
+    def close(self) -> None:
+        """Освобождает файл без записи; безопасен до begin и после finish."""
+        ...
+
+
+def _string(value: str | None) -> str:
+    return (value or "").strip()
+
+
+def output_dir() -> Path:
+    directory = Path(settings.static.STATIC_ROOT) / "excel"
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory
+
+
+def output_path(extension: str) -> Path:
+    return output_dir() / f"{OUTPUT_BASENAME}.{extension}"
+
+
+def read_published_version() -> int | None:
+    """Номер правки, с которой собраны опубликованные файлы; None — неизвестно."""
+    try:
+        return int((output_dir() / VERSION_FILENAME).read_text().strip())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _tmp_path(path: Path) -> Path:
+    return path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+
+
+def _replace_atomically(path: Path, write: Callable[[Path], object]) -> None:
+    tmp_path = _tmp_path(path)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+def _gzip_file(source: Path, destination: Path) -> None:
+    # mtime=0: одинаковое содержимое даёт одинаковый .gz
+    with open(source, "rb") as src, open(destination, "wb") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=9, mtime=0) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+
+
+# ---------------------------------------------------------------------------
+# Writers
+# ---------------------------------------------------------------------------
+
+
+_THIN_BORDER = Border(
+    left=Side(border_style="thin", color="000000"),
+    right=Side(border_style="thin", color="000000"),
+    top=Side(border_style="thin", color="000000"),
+    bottom=Side(border_style="thin", color="000000"),
+)
+
+_TITLE_STYLE = "pricelist_title"
+_NOTE_STYLE = "pricelist_note"
+_HEADER_STYLE = "pricelist_header"
+_BODY_STYLE = "pricelist_body"
+
+
+def _named_styles() -> tuple[NamedStyle, ...]:
+    # Новые объекты на каждую книгу: NamedStyle привязывается к workbook
+    return (
+        NamedStyle(name=_TITLE_STYLE, font=Font(name="Calibri", size=14, bold=True)),
+        NamedStyle(name=_NOTE_STYLE, font=Font(name="Calibri", size=11)),
+        NamedStyle(
+            name=_HEADER_STYLE,
+            font=Font(name="Calibri", size=12, bold=True),
+            border=_THIN_BORDER,
+            alignment=Alignment(horizontal="center", vertical="center", wrap_text=True),
+        ),
+        NamedStyle(
+            name=_BODY_STYLE,
+            font=Font(name="Calibri", size=11),
+            border=_THIN_BORDER,
+            alignment=Alignment(vertical="center", wrap_text=True),
+        ),
+    )
+
+
+class XlsxWriter:
+    """Workbook(write_only=True): строки уходят в файл по мере поступления."""
+
+    extension = "xlsx"
+
+    def __init__(self) -> None:
+        self._workbook: Workbook | None = None
+        self._sheet: WriteOnlyWorksheet | None = None
+
+    def begin(self, path: Path, price_date: str) -> None:
+        self._path = path
+        self._workbook = Workbook(write_only=True)
+        for style in _named_styles():
+            self._workbook.add_named_style(style)
+
+        self._sheet = self._workbook.create_sheet(title=_TITLE)
+        self._sheet.column_dimensions["A"].width = 4
+        self._sheet.column_dimensions["B"].width = 55
+        self._sheet.column_dimensions["C"].width = 27
+        self._sheet.column_dimensions["D"].width = 27
+
+        self._sheet.append([])
+        self._sheet.append([None, self._cell(_TITLE, _TITLE_STYLE)])
+        self._sheet.append([None, self._cell(f"Дата актуальности: {price_date}", _NOTE_STYLE)])
+        self._sheet.append([])
+        self._sheet.append([None, *(self._cell(header, _HEADER_STYLE) for header in _HEADERS)])
+
+    def _cell(self, value: str, style: str) -> WriteOnlyCell:
+        cell = WriteOnlyCell(self._sheet, value=value)
+        cell.style = style
+        return cell
+
+    def _body(self, values: Iterable[str]) -> None:
+        self._sheet.append([None, *(self._cell(value, _BODY_STYLE) for value in values)])
+
+    def spacer(self) -> None:
+        # Разделитель групп — с рамкой, как в legacy-файле
+        self._body(("", "", ""))
+
+    def row(self, row: PricelistRow) -> None:
+        self._body((row.name, row.price, row.price_card))
+
+    def finish(self) -> None:
+        self._workbook.save(self._path)
+        self._workbook = self._sheet = None
+
+    def close(self) -> None:
+        # Недописанный write-only лист держит открытым временный файл openpyxl
+        # (Workbook.close() его не трогает) — закрываем и удаляем его сами
+        sheet, self._workbook, self._sheet = self._sheet, None, None
+        if sheet is None or sheet.closed:
+            return
+        sheet.close()
+        sheet._writer.cleanup()
+
+
+class CsvWriter:
+    """CSV для Excel с русской локалью: UTF-8 с BOM и разделитель «;»."""
+
+    extension = "csv"
+
+    def __init__(self) -> None:
+        self._stream: TextIO | None = None
+
+    def begin(self, path: Path, price_date: str) -> None:
+        self._stream = open(path, "w", encoding="utf-8-sig", newline="")
+        self._writer = csv.writer(self._stream, delimiter=";")
+        self._writer.writerow(_HEADERS)
+
+    def spacer(self) -> None:
+        pass
+
+    def row(self, row: PricelistRow) -> None:
+        self._writer.writerow((row.name, row.price, row.price_card))
+
+    def finish(self) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+
+
+class JsonLinesWriter:
+    """Одна позиция — одна JSON-строка; дата прайса в каждой записи."""
+
+    extension = "jsonl"
+
+    def __init__(self) -> None:
+        self._stream: TextIO | None = None
+
+    def begin(self, path: Path, price_date: str) -> None:
+        self._stream = open(path, "w", encoding="utf-8")
+        self._price_date = price_date
+
+    def spacer(self) -> None:
+        pass
+
+    def row(self, row: PricelistRow) -> None:
+        record = {**asdict(row), "price_date": self._price_date}
+        self._stream.write(json.dumps(record, ensure_ascii=False))
+        self._stream.write("\n")
+
+    def finish(self) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+
+
+class PdfWriter:
+    """Печатная версия на A4: строки рисуются на canvas сразу, без буфера таблицы.
+
+    Кириллице нужен TTF-шрифт (PRICELIST_PDF_FONT_PATH, в образе —
+    DejaVuSans из fonts-dejavu-core).
+    """
+
+    extension = "pdf"
+
+    _FONT = "PricelistFont"
+    _FONT_SIZE = 9
+    _LINE_HEIGHT = 11
+    _PADDING = 3
+
+    def __init__(self) -> None:
+        self._canvas: Canvas | None = None
+
+    def begin(self, path: Path, price_date: str) -> None:
+        try:
+            from reportlab.lib.pagesizes import A4
+            from reportlab.lib.units import mm
+            from reportlab.pdfbase import pdfmetrics
+            from reportlab.pdfbase.ttfonts import TTFont
+            from reportlab.pdfgen.canvas import Canvas
+        except ImportError as exc:  # pragma: no cover - зависит от окружения
+            raise RuntimeError("Экспорт прайса в PDF требует пакет reportlab") from exc
+
+        if self._FONT not in pdfmetrics.getRegisteredFontNames():
+            pdfmetrics.registerFont(TTFont(self._FONT, settings.pricelist.PDF_FONT_PATH))
+
+        self._page_width, self._page_height = A4
+        self._margin = 15 * mm
+        name_width = self._page_width - 2 * self._margin - 2 * 45 * mm
+        self._widths = (name_width, 45 * mm, 45 * mm)
+        self._canvas = Canvas(str(path), pagesize=A4)
+        self._canvas.setTitle(_TITLE)
+
+        self._y = self._page_height - self._margin
+        self._canvas.setFont(self._FONT, 14)
+        self._canvas.drawString(self._margin, self._y - 14, _TITLE)
+        self._canvas.setFont(self._FONT, self._FONT_SIZE + 1)
+        self._canvas.drawString(self._margin, self._y - 30, f"Дата актуальности: {price_date}")
+        self._y -= 42
+        self._header()
+
+    def _lines(self, text: str, width: float) -> list[str]:
+        from reportlab.lib.utils import simpleSplit
+
+        return simpleSplit(text, self._FONT, self._FONT_SIZE, width - 2 * self._PADDING) or [""]
+
+    def _draw_row(self, values: Iterable[str]) -> None:
+        cells = [self._lines(value, width) for value, width in zip(values, self._widths)]
+        height = max(len(lines) for lines in cells) * self._LINE_HEIGHT + 2 * self._PADDING
+        if self._y - height < self._margin:
+            self._canvas.showPage()
+            self._y = self._page_height - self._margin
+            self._header()
+
+        self._canvas.setFont(self._FONT, self._FONT_SIZE)
+        x = self._margin
+        for lines, width in zip(cells, self._widths):
+            self._canvas.rect(x, self._y - height, width, height)
+            text_y = self._y - self._PADDING - self._FONT_SIZE
+            for line in lines:
+                self._canvas.drawString(x + self._PADDING, text_y, line)
+                text_y -= self._LINE_HEIGHT
+            x += width
+        self._y -= height
+
+    def _header(self) -> None:
+        # Заголовок таблицы повторяется на каждой странице
+        self._draw_row(_HEADERS)
+
+    def spacer(self) -> None:
+        self._draw_row(("", "", ""))
+
+    def row(self, row: PricelistRow) -> None:
+        self._draw_row((row.name, row.price, row.price_card))
+
+    def finish(self) -> None:
+        self._canvas.save()
+        self._canvas = None
+
+    def close(self) -> None:
+        # Canvas открывает файл только в save(): достаточно отпустить буфер страниц
+        self._canvas = None
+
+
+WRITERS: dict[str, type[ExportWriter]] = {
+    "xlsx": XlsxWriter,
+    "csv": CsvWriter,
+    "jsonl": JsonLinesWriter,
+    "pdf": PdfWriter,
+}
+
+
+# ---------------------------------------------------------------------------
+# Pipeline
+# ---------------------------------------------------------------------------
+
+
+def _positions_query() -> Select[tuple[str | None, str | None, str | None, int]]:
+    group_order = case(
+        {category_id: index for index, category_id in enumerate(_CATEGORY_ORDER)},
+        value=Position.category_id,
+    )
+    return (
+        select(Position.name, Position.price, Position.price_card, Position.category_id)
+        .where(Position.category_id.in_(_CATEGORY_ORDER))
+        .order_by(group_order, Position.order.asc(), Position.id.asc())
+        .execution_options(stream_results=True, yield_per=_STREAM_BATCH_SIZE)
+    )
+
+
+def _survivors(
+    writers: list[ExportWriter], call: Callable[[ExportWriter], object]
+) -> list[ExportWriter]:
+    """Вызывает call для каждого writer'а; упавший пишется в лог и выбывает."""
+    alive: list[ExportWriter] = []
+    for writer in writers:
+        try:
+            call(writer)
+        except Exception:
+            logger.exception("Pricelist export: %s writer failed, format skipped", writer.extension)
+            writer.close()
+        else:
+            alive.append(writer)
+    if not alive:
+        raise RuntimeError("Экспорт прайса: не собрался ни один формат")
+    return alive
+
+
+def _fan_out(
+    session: Session, writers: list[ExportWriter], paths: dict[str, Path]
+) -> list[ExportWriter]:
+    """Раздаёт строки writer'ам; возвращает те, что дописали файл до конца."""
+    with contextlib.ExitStack() as stack:
+        # close() до begin безопасен: файлы закрываются при любом выходе
+        for writer in writers:
+            stack.callback(writer.close)
+
+        price_date = _string(
+            session.execute(
+                select(PriceDate.date).order_by(PriceDate.id.asc()).limit(1)
+            ).scalar_one_or_none()
+        )
+        writers = _survivors(
+            writers, lambda writer: writer.begin(paths[writer.extension], price_date)
+        )
+
+        group = 0
+
+        def advance_to(target: int) -> None:
+            nonlocal group, writers
+            while group < target:
+                group += 1
+                writers = _survivors(writers, methodcaller("spacer"))
+
+        for name, price, price_card, category_id in session.execute(_positions_query()):
+            advance_to(_CATEGORY_ORDER.index(category_id))
+            row = PricelistRow(_string(name), _string(price), _string(price_card), category_id)
+            writers = _survivors(writers, methodcaller("row", row))
+        advance_to(len(_CATEGORY_ORDER) - 1)
+
+        return _survivors(writers, methodcaller("finish"))
+
+
+def export_pricelist(
+    session: Session,
+    version: int | None = None,
+    formats: Iterable[str] | None = None,
+) -> dict[str, Path]:
+    """Строит все форматы за один проход по БД и атомарно публикует их.
+
+    version — номер правки, с которой собраны файлы (пишется в pricelist.version).
+    Возвращает {формат: путь к опубликованному файлу}; форматы, чей writer
+    упал, в нём отсутствуют, а их прежние файлы удалены.
+    """
+    formats = list(formats or settings.pricelist.EXPORT_FORMATS)
+    writers = [WRITERS[fmt]() for fmt in formats]
+    targets = {fmt: output_path(fmt) for fmt in formats}
+    tmp_paths = {fmt: _tmp_path(path) for fmt, path in targets.items()}
+    gz_tmp_paths = {fmt: _tmp_path(path) for fmt, path in tmp_paths.items()}
+
+    # Все запросы прогона видят один снимок БД
+    session.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+    try:
+        built = [writer.extension for writer in _fan_out(session, writers, tmp_paths)]
+        for fmt in built:
+            _gzip_file(tmp_paths[fmt], gz_tmp_paths[fmt])
+        for fmt in built:
+            path = targets[fmt]
+            os.replace(gz_tmp_paths[fmt], path.with_name(path.name + ".gz"))
+            os.replace(tmp_paths[fmt], path)
+        for fmt in set(formats) - set(built):
+            # Старый файл не соответствует новой правке — лучше 503, чем устаревшие цены
+            path = targets.pop(fmt)
+            path.unlink(missing_ok=True)
+            path.with_name(path.name + ".gz").unlink(missing_ok=True)
+    finally:
+        for tmp_path in (*tmp_paths.values(), *gz_tmp_paths.values()):
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+    version_path = output_dir() / VERSION_FILENAME
+    if version is not None:
+        _replace_atomically(version_path, lambda tmp: tmp.write_text(str(version)))
+    else:
+        version_path.unlink(missing_ok=True)
+    return targets
+
+
+def rebuild_pricelist_exports(version: int | None = None) -> dict[str, Path]:
+    """Пересобирает файлы в собственной синхронной сессии (Celery, threadpool)."""
+    engine = create_engine(settings.database.sync_dsn, pool_pre_ping=True)
+    try:
+        with Session(engine) as session:
+            return export_pricelist(session, version)
+    finally:
+        engine.dispose()
@@ -45,6 +45,8 @@ class Foto:
     ``foto_webp`` — URL-путь к WebP-версии (``/media/media/name.webp``).
     ``text`` — подпись к фотографии.
     ``position_id`` — FK на позицию.
+    ``foto_width`` / ``foto_height`` / ``foto_lqip`` — размеры оригинала и
+    LQIP-плейсхолдер (data: URI); заполняются вместе с WebP.
 
     В Django-шаблоне:
         {{ foto.foto.url }}          → /media/{{ foto.foto }}
@@ -57,6 +59,9 @@ class Foto:
     foto_webp: Optional[str] = None
     text: Optional[str] = None
     position_id: Optional[int] = None
+    foto_width: Optional[int] = None
+    foto_height: Optional[int] = None
+    foto_lqip: Optional[str] = None
 
 
 @dataclass(frozen=True, slots=True)
@@ -112,6 +117,9 @@ class PositionEntity:
     avatar_webp: Optional[str] = None
     foto_app: Optional[str] = None
     foto_rss: Optional[str] = None
+    photo2_width: Optional[int] = None
+    photo2_height: Optional[int] = None
+    photo2_lqip: Optional[str] = None
 
     # FK
     category_id: Optional[int] = None
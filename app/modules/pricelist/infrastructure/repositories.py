@@ -10,6 +10,7 @@ Field mapping from SA model columns to domain entity fields:
   Foto.foto              → Foto.foto
   Foto.foto_webp         → Foto.foto_webp
   Foto.text              → Foto.text
+  Foto.foto_width / foto_height / foto_lqip → Foto.* (1:1)
   PriceDate.date         → PriceDate.date
   PricelistSeo.*         → PricelistSeo.*
 """
@@ -99,6 +100,9 @@ class SAPricelistReadRepository(PricelistReadRepository):
                 foto_webp=row.foto_webp,
                 text=row.text,
                 position_id=row.position_id,
+                foto_width=row.foto_width,
+                foto_height=row.foto_height,
+                foto_lqip=row.foto_lqip,
             )
             for row in rows
         ]
@@ -153,6 +157,9 @@ class SAPricelistReadRepository(PricelistReadRepository):
             avatar_webp=row.avatar_webp,
             foto_app=row.foto_app,
             foto_rss=row.foto_rss,
+            photo2_width=row.photo2_width,
+            photo2_height=row.photo2_height,
+            photo2_lqip=row.photo2_lqip,
             category_id=row.category_id,
             # category и fotos — заполняются на уровне use case при необходимости
             category=CategoryEntity(
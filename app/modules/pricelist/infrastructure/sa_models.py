@@ -16,7 +16,17 @@ Trigram (pg_trgm) GIN-индексы добавлены на текстовые
 поскольку нечёткий поиск по ним не имеет смысла.
 """
 
-from sqlalchemy import BigInteger, Boolean, Float, ForeignKey, Index, String, Text
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    SmallInteger,
+    String,
+    Text,
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.infrastructure.db.base import Base
@@ -71,6 +81,9 @@ class Position(Base):
     Поля ``photo2`` / ``foto_app`` / ``foto_rss`` хранят относительные пути
     к изображениям (``media/filename.jpg``), аналогично ``MainCarousel.photo``.
     ``photo2_webp`` / ``avatar_webp`` — URL-пути (``/media/media/name.webp``).
+    ``photo2_webp_quality`` — качество, с которым закодирован этот WebP.
+    ``photo2_width`` / ``photo2_height`` / ``photo2_lqip`` — размеры оригинала
+    и LQIP-плейсхолдер (data: URI) для шаблонов.
     """
 
     __tablename__ = "position"
@@ -109,6 +122,10 @@ class Position(Base):
     photo2: Mapped[str | None] = mapped_column(String(100), nullable=True)
     photo2_webp: Mapped[str | None] = mapped_column(String(600), nullable=True)
     avatar_webp: Mapped[str | None] = mapped_column(String(600), nullable=True)
+    photo2_webp_quality: Mapped[int | None] = mapped_column(SmallInteger, nullable=True)
+    photo2_width: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    photo2_height: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    photo2_lqip: Mapped[str | None] = mapped_column(Text, nullable=True)
     foto_app: Mapped[str | None] = mapped_column(String(100), nullable=True)
     foto_rss: Mapped[str | None] = mapped_column(String(100), nullable=True)
 
@@ -166,6 +183,8 @@ class Foto(Base):
 
     ``foto`` — относительный путь к JPEG (``media/filename.jpg``).
     ``foto_webp`` — URL-путь к WebP-версии (``/media/media/name.webp``).
+    ``foto_webp_quality`` — качество, с которым закодирован этот WebP.
+    ``foto_width`` / ``foto_height`` / ``foto_lqip`` — размеры и LQIP-плейсхолдер.
     ``text`` — подпись к фотографии.
     """
 
@@ -174,6 +193,10 @@ class Foto(Base):
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
     foto: Mapped[str | None] = mapped_column(String(100), nullable=True)
     foto_webp: Mapped[str | None] = mapped_column(String(600), nullable=True)
+    foto_webp_quality: Mapped[int | None] = mapped_column(SmallInteger, nullable=True)
+    foto_width: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    foto_height: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    foto_lqip: Mapped[str | None] = mapped_column(Text, nullable=True)
     text: Mapped[str | None] = mapped_column(String(400), nullable=True)
 
     # FK на позицию
@@ -15,21 +15,47 @@ HTTP routing for the pricelist module.
 pricelist/prod/pricelist.html в зависимости от DEBUG.
 Здесь используется один шаблон pricelist/pricelist.html
 (dev/prod логика CSS остаётся на уровне base.html).
+
+``/pricelist.{xlsx,csv,jsonl,pdf}`` отдают выгрузки прайса с
+ETag/Last-Modified (и готовую .gz-копию при Accept-Encoding: gzip).
+Если файлы отстали от правок в админке (номер правки в Redis больше
+записанного рядом с ними), они пересобираются прямо в запросе —
+не дожидаясь отложенной Celery-задачи.
 """
 
-from fastapi import APIRouter, Request
-from fastapi.responses import HTMLResponse
+import asyncio
+import logging
+import os
+import threading
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse, HTMLResponse, Response
 from fastapi.templating import Jinja2Templates
+from redis.exceptions import RedisError
 
 from dishka.integrations.fastapi import DishkaRoute, FromDishka
 
+from app.infrastructure.celery.tasks import pricelist_excel_debouncer
 from app.infrastructure.uow import AsyncUnitOfWork
+from app.modules.pricelist.application.export import (
+    MEDIA_TYPES,
+    output_path,
+    read_published_version,
+    rebuild_pricelist_exports,
+)
 from app.modules.pricelist.application.use_cases import GetPricelistPage
 from app.settings.config import settings
 
 
+logger = logging.getLogger("app.pricelist.router")
+
 router = APIRouter(route_class=DishkaRoute)
 
+# Параллельные запросы к устаревшим файлам ждут одну пересборку
+_export_rebuild_lock = threading.Lock()
+
 
 @router.get("/pricelist/", response_class=HTMLResponse)
 async def pricelist(
@@ -57,3 +83,81 @@ async def pricelist(
             "positions": page.positions,
         },
     )
+
+
+def _is_fresh(path: Path, version: int | None) -> bool:
+    if not path.exists():
+        return False
+    if version is None:
+        return True  # Redis недоступен — отдаём то, что есть
+    published = read_published_version()
+    return published is not None and published >= version
+
+
+def _fresh_export(fmt: str, gzipped: bool) -> tuple[Path, os.stat_result]:
+    """Путь к актуальной выгрузке и её stat; при необходимости пересобирает файлы."""
+    path = output_path(fmt)
+    try:
+        version = pricelist_excel_debouncer.version()
+    except RedisError:
+        logger.warning("Pricelist export: Redis is unavailable, version check skipped")
+        version = None
+
+    if not _is_fresh(path, version):
+        with _export_rebuild_lock:
+            if not _is_fresh(path, version):
+                rebuild_pricelist_exports(version)
+
+    gz_path = path.with_name(path.name + ".gz")
+    if gzipped and gz_path.exists():
+        path = gz_path
+    try:
+        return path, path.stat()
+    except FileNotFoundError:
+        # writer этого формата упал при пересборке (ошибка в логе app.pricelist.export)
+        raise HTTPException(status_code=503) from None
+
+
+def _not_modified(request: Request, etag: str, mtime: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag in {tag.strip() for tag in if_none_match.split(",")} or if_none_match == "*"
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+@router.get("/pricelist.{fmt}", name="pricelist_export")
+async def pricelist_export(request: Request, fmt: str) -> Response:
+    """Выгрузка прайс-листа: xlsx, csv, jsonl или pdf (static/excel/pricelist.*)."""
+    if fmt not in settings.pricelist.EXPORT_FORMATS:
+        raise HTTPException(status_code=404)
+
+    accepts_gzip = "gzip" in request.headers.get("accept-encoding", "").lower()
+    path, stat = await asyncio.to_thread(_fresh_export, fmt, accepts_gzip)
+    gzipped = path.suffix == ".gz"
+
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}{"-gz" if gzipped else ""}"'
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if _not_modified(request, etag, stat.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    if gzipped:
+        headers["Content-Encoding"] = "gzip"
+    return FileResponse(
+        path,
+        media_type=MEDIA_TYPES[fmt],
+        filename=f"pricelist.{fmt}",
+        headers=headers,
+        stat_result=stat,
+    )
@@ -184,6 +184,44 @@ class MediaSettings(EnvBaseSettings):
     CAROUSEL_QUALITY — качество JPEG для слайдов карусели (аналог options={'quality': 90}).
 
     WEBP_QUALITY — качество webp при конвертации (аналог im.save(..., 'webp', quality='20')).
+
+    WEBP_TARGET_SSIM — если задано, качество WebP подбирается для каждого файла
+                    бинарным поиском: минимальное quality в диапазоне
+                    WEBP_MIN_QUALITY…WEBP_MAX_QUALITY, при котором SSIM по яркости
+                    (уменьшенной до WEBP_SSIM_SIZE по длинной стороне) не ниже цели.
+                    Пусто — всегда фиксированное WEBP_QUALITY. Прежде чем включать,
+                    стоит прогнать ``python -m app.infrastructure.media.cli webp-bench``.
+
+    THUMBNAIL_WIDTH / THUMBNAIL_HEIGHT — размер WebP-превью для списков админки
+                    (аналог ImageSpecField avatarimage + AdminThumbnail в Django).
+                    Превью строится при загрузке и кропается по центру до точного
+                    размера, поэтому <img> всегда получает явные width/height.
+
+    THUMBNAIL_QUALITY — качество WebP для превью.
+
+    LQIP_SIZE / LQIP_QUALITY — крошечный WebP-плейсхолдер (длинная сторона
+                    LQIP_SIZE px), который хранится в строке как data: URI
+                    вместе с исходными шириной/высотой и выводится в шаблонах
+                    inline, пока грузится основное изображение.
+
+    GC_* — сборка мусора в MEDIA_ROOT/media (см. app.infrastructure.media.gc):
+        GC_GRACE_HOURS               — файлы моложе этого возраста не трогаются
+                                       (загрузка уже на диске, а запись в БД ещё нет).
+        GC_QUARANTINE_DIR            — куда переносятся осиротевшие файлы
+                                       (относительно проекта, вне MEDIA_ROOT).
+        GC_QUARANTINE_RETENTION_DAYS — через сколько дней карантин удаляется насовсем.
+        GC_SCHEDULE_CRON             — cron для Celery Beat; пусто — только ручной запуск.
+
+    STORAGE_BACKEND — где лежат медиафайлы (см. app.infrastructure.media.backends):
+        local — MEDIA_ROOT на локальном диске (по умолчанию);
+        s3    — S3-совместимое хранилище (AWS S3, MinIO, Yandex Object Storage).
+                Web- и worker-ноды тогда не обязаны делить один диск.
+    S3_* — параметры драйвера s3:
+        S3_ENDPOINT_URL       — endpoint (для MinIO: http://minio:9000; пусто — AWS).
+        S3_BUCKET / S3_PREFIX — бакет и префикс ключей (ключ = префикс + rel. путь).
+        S3_ACCESS_KEY / S3_SECRET_KEY / S3_REGION — доступ.
+        S3_MULTIPART_THRESHOLD_MB / S3_MULTIPART_CHUNK_MB — с какого размера
+                                заливка идёт multipart-ом и размер части.
     """
 
     model_config = SettingsConfigDict(env_file=".env", extra="ignore", env_prefix="media_")
@@ -198,12 +236,53 @@ class MediaSettings(EnvBaseSettings):
 
     # WebP conversion — зеркалирует Celery-задачу slide_to_webp
     WEBP_QUALITY: int = 20
+    WEBP_TARGET_SSIM: float | None = None
+    WEBP_MIN_QUALITY: int = 10
+    WEBP_MAX_QUALITY: int = 90
+    WEBP_SSIM_SIZE: int = 512
+
+    # Превью для админки — маленький WebP рядом с оригиналом (media/thumbs/)
+    THUMBNAIL_WIDTH: int = 120
+    THUMBNAIL_HEIGHT: int = 80
+    THUMBNAIL_QUALITY: int = 70
+
+    # LQIP-плейсхолдеры для публичных страниц (см. make_placeholder_sync)
+    LQIP_SIZE: int = 16
+    LQIP_QUALITY: int = 30
+
+    # Сборка мусора (осиротевшие файлы после редактирования/удаления записей)
+    GC_GRACE_HOURS: int = 24
+    GC_QUARANTINE_DIR: str = "tmp/media_quarantine"
+    GC_QUARANTINE_RETENTION_DAYS: int = 30
+    GC_SCHEDULE_CRON: str | None = None
+
+    # Хранилище медиафайлов
+    STORAGE_BACKEND: tp.Literal["local", "s3"] = "local"
+    S3_ENDPOINT_URL: str = ""
+    S3_BUCKET: str = ""
+    S3_PREFIX: str = ""
+    S3_ACCESS_KEY: str = ""
+    S3_SECRET_KEY: SecretStr = SecretStr("")
+    S3_REGION: str = "us-east-1"
+    S3_MULTIPART_THRESHOLD_MB: int = 8
+    S3_MULTIPART_CHUNK_MB: int = 8
 
     @property
     def mount_path(self) -> str:
         """Нормализованный mount path для FastAPI/Starlette."""
         return "/" + self.MEDIA_URL.strip("/")
 
+    @model_validator(mode="after")
+    def validate_storage(self) -> tp.Self:
+        if self.STORAGE_BACKEND == "s3":
+            if not self.S3_BUCKET:
+                raise ValueError("MEDIA_S3_BUCKET обязателен при MEDIA_STORAGE_BACKEND=s3")
+            if not self.S3_ACCESS_KEY or not self.S3_SECRET_KEY.get_secret_value():
+                raise ValueError(
+                    "MEDIA_S3_ACCESS_KEY и MEDIA_S3_SECRET_KEY обязательны при MEDIA_STORAGE_BACKEND=s3"
+                )
+        return self
+
 
 class UploadPhotoSettings(EnvBaseSettings):
     """Settings for file upload validation.
@@ -338,6 +417,34 @@ class CelerySettings(EnvBaseSettings):
 
     timezone: str = "Europe/Moscow"
 
+    # Приоритеты задач по умолчанию для каждой очереди. Брокер — Redis,
+    # поэтому 0 — самый высокий приоритет, 9 — самый низкий.
+    # Явный apply_async(priority=...) переопределяет значение.
+    default_priority: int = Field(default=5, ge=0, le=9)
+    media_priority: int = Field(default=5, ge=0, le=9)
+    exports_priority: int = Field(default=3, ge=0, le=9)
+    maintenance_priority: int = Field(default=8, ge=0, le=9)
+
+    # Лимиты частоты в формате Celery ("60/m", "10/s") — на один воркер, для
+    # каждой задачи очереди отдельно. Пустое значение — без лимита.
+    media_rate_limit: str | None = "60/m"
+    exports_rate_limit: str | None = "12/m"
+
+    # Идемпотентность задач конвертации медиа (app.infrastructure.celery.idempotency):
+    # сколько живут ключи «в очереди» / «выполнено»
+    idempotency_key_prefix: str = "vekolom:tasks"
+    idempotency_ttl_seconds: int = Field(default=3600, gt=0)
+
+    # Prometheus-метрики воркера (app.infrastructure.celery.telemetry):
+    # порт HTTP-эндпоинта /metrics (None — выключено) и каталог
+    # multiprocess-файлов prometheus_client (очищается при старте воркера)
+    metrics_port: int | None = None
+    metrics_dir: str = "/tmp/celery-metrics"
+
+    # Постановка задач из админки (app.infrastructure.celery.dispatch): сколько
+    # вызовов может ждать публикации, прежде чем submit() начнёт ждать брокер
+    dispatch_max_pending: int = Field(default=100, gt=0)
+
 
 class BackupSettings(EnvBaseSettings):
     model_config = SettingsConfigDict(env_file=".env", extra="ignore", env_prefix="backup_")
@@ -365,6 +472,69 @@ class BackupSettings(EnvBaseSettings):
     LOCK_TTL_SECONDS: int = 7200
     FOLLOW_SYMLINKS: bool = False
     WRITE_SHA256: bool = True
+    # full — каждый архив полный; incremental — изменения с прошлого архива;
+    # differential — изменения с последнего полного. Каждый FULL_EVERY-й архив полный.
+    ARCHIVE_MODE: tp.Literal["full", "incremental", "differential"] = "full"
+    FULL_EVERY: int = 7
+    INDEX_FILE: str = "var/backup/file_index.json"
+    INDEX_SHA256: bool = False
+    # Архив не пишется в TEMP_DIR: tar -> gzip -> sha256 -> chunked PUT за один проход.
+    # WebDAV-сервер должен принимать PUT с Transfer-Encoding: chunked.
+    STREAM_UPLOAD: bool = False
+    STREAM_CHUNK_BYTES: int = 8 * 1024 * 1024
+    # gzip — однопоточный (как раньше), pigz — блочный параллельный gzip (.tar.gz),
+    # zstd — многопоточный zstd (.tar.zst). Уровень по умолчанию: 9 / 6 / 3.
+    # THREADS=0 — по числу ядер.
+    COMPRESSION: tp.Literal["gzip", "pigz", "zstd"] = "gzip"
+    COMPRESSION_LEVEL: int | None = None
+    COMPRESSION_THREADS: int = 0
+    # Загрузка архива сегментами по UPLOAD_SEGMENT_BYTES в каталог <архив>.parts
+    # (UPLOAD_PARALLELISM параллельных PUT, повтор каждого сегмента до
+    # UPLOAD_SEGMENT_RETRIES раз). Прерванная загрузка докачивается следующим
+    # запуском. None — архив загружается одним PUT, как раньше.
+    UPLOAD_SEGMENT_BYTES: int | None = None
+    UPLOAD_PARALLELISM: int = 4
+    UPLOAD_SEGMENT_RETRIES: int = 3
+    # tar — архивы .tar.gz/.tar.zst (настройки выше); chunks — хранилище с
+    # дедупликацией: файлы режутся на чанки по содержимому (CDC), каждый чанк
+    # хранится один раз, у каждого запуска — свой snapshot со списком чанков.
+    # Размеры чанков фиксируются при создании хранилища.
+    FORMAT: tp.Literal["tar", "chunks"] = "tar"
+    CHUNK_MIN_BYTES: int = 512 * 1024
+    CHUNK_AVG_BYTES: int = 1024 * 1024
+    CHUNK_MAX_BYTES: int = 8 * 1024 * 1024
+    # Дамп PostgreSQL в тот же архив (каталог database/ внутри архива). Снимок БД
+    # экспортируется сразу после обхода файлов, pg_dump читает именно его, а LSN
+    # снимка записывается в манифест. directory — pg_dump в DB_DUMP_JOBS потоков,
+    # custom — один файл. Сжимает дамп кодек BACKUP_COMPRESSION.
+    # DB_DUMP_DSN по умолчанию собирается из POSTGRES_*.
+    DB_DUMP: bool = False
+    DB_DUMP_FORMAT: tp.Literal["directory", "custom"] = "directory"
+    DB_DUMP_JOBS: int = 4
+    DB_DUMP_BINARY: str = "pg_dump"
+    DB_DUMP_DSN: str | None = None
+    # Чтобы backup не поднимал задержки сайта на том же хосте:
+    # READ/UPLOAD_BYTES_PER_SECOND — token bucket на чтение исходных файлов и на
+    # загрузку в WebDAV (None — без ограничения); NICE (0..19) и IONICE_CLASS
+    # (best-effort с IONICE_LEVEL 0..7 или idle) — приоритет процесса воркера.
+    # Если load average на ядро выше THROTTLE_MAX_LOAD или THROTTLE_PROBE_URL
+    # отвечает дольше THROTTLE_PROBE_MAX_MS (проверка раз в THROTTLE_CHECK_SECONDS),
+    # backup встаёт на паузу: 1, 2, 4 ... 30 с, всего не дольше
+    # THROTTLE_MAX_PAUSE_SECONDS за запуск.
+    READ_BYTES_PER_SECOND: int | None = None
+    UPLOAD_BYTES_PER_SECOND: int | None = None
+    NICE: int = 0
+    IONICE_CLASS: tp.Literal["none", "best-effort", "idle"] = "none"
+    IONICE_LEVEL: int = 7
+    THROTTLE_MAX_LOAD: float | None = None
+    THROTTLE_PROBE_URL: str | None = None
+    THROTTLE_PROBE_MAX_MS: int = 500
+    THROTTLE_CHECK_SECONDS: float = 5.0
+    THROTTLE_MAX_PAUSE_SECONDS: int = 1800
+    # Листинг REMOTE_DIR кешируется рядом с INDEX_FILE (remote_catalog.json) и
+    # переиспользуется, пока ETag / getlastmodified каталога не изменился:
+    # запуск делает PROPFIND с Depth: 0 вместо листинга всех архивов.
+    REMOTE_CATALOG_CACHE: bool = True
 
     @property
     def effective_lock_redis_url(self) -> str:
@@ -372,6 +542,12 @@ class BackupSettings(EnvBaseSettings):
             return self.LOCK_REDIS_URL
         raise ValueError("Backup lock Redis URL is not configured")
 
+    @property
+    def effective_db_dump_dsn(self) -> str:
+        if self.DB_DUMP_DSN:
+            return self.DB_DUMP_DSN
+        raise ValueError("Backup database DSN is not configured")
+
     @model_validator(mode="after")
     def validate_paths_and_schedule(self) -> tp.Self:
         if self.SCHEDULE_CRON and self.INTERVAL_MINUTES:
@@ -406,6 +582,73 @@ class BackupSettings(EnvBaseSettings):
         if temp_path.is_absolute() or ".." in temp_path.parts:
             raise ValueError("BACKUP_TEMP_DIR должен быть относительным путём внутри проекта")
 
+        index_path = Path(self.INDEX_FILE)
+        if index_path.is_absolute() or ".." in index_path.parts:
+            raise ValueError("BACKUP_INDEX_FILE должен быть относительным путём внутри проекта")
+
+        if self.FULL_EVERY <= 0:
+            raise ValueError("BACKUP_FULL_EVERY должен быть > 0")
+
+        if self.COMPRESSION_THREADS < 0:
+            raise ValueError("BACKUP_COMPRESSION_THREADS должен быть >= 0")
+
+        if self.STREAM_CHUNK_BYTES < 64 * 1024:
+            raise ValueError("BACKUP_STREAM_CHUNK_BYTES должен быть >= 65536")
+
+        if self.UPLOAD_SEGMENT_BYTES is not None:
+            if self.UPLOAD_SEGMENT_BYTES < 1024 * 1024:
+                raise ValueError("BACKUP_UPLOAD_SEGMENT_BYTES должен быть >= 1048576")
+            if self.STREAM_UPLOAD:
+                raise ValueError(
+                    "BACKUP_UPLOAD_SEGMENT_BYTES нельзя использовать с BACKUP_STREAM_UPLOAD=true"
+                )
+
+        if self.FORMAT == "chunks":
+            if self.ARCHIVE_MODE != "full" or self.STREAM_UPLOAD or self.UPLOAD_SEGMENT_BYTES:
+                raise ValueError(
+                    "BACKUP_FORMAT=chunks не совместим с BACKUP_ARCHIVE_MODE, "
+                    "BACKUP_STREAM_UPLOAD и BACKUP_UPLOAD_SEGMENT_BYTES"
+                )
+        if not 64 * 1024 <= self.CHUNK_MIN_BYTES < self.CHUNK_AVG_BYTES < self.CHUNK_MAX_BYTES:
+            raise ValueError(
+                "Нужно 65536 <= BACKUP_CHUNK_MIN_BYTES < BACKUP_CHUNK_AVG_BYTES "
+                "< BACKUP_CHUNK_MAX_BYTES"
+            )
+
+        if self.DB_DUMP and self.FORMAT == "chunks":
+            raise ValueError("BACKUP_DB_DUMP не поддерживается при BACKUP_FORMAT=chunks")
+
+        if self.DB_DUMP_JOBS <= 0:
+            raise ValueError("BACKUP_DB_DUMP_JOBS должен быть > 0")
+
+        for name in ("READ_BYTES_PER_SECOND", "UPLOAD_BYTES_PER_SECOND"):
+            value = getattr(self, name)
+            if value is not None and value < 64 * 1024:
+                raise ValueError(f"BACKUP_{name} должен быть >= 65536")
+
+        if not 0 <= self.NICE <= 19:
+            raise ValueError("BACKUP_NICE должен быть от 0 до 19")
+
+        if not 0 <= self.IONICE_LEVEL <= 7:
+            raise ValueError("BACKUP_IONICE_LEVEL должен быть от 0 до 7")
+
+        if self.THROTTLE_MAX_LOAD is not None and self.THROTTLE_MAX_LOAD <= 0:
+            raise ValueError("BACKUP_THROTTLE_MAX_LOAD должен быть > 0")
+
+        if self.THROTTLE_PROBE_MAX_MS <= 0 or self.THROTTLE_CHECK_SECONDS <= 0:
+            raise ValueError(
+                "BACKUP_THROTTLE_PROBE_MAX_MS и BACKUP_THROTTLE_CHECK_SECONDS должны быть > 0"
+            )
+
+        if self.THROTTLE_MAX_PAUSE_SECONDS < 0:
+            raise ValueError("BACKUP_THROTTLE_MAX_PAUSE_SECONDS должен быть >= 0")
+
+        if self.UPLOAD_PARALLELISM <= 0:
+            raise ValueError("BACKUP_UPLOAD_PARALLELISM должен быть > 0")
+
+        if self.UPLOAD_SEGMENT_RETRIES < 0:
+            raise ValueError("BACKUP_UPLOAD_SEGMENT_RETRIES должен быть >= 0")
+
         if self.INTERVAL_MINUTES is not None and self.INTERVAL_MINUTES <= 0:
             raise ValueError("BACKUP_INTERVAL_MINUTES должен быть > 0")
 
@@ -421,6 +664,43 @@ class BackupSettings(EnvBaseSettings):
         return self
 
 
+class PricelistSettings(EnvBaseSettings):
+    """Настройки выгрузки прайс-листа (static/excel/pricelist.*).
+
+    EXCEL_QUIET_SECONDS     — пересборка Excel запускается, когда после
+                              последней правки в админке прошло столько секунд
+                              без новых правок (debounce).
+    EXCEL_MAX_DELAY_SECONDS — но не позже, чем через столько секунд после
+                              первой несобранной правки: длинная сессия
+                              редактирования не откладывает файл бесконечно.
+    EXCEL_DEBOUNCE_KEY      — префикс ключей debounce в Redis (CELERY_BROKER_URL).
+    EXPORT_FORMATS          — форматы, которые строятся за один проход по БД
+                              (static/excel/pricelist.<формат> + .gz). PDF
+                              включается явно: ему нужен шрифт из PDF_FONT_PATH.
+    PDF_FONT_PATH           — TTF-шрифт с кириллицей для PDF; проверяется при
+                              старте, если "pdf" есть в EXPORT_FORMATS.
+    """
+
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore", env_prefix="pricelist_")
+
+    EXCEL_QUIET_SECONDS: int = Field(default=30, ge=0)
+    EXCEL_MAX_DELAY_SECONDS: int = Field(default=300, ge=0)
+    EXCEL_DEBOUNCE_KEY: str = "vekolom:pricelist:excel"
+    EXPORT_FORMATS: list[tp.Literal["xlsx", "csv", "jsonl", "pdf"]] = Field(
+        default_factory=lambda: ["xlsx", "csv", "jsonl"]
+    )
+    PDF_FONT_PATH: str = "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
+
+    @model_validator(mode="after")
+    def validate_pdf_font(self) -> tp.Self:
+        if "pdf" in self.EXPORT_FORMATS and not Path(self.PDF_FONT_PATH).is_file():
+            raise ValueError(
+                f"PRICELIST_PDF_FONT_PATH не найден ({self.PDF_FONT_PATH}): "
+                "PDF в PRICELIST_EXPORT_FORMATS требует TTF-шрифт с кириллицей"
+            )
+        return self
+
+
 class ViteSettings(EnvBaseSettings):
     """Settings for Vite-powered frontend assets.
 
@@ -462,6 +742,7 @@ class Settings(EnvBaseSettings):
     admin_tinymce: AdminTinyMCEEditorSettings = Field(default_factory=AdminTinyMCEEditorSettings)
     celery: CelerySettings = Field(default_factory=CelerySettings)
     backup: BackupSettings = Field(default_factory=BackupSettings)
+    pricelist: PricelistSettings = Field(default_factory=PricelistSettings)
     vite: ViteSettings = Field(default_factory=ViteSettings)
     legacy: LegacyAssetsSettings = Field(default_factory=LegacyAssetsSettings)
     custom_css: CustomCSSSettings = Field(default_factory=CustomCSSSettings)
@@ -471,6 +752,15 @@ class Settings(EnvBaseSettings):
     def finalize_backup_settings(self) -> tp.Self:
         if not self.backup.LOCK_REDIS_URL and self.celery.broker_url.startswith("redis://"):
             self.backup.LOCK_REDIS_URL = self.celery.broker_url
+        if self.backup.DB_DUMP and not self.backup.DB_DUMP_DSN:
+            self.backup.DB_DUMP_DSN = URL.create(
+                drivername="postgresql",
+                username=self.database.user,
+                password=self.database.password,
+                host=self.database.host,
+                port=self.database.port,
+                database=self.database.db,
+            ).render_as_string(hide_password=False)
         return self
 
 
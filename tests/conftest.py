@@ -0,0 +1,170 @@
+"""Общие фикстуры тестов.
+
+app.settings.config создаёт Settings() при импорте, а PostgresSettings
+требует POSTGRES_*; для тестов хватает заглушек (реальная БД нужна только
+интеграционному тесту дампа, он берёт DSN из своей переменной).
+"""
+
+from __future__ import annotations
+
+import email.utils
+import os
+import time
+import urllib.parse
+from collections.abc import Callable
+
+import httpx
+import pytest
+
+for _name, _value in {
+    "POSTGRES_HOST": "localhost",
+    "POSTGRES_USER": "vekolom",
+    "POSTGRES_PASSWORD": "vekolom",
+    "POSTGRES_DB": "vekolom",
+}.items():
+    os.environ.setdefault(_name, _value)
+
+
+class InMemoryWebDav:
+    """WebDAV-сервер в памяти для httpx.MockTransport.
+
+    Поддерживает то, чем пользуется WebDavClient: MKCOL, PUT, GET с Range,
+    HEAD, DELETE и PROPFIND (Depth 0/1, getetag каталога меняется при любом
+    изменении внутри). `fail_put` решает, ответить ли на PUT ошибкой 503.
+    """
+
+    base_url = "http://webdav.test"
+
+    def __init__(self) -> None:
+        self.files: dict[str, bytes] = {}
+        self.dirs: set[str] = {"/"}
+        self.versions: dict[str, int] = {}
+        self.requests: list[tuple[str, str]] = []
+        self.fail_put: Callable[[str], bool] = lambda path: False
+
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self.handle)
+
+    def put_count(self, suffix: str = "") -> int:
+        return sum(1 for method, path in self.requests if method == "PUT" and path.endswith(suffix))
+
+    def _touch(self, path: str) -> None:
+        parent = path.rsplit("/", 1)[0] or "/"
+        self.versions[parent] = self.versions.get(parent, 0) + 1
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        path = urllib.parse.unquote(request.url.path).rstrip("/") or "/"
+        parent = path.rsplit("/", 1)[0] or "/"
+        self.requests.append((request.method, path))
+        method = request.method
+
+        if method == "MKCOL":
+            if path in self.dirs or path in self.files:
+                return httpx.Response(405)
+            if parent not in self.dirs:
+                return httpx.Response(409)
+            self.dirs.add(path)
+            self._touch(path)
+            return httpx.Response(201)
+
+        if method == "PUT":
+            body = request.read()
+            if parent not in self.dirs:
+                return httpx.Response(409)
+            if self.fail_put(path):
+                return httpx.Response(503)
+            self.files[path] = body
+            self._touch(path)
+            return httpx.Response(201)
+
+        if method in ("GET", "HEAD"):
+            if path not in self.files:
+                return httpx.Response(404)
+            data = self.files[path]
+            if method == "HEAD":
+                return httpx.Response(200)
+            range_header = request.headers.get("Range")
+            if range_header:
+                start_text, _, end_text = range_header.split("=", 1)[1].partition("-")
+                start = int(start_text)
+                end = int(end_text) if end_text else len(data) - 1
+                return httpx.Response(
+                    206,
+                    content=data[start : end + 1],
+                    headers={"Content-Range": f"bytes {start}-{end}/{len(data)}"},
+                )
+            return httpx.Response(200, content=data)
+
+        if method == "DELETE":
+            if path in self.files:
+                del self.files[path]
+            elif path in self.dirs:
+                self.dirs = {d for d in self.dirs if d != path and not d.startswith(f"{path}/")}
+                self.files = {
+                    f: data for f, data in self.files.items() if not f.startswith(f"{path}/")
+                }
+            else:
+                return httpx.Response(404)
+            self._touch(path)
+            return httpx.Response(204)
+
+        if method == "PROPFIND":
+            if path not in self.dirs and path not in self.files:
+                return httpx.Response(404)
+            items = [path]
+            if path in self.dirs and request.headers.get("Depth") != "0":
+                children = [*self.dirs, *self.files]
+                items += sorted(c for c in children if c != path and c.rsplit("/", 1)[0] == path)
+            return httpx.Response(
+                207,
+                content=self._multistatus(items),
+                headers={"Content-Type": "application/xml"},
+            )
+
+        return httpx.Response(405)
+
+    def _multistatus(self, items: list[str]) -> bytes:
+        modified = email.utils.formatdate(time.time(), usegmt=True)
+        parts = []
+        for item in items:
+            if item in self.dirs:
+                href = item.rstrip("/") + "/"
+                props = (
+                    "<d:resourcetype><d:collection/></d:resourcetype>"
+                    f'<d:getetag>"{self.versions.get(item, 0)}"</d:getetag>'
+                )
+            else:
+                href = item
+                props = (
+                    "<d:resourcetype/>"
+                    f"<d:getcontentlength>{len(self.files[item])}</d:getcontentlength>"
+                )
+            parts.append(
+                f"<d:response><d:href>{urllib.parse.quote(href)}</d:href><d:propstat><d:prop>"
+                f"{props}<d:getlastmodified>{modified}</d:getlastmodified>"
+                "</d:prop><d:status>HTTP/1.1 200 OK</d:status></d:propstat></d:response>"
+            )
+        body = '<?xml version="1.0"?><d:multistatus xmlns:d="DAV:">' + "".join(parts)
+        return (body + "</d:multistatus>").encode("utf-8")
+
+
+@pytest.fixture
+def webdav_server() -> InMemoryWebDav:
+    return InMemoryWebDav()
+
+
+@pytest.fixture
+def webdav_client(webdav_server: InMemoryWebDav):
+    from app.infrastructure.backup.webdav_client import WebDavClient
+
+    client = WebDavClient(
+        base_url=webdav_server.base_url,
+        username="user",
+        password="password",
+        timeout_seconds=10,
+        verify_tls=True,
+        max_connections=4,
+        transport=webdav_server.transport(),
+    )
+    with client:
+        yield client
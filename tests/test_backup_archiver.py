@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import json
+import os
+import tarfile
+from datetime import UTC, datetime
+from pathlib import Path
+
+import pytest
+
+from app.infrastructure.backup import service as backup_service
+from app.infrastructure.backup.archiver import SourceDrift, create_tar_archive
+from app.infrastructure.backup.file_index import FileIndex
+from app.infrastructure.backup.manifest import MANIFEST_MEMBER, build_manifest
+from app.infrastructure.backup.restore import apply_archive
+from app.infrastructure.backup.walker import WalkedFile
+from app.infrastructure.backup.webdav_client import WebDavClient
+from app.settings.config import BackupSettings
+
+ARCHIVE_NAME = "files_backup_010120250000.tar.gz"
+
+
+@pytest.fixture
+def tree(tmp_path: Path) -> list[WalkedFile]:
+    media = tmp_path / "project" / "media"
+    media.mkdir(parents=True)
+    walked = []
+    for name, payload in (("a.txt", b"a" * 1000), ("b.txt", b"b" * 1000), ("c.txt", b"c" * 10)):
+        path = media / name
+        path.write_bytes(payload)
+        walked.append(WalkedFile(path=path, relative=f"media/{name}", stat=path.stat()))
+    return walked
+
+
+def _archive(tmp_path: Path, files: list[WalkedFile]):
+    manifest = build_manifest(
+        archive_name=ARCHIVE_NAME,
+        included_roots=["media"],
+        excluded_patterns=[],
+        file_count=len(files),
+        total_uncompressed_size=sum(walked.stat.st_size for walked in files),
+        checksum_sha256=None,
+        created_at=datetime.now(UTC),
+        file_index=[
+            {
+                "path": walked.relative,
+                "size": walked.stat.st_size,
+                "mtime_ns": walked.stat.st_mtime_ns,
+                "inode": walked.stat.st_ino,
+            }
+            for walked in files
+        ],
+    )
+    drift = SourceDrift()
+    result = create_tar_archive(
+        temp_dir=tmp_path / "out",
+        files=files,
+        prefix="files_backup_",
+        timezone="UTC",
+        manifest=manifest,
+        archive_name=ARCHIVE_NAME,
+        created_at=datetime.now(UTC),
+        drift=drift,
+    )
+    return result, drift
+
+
+def _members(archive_path: Path) -> tuple[dict[str, bytes], list[dict]]:
+    contents: dict[str, bytes] = {}
+    manifests: list[dict] = []
+    with tarfile.open(archive_path, "r:gz") as tar:
+        for member in tar:
+            data = tar.extractfile(member).read()
+            if member.name == MANIFEST_MEMBER:
+                manifests.append(json.loads(data))
+            else:
+                contents[member.name] = data
+    return contents, manifests
+
+
+def test_file_shrunk_after_walk_is_archived_from_fresh_stat(tmp_path, tree):
+    shrunk = tree[0]
+    shrunk.path.write_bytes(b"short")
+    os.utime(shrunk.path, ns=(shrunk.stat.st_mtime_ns + 10**9,) * 2)
+
+    result, drift = _archive(tmp_path, tree)
+
+    assert list(drift.changed) == ["media/a.txt"]
+    assert drift.missing == []
+    contents, manifests = _members(result.archive_path)
+    assert contents["media/a.txt"] == b"short"
+    assert contents["media/b.txt"] == b"b" * 1000
+    assert result.file_count == 3
+    assert result.total_uncompressed_size == 5 + 1000 + 10
+
+    # the first manifest describes the walk, the trailing one the archived bytes
+    assert len(manifests) == 2
+    corrected = manifests[-1]
+    assert corrected["total_uncompressed_size"] == 1015
+    sizes = {item["path"]: item["size"] for item in corrected["file_index"]}
+    assert sizes["media/a.txt"] == 5
+
+
+def test_file_removed_after_walk_is_skipped_and_tombstoned(tmp_path, tree):
+    tree[1].path.unlink()
+
+    result, drift = _archive(tmp_path, tree)
+
+    assert drift.missing == ["media/b.txt"]
+    contents, manifests = _members(result.archive_path)
+    assert sorted(contents) == ["media/a.txt", "media/c.txt"]
+    assert result.file_count == 2
+    corrected = manifests[-1]
+    assert corrected["file_count"] == 2
+    assert corrected["total_uncompressed_size"] == 1010
+    assert "media/b.txt" not in {item["path"] for item in corrected["file_index"]}
+    assert corrected["deleted_paths"] == ["media/b.txt"]
+
+    # restoring over an older copy removes it, as the trailing manifest says
+    target = tmp_path / "restore"
+    (target / "media").mkdir(parents=True)
+    (target / "media" / "b.txt").write_bytes(b"from the base archive")
+    with result.archive_path.open("rb") as stream:
+        apply_archive(stream, ARCHIVE_NAME, target)
+    assert sorted(p.name for p in (target / "media").iterdir()) == ["a.txt", "c.txt"]
+
+
+def test_unchanged_tree_has_a_single_manifest(tmp_path, tree):
+    result, drift = _archive(tmp_path, tree)
+
+    assert not drift
+    _, manifests = _members(result.archive_path)
+    assert len(manifests) == 1
+
+
+class _NoLock:
+    def __init__(self, **kwargs) -> None:
+        pass
+
+    def acquire(self) -> bool:
+        return True
+
+    def release(self) -> None:
+        pass
+
+
+def test_saved_index_follows_what_was_archived(tmp_path, monkeypatch, webdav_server):
+    media = tmp_path / "media"
+    media.mkdir()
+    (media / "kept.txt").write_text("kept")
+    (media / "rotated.log").write_text("rotated")
+    (media / "grown.txt").write_text("grown")
+
+    build_file_index = backup_service.build_file_index
+
+    def index_then_touch_tree(**kwargs):
+        index = build_file_index(**kwargs)
+        # log rotation and a write land between the walk and the tar pass
+        (media / "rotated.log").unlink()
+        (media / "grown.txt").write_text("grown after the walk")
+        return index
+
+    monkeypatch.setattr(backup_service, "build_file_index", index_then_touch_tree)
+    monkeypatch.setattr(backup_service, "RedisBackupLock", _NoLock)
+    backup_settings = BackupSettings(
+        INCLUDE_DIRS=["media"],
+        REMOTE_DIR="/backups",
+        WEBDAV_BASE_URL=webdav_server.base_url,
+        WEBDAV_PASSWORD="password",
+        LOCK_REDIS_URL="redis://localhost:6379/0",
+        LOG_FILE=str(tmp_path / "backup.log"),
+        ARCHIVE_MODE="incremental",
+    )
+    files_backup = backup_service.FilesBackupService(backup_settings, project_root=tmp_path)
+    monkeypatch.setattr(
+        files_backup,
+        "_webdav_client",
+        lambda throttle=None: WebDavClient(
+            base_url=webdav_server.base_url,
+            username="user",
+            password="password",
+            timeout_seconds=10,
+            verify_tls=True,
+            transport=webdav_server.transport(),
+        ),
+    )
+
+    summary = files_backup.run(force=True)
+
+    assert summary.file_count == 2
+    index = FileIndex.load(tmp_path / backup_settings.INDEX_FILE)
+    assert sorted(index.entries) == ["media/grown.txt", "media/kept.txt"]
+    assert index.entries["media/grown.txt"].size == len("grown after the walk")
@@ -0,0 +1,174 @@
+"""Integration tests of the PostgreSQL dump against a real server.
+
+Set BACKUP_TEST_DATABASE_DSN to a database the test may create tables in
+(e.g. postgresql://postgres@127.0.0.1:5432/postgres); pg_dump is taken from
+BACKUP_TEST_PG_DUMP or PATH. Without either the module is skipped.
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import os
+import re
+import shutil
+import subprocess
+import tarfile
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import psycopg2
+import pytest
+
+from app.infrastructure.backup import db_dump
+from app.infrastructure.backup import service as backup_service
+from app.infrastructure.backup.db_dump import DB_DUMP_MEMBER_DIR, dump_database
+from app.infrastructure.backup.manifest import MANIFEST_MEMBER
+from app.infrastructure.backup.webdav_client import WebDavClient
+from app.settings.config import BackupSettings
+
+DSN = os.environ.get("BACKUP_TEST_DATABASE_DSN")
+PG_DUMP = os.environ.get("BACKUP_TEST_PG_DUMP") or shutil.which("pg_dump")
+
+pytestmark = pytest.mark.skipif(
+    not DSN or not PG_DUMP, reason="BACKUP_TEST_DATABASE_DSN or pg_dump is not available"
+)
+
+_LSN_RE = re.compile(r"^[0-9A-F]+/[0-9A-F]+$")
+
+
+def _connect():
+    uri, password = db_dump._libpq_uri(DSN)
+    connection = psycopg2.connect(uri, password=password) if password else psycopg2.connect(uri)
+    connection.autocommit = True
+    return connection
+
+
+@pytest.fixture
+def table():
+    name = f"backup_test_{uuid.uuid4().hex[:12]}"
+    try:
+        connection = _connect()
+    except psycopg2.OperationalError as exc:
+        pytest.skip(f"database is not reachable: {exc}")
+    with connection.cursor() as cursor:
+        cursor.execute(f"CREATE TABLE {name} (value text NOT NULL)")
+        cursor.execute(f"INSERT INTO {name} VALUES ('before-snapshot')")
+    try:
+        yield name
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {name}")
+        connection.close()
+
+
+def _restored_rows(dump_path: Path, table_name: str) -> str:
+    pg_restore = str(Path(PG_DUMP).with_name("pg_restore"))
+    completed = subprocess.run(
+        [pg_restore, "--data-only", f"--table={table_name}", "--file=-", str(dump_path)],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return completed.stdout
+
+
+def test_pg_dump_reads_the_exported_snapshot(tmp_path, monkeypatch, table):
+    real_run = subprocess.run
+
+    def run_after_concurrent_write(command, **kwargs):
+        # committed after pg_export_snapshot() but before pg_dump starts
+        with _connect() as connection, connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {table} VALUES ('after-snapshot')")
+        return real_run(command, **kwargs)
+
+    monkeypatch.setattr(db_dump.subprocess, "run", run_after_concurrent_write)
+    dump = dump_database(
+        dsn=DSN,
+        output_dir=tmp_path,
+        dump_format=db_dump.DB_DUMP_FORMAT_DIRECTORY,
+        jobs=2,
+        pg_dump_binary=PG_DUMP,
+    )
+
+    assert _LSN_RE.match(dump.snapshot.lsn)
+    assert dump.member_path == f"{DB_DUMP_MEMBER_DIR}/{dump.snapshot.database}"
+    assert all(walked.relative.startswith(f"{dump.member_path}/") for walked in dump.files)
+
+    rows = _restored_rows(tmp_path / dump.member_path, table)
+    assert "before-snapshot" in rows
+    assert "after-snapshot" not in rows
+
+
+class _NoLock:
+    def __init__(self, **kwargs) -> None:
+        pass
+
+    def acquire(self) -> bool:
+        return True
+
+    def release(self) -> None:
+        pass
+
+
+def _read_archive(payload: bytes) -> tuple[dict, list[str]]:
+    with tarfile.open(fileobj=io.BytesIO(payload), mode="r:gz") as archive:
+        manifest = json.load(archive.extractfile(MANIFEST_MEMBER))
+        return manifest, archive.getnames()
+
+
+def test_incremental_archive_carries_the_whole_dump(tmp_path, monkeypatch, table, webdav_server):
+    monkeypatch.setattr(backup_service, "RedisBackupLock", _NoLock)
+    media = tmp_path / "media"
+    media.mkdir()
+    (media / "a.txt").write_text("a")
+    (media / "b.txt").write_text("b")
+
+    backup_settings = BackupSettings(
+        INCLUDE_DIRS=["media"],
+        REMOTE_DIR="/backups",
+        WEBDAV_BASE_URL=webdav_server.base_url,
+        WEBDAV_PASSWORD="password",
+        LOCK_REDIS_URL="redis://localhost:6379/0",
+        LOG_FILE=str(tmp_path / "backup.log"),
+        ARCHIVE_MODE="incremental",
+        DB_DUMP=True,
+        DB_DUMP_DSN=DSN,
+        DB_DUMP_BINARY=PG_DUMP,
+    )
+    files_backup = backup_service.FilesBackupService(backup_settings, project_root=tmp_path)
+
+    def webdav_client(throttle=None):
+        return WebDavClient(
+            base_url=webdav_server.base_url,
+            username="user",
+            password="password",
+            timeout_seconds=10,
+            verify_tls=True,
+            throttle=throttle,
+            transport=webdav_server.transport(),
+        )
+
+    monkeypatch.setattr(files_backup, "_webdav_client", webdav_client)
+
+    full = files_backup.run(force=True)
+    (media / "b.txt").write_text("changed")
+    incremental = files_backup.run(force=True)
+
+    assert incremental.backup_type == "incremental"
+    assert incremental.base_archive == full.archive_name
+    assert _LSN_RE.match(incremental.database_snapshot_lsn)
+
+    manifest, names = _read_archive(webdav_server.files[incremental.remote_archive_path])
+    assert manifest["database"]["snapshot_lsn"] == incremental.database_snapshot_lsn
+    # the dump runs before the walk, so the snapshot is older than the file index
+    assert datetime.fromisoformat(manifest["database"]["snapshot_at"]) <= datetime.fromisoformat(
+        manifest["file_index_created_at"]
+    )
+
+    dump_members = [name for name in names if name.startswith(f"{DB_DUMP_MEMBER_DIR}/")]
+    assert f"{manifest['database']['path']}/toc.dat" in dump_members
+    assert len(dump_members) == manifest["database"]["file_count"]
+    media_members = [name for name in names if name.startswith("media/")]
+    assert media_members == ["media/b.txt"]
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import io
+import os
+from pathlib import Path
+
+import httpx
+import pytest
+
+from app.infrastructure.backup import segments
+from app.infrastructure.backup.segments import (
+    SEGMENTS_MANIFEST,
+    SegmentedReader,
+    plan_segments,
+    upload_segments,
+)
+
+SEGMENT_SIZE = 64 * 1024
+PARTS_DIR = "/backups/files_backup_010120250000.tar.gz.parts"
+
+
+@pytest.fixture
+def archive(tmp_path: Path) -> Path:
+    path = tmp_path / "files_backup_010120250000.tar.gz"
+    # 4 full segments and a short tail
+    path.write_bytes(os.urandom(SEGMENT_SIZE * 4 + 1000))
+    return path
+
+
+@pytest.fixture(autouse=True)
+def no_retry_delay(monkeypatch):
+    monkeypatch.setattr(segments.time, "sleep", lambda seconds: None)
+
+
+def _upload(client, archive: Path, *, retries: int = 0):
+    plan = plan_segments(archive, SEGMENT_SIZE)
+    return plan, upload_segments(
+        client, plan, archive, PARTS_DIR, parallelism=3, retries=retries
+    )
+
+
+def test_failed_segment_put_is_retried_then_reported(webdav_server, webdav_client, archive):
+    plan = plan_segments(archive, SEGMENT_SIZE)
+    failing = f"{PARTS_DIR}/{plan.segments[2].name}"
+    failures = {"left": 1}
+
+    def fail_once(path: str) -> bool:
+        if path == failing and failures["left"]:
+            failures["left"] -= 1
+            return True
+        return False
+
+    webdav_server.fail_put = fail_once
+    result = upload_segments(
+        webdav_client, plan, archive, PARTS_DIR, parallelism=3, retries=1
+    )
+    assert result.uploaded == len(plan.segments)
+    assert webdav_server.put_count(plan.segments[2].name) == 2
+
+    # a segment that keeps failing stops the upload before the manifest
+    webdav_server.files.clear()
+    webdav_server.fail_put = lambda path: path == failing
+    with pytest.raises(httpx.HTTPStatusError):
+        _upload(webdav_client, archive)
+    assert f"{PARTS_DIR}/{SEGMENTS_MANIFEST}" not in webdav_server.files
+    assert failing not in webdav_server.files
+
+
+def test_resume_uploads_only_missing_segments(webdav_server, webdav_client, archive):
+    plan = plan_segments(archive, SEGMENT_SIZE)
+    failing = f"{PARTS_DIR}/{plan.segments[1].name}"
+    webdav_server.fail_put = lambda path: path == failing
+    with pytest.raises(httpx.HTTPStatusError):
+        _upload(webdav_client, archive)
+
+    # segments still queued behind the failed one may have been cancelled
+    missing = [
+        segment.name
+        for segment in plan.segments
+        if f"{PARTS_DIR}/{segment.name}" not in webdav_server.files
+    ]
+    assert plan.segments[1].name in missing
+    assert len(missing) < len(plan.segments)
+
+    webdav_server.fail_put = lambda path: False
+    webdav_server.requests.clear()
+    _, result = _upload(webdav_client, archive)
+
+    assert result.uploaded == len(missing)
+    assert result.skipped == len(plan.segments) - len(missing)
+    assert webdav_server.put_count(".part") == len(missing)
+    for name in missing:
+        assert webdav_server.put_count(name) == 1
+    assert f"{PARTS_DIR}/{SEGMENTS_MANIFEST}" in webdav_server.files
+
+    with SegmentedReader(webdav_client, PARTS_DIR, retries=0) as reader:
+        assert io.BufferedReader(reader).read() == archive.read_bytes()
+
+
+def test_restore_detects_corrupted_segment(webdav_server, webdav_client, archive):
+    plan, _ = _upload(webdav_client, archive)
+    corrupted = f"{PARTS_DIR}/{plan.segments[3].name}"
+    data = bytearray(webdav_server.files[corrupted])
+    data[100] ^= 0xFF
+    webdav_server.files[corrupted] = bytes(data)
+
+    with (
+        SegmentedReader(webdav_client, PARTS_DIR, retries=0) as reader,
+        pytest.raises(ValueError, match=plan.segments[3].name),
+    ):
+        io.BufferedReader(reader).read()
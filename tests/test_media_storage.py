@@ -0,0 +1,123 @@
+"""Контракт MediaStorage: локальный драйвер и S3 ведут себя одинаково.
+
+S3MediaStorage проверяется на moto (если установлен, входит в dev-extras) и
+на настоящем S3-совместимом сервере, если задан MEDIA_TEST_S3_ENDPOINT
+(например, локальный MinIO: http://127.0.0.1:9000; ключи —
+MEDIA_TEST_S3_ACCESS_KEY / MEDIA_TEST_S3_SECRET_KEY). Тест создаёт
+временный бакет и удаляет его после себя.
+"""
+
+from __future__ import annotations
+
+import io
+import os
+import uuid
+from collections.abc import Iterator
+
+import pytest
+
+from app.infrastructure.media.backends import LocalMediaStorage, MediaStorage, S3MediaStorage
+from app.settings.config import settings
+
+S3_ENDPOINT = os.environ.get("MEDIA_TEST_S3_ENDPOINT")
+
+# S3 не принимает multipart-части меньше 5 МБ (кроме последней)
+PART_MB = 5
+
+
+def _s3_storage(bucket: str, **kwargs: str) -> S3MediaStorage:
+    storage = S3MediaStorage(
+        bucket=bucket,
+        prefix="vekolom",
+        multipart_threshold_mb=PART_MB,
+        multipart_chunk_mb=PART_MB,
+        **kwargs,
+    )
+    storage._client.create_bucket(Bucket=bucket)
+    return storage
+
+
+@pytest.fixture(params=["local", "moto", "s3"])
+def storage(request, tmp_path, monkeypatch) -> Iterator[MediaStorage]:
+    if request.param == "local":
+        monkeypatch.setattr(settings.media, "MEDIA_ROOT", str(tmp_path))
+        yield LocalMediaStorage()
+        return
+
+    bucket = f"vekolom-test-{uuid.uuid4().hex[:12]}"
+    if request.param == "moto":
+        moto = pytest.importorskip("moto")
+        with moto.mock_aws():
+            yield _s3_storage(bucket, access_key="testing", secret_key="testing")
+        return
+
+    if not S3_ENDPOINT:
+        pytest.skip("MEDIA_TEST_S3_ENDPOINT is not set")
+    storage = _s3_storage(
+        bucket,
+        endpoint_url=S3_ENDPOINT,
+        access_key=os.environ.get("MEDIA_TEST_S3_ACCESS_KEY", "minio"),
+        secret_key=os.environ.get("MEDIA_TEST_S3_SECRET_KEY", "minio123"),
+    )
+    try:
+        yield storage
+    finally:
+        listing = storage._client.list_objects_v2(Bucket=bucket)
+        for item in listing.get("Contents", []):
+            storage._client.delete_object(Bucket=bucket, Key=item["Key"])
+        storage._client.delete_bucket(Bucket=bucket)
+
+
+def test_save_read_stat_delete(storage):
+    relative = "media/ab/cd/photo.jpg"
+    assert not storage.exists(relative)
+    assert storage.stat(relative) is None
+
+    storage.save(relative, b"jpeg bytes")
+
+    assert storage.exists(relative)
+    assert storage.read(relative) == b"jpeg bytes"
+    stat = storage.stat(relative)
+    assert stat is not None
+    assert stat.size == len(b"jpeg bytes")
+    assert stat.modified_at > 0
+
+    storage.save(relative, io.BytesIO(b"replaced"))
+    assert storage.read(relative) == b"replaced"
+
+    storage.delete(relative)
+    assert not storage.exists(relative)
+    # повторное удаление — не ошибка
+    storage.delete(relative)
+
+
+def test_read_range_contract(storage):
+    relative = "media/range.bin"
+    storage.save(relative, b"0123456789")
+
+    assert storage.read_range(relative, 0, 4) == b"0123"
+    assert storage.read_range(relative, 4) == b"456789"
+    # end не включается и обрезается по концу файла
+    assert storage.read_range(relative, 8, 100) == b"89"
+    assert storage.read_range(relative, 5, 5) == b""
+    # start за концом файла: S3 отвечает 416, драйвер — пустыми байтами
+    assert storage.read_range(relative, 10) == b""
+    assert storage.read_range(relative, 50, 60) == b""
+
+
+def test_missing_file_raises_file_not_found(storage):
+    with pytest.raises(FileNotFoundError):
+        storage.read("media/missing.jpg")
+    with pytest.raises(FileNotFoundError):
+        storage.read_range("media/missing.jpg", 0, 10)
+
+
+def test_large_stream_is_saved_whole(storage):
+    # больше порога: S3 загружает его multipart-частями
+    payload = os.urandom(2 * PART_MB * 1024 * 1024 + 1024)
+
+    storage.save("media/large.bin", io.BytesIO(payload))
+
+    assert storage.stat("media/large.bin").size == len(payload)
+    assert storage.read("media/large.bin") == payload
+    assert storage.read_range("media/large.bin", len(payload) - 1024) == payload[-1024:]
@@ -0,0 +1,124 @@
+"""Выгрузка прайса: упавший writer не валит остальные форматы и не держит файлы."""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import ClassVar
+
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.modules.pricelist.application import export
+from app.modules.pricelist.infrastructure.sa_models import Category, Position, PriceDate
+from app.settings.config import PricelistSettings, settings
+
+
+class BrokenCsvWriter(export.CsvWriter):
+    """Открывает файл и падает на первой строке."""
+
+    instances: ClassVar[list[BrokenCsvWriter]] = []
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.instances.append(self)
+
+    def row(self, row: export.PricelistRow) -> None:
+        raise OSError("disk full")
+
+
+class TrackedJsonLinesWriter(export.JsonLinesWriter):
+    instances: ClassVar[list[TrackedJsonLinesWriter]] = []
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.instances.append(self)
+
+    def begin(self, path: Path, price_date: str) -> None:
+        super().begin(path, price_date)
+        self.opened = self._stream
+
+
+@pytest.fixture
+def static_root(tmp_path: Path, monkeypatch) -> Path:
+    monkeypatch.setattr(settings.static, "STATIC_ROOT", str(tmp_path))
+    return tmp_path / "excel"
+
+
+@pytest.fixture
+def session(monkeypatch):
+    engine = create_engine("sqlite://")
+    tables = [Category.__table__, Position.__table__, PriceDate.__table__]
+    Position.metadata.create_all(engine, tables=tables)
+    with Session(engine) as session:
+        session.add_all(
+            [
+                Category(id=1, name="Чёрный металл"),
+                Category(id=2, name="Цветной металл"),
+                PriceDate(id=1, date="01.01.2025"),
+                Position(id=1, name="Медь", price="500", price_card="490", category_id=2),
+                Position(id=2, name="Лом 3А", price="20", price_card="19", category_id=1),
+            ]
+        )
+        session.flush()
+        # SQLite не знает REPEATABLE READ; снимок данных здесь не проверяется
+        monkeypatch.setattr(session, "connection", lambda **kwargs: None)
+        yield session
+    engine.dispose()
+
+
+def test_failing_writer_is_dropped_and_the_rest_published(static_root, session, monkeypatch):
+    BrokenCsvWriter.instances.clear()
+    monkeypatch.setitem(export.WRITERS, "csv", BrokenCsvWriter)
+    static_root.mkdir()
+    (static_root / "pricelist.csv").write_text("устаревшие цены")
+    (static_root / "pricelist.csv.gz").write_bytes(b"stale")
+
+    published = export.export_pricelist(session, version=7, formats=["xlsx", "csv", "jsonl"])
+
+    assert sorted(published) == ["jsonl", "xlsx"]
+    assert BrokenCsvWriter.instances[0]._stream is None
+    records = [
+        json.loads(line) for line in (static_root / "pricelist.jsonl").read_text().splitlines()
+    ]
+    assert [record["name"] for record in records] == ["Медь", "Лом 3А"]
+    assert (static_root / "pricelist.xlsx.gz").exists()
+    # старая CSV не отдаётся под новым номером правки
+    assert not (static_root / "pricelist.csv").exists()
+    assert not (static_root / "pricelist.csv.gz").exists()
+    assert export.read_published_version() == 7
+    assert sorted(path.name for path in static_root.glob("*.tmp")) == []
+
+
+def test_all_writers_failing_publishes_nothing(static_root, session, monkeypatch):
+    monkeypatch.setitem(export.WRITERS, "csv", BrokenCsvWriter)
+
+    with pytest.raises(RuntimeError):
+        export.export_pricelist(session, version=7, formats=["csv"])
+
+    assert sorted(path.name for path in static_root.iterdir()) == []
+
+
+def test_writers_are_closed_when_the_query_fails(static_root, session, monkeypatch):
+    TrackedJsonLinesWriter.instances.clear()
+    monkeypatch.setitem(export.WRITERS, "jsonl", TrackedJsonLinesWriter)
+    # writer'ы уже открыли файлы, когда запрос позиций падает
+    monkeypatch.setattr(export, "_positions_query", lambda: text("SELECT * FROM missing"))
+
+    with pytest.raises(OperationalError):
+        export.export_pricelist(session, formats=["xlsx", "jsonl"])
+
+    writer = TrackedJsonLinesWriter.instances[0]
+    assert writer.opened.closed
+    assert writer._stream is None
+    assert sorted(path.name for path in static_root.iterdir()) == []
+
+
+def test_pdf_requires_an_existing_font(tmp_path):
+    with pytest.raises(ValidationError, match="PRICELIST_PDF_FONT_PATH"):
+        PricelistSettings(EXPORT_FORMATS=["xlsx", "pdf"], PDF_FONT_PATH=str(tmp_path / "none.ttf"))
+
+    assert PricelistSettings(EXPORT_FORMATS=["xlsx"], PDF_FONT_PATH=str(tmp_path / "none.ttf"))
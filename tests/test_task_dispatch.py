@@ -0,0 +1,109 @@
+"""TaskDispatcher при медленном брокере: event loop не блокируется."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from typing import Self
+
+import pytest
+
+from app.infrastructure.celery.dispatch import TaskDispatcher
+
+BROKER_DELAY = 0.3
+TICK = 0.01
+
+
+class Ticker:
+    """Считает тики asyncio.sleep — если loop заблокирован, тиков нет."""
+
+    def __init__(self) -> None:
+        self.ticks = 0
+        self._task: asyncio.Task | None = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(TICK)
+            self.ticks += 1
+
+    def __enter__(self) -> Self:
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        assert self._task is not None
+        self._task.cancel()
+
+
+@pytest.mark.asyncio
+async def test_slow_broker_does_not_block_loop():
+    published: list[str] = []
+
+    def slow_publish(name: str) -> None:
+        time.sleep(BROKER_DELAY)
+        published.append(name)
+
+    dispatcher = TaskDispatcher(max_pending=10)
+    with Ticker() as ticker:
+        started_at = time.perf_counter()
+        await dispatcher.submit(slow_publish, "pricelist")
+        assert time.perf_counter() - started_at < BROKER_DELAY / 3
+
+        await dispatcher.drain()
+        # пока поток ждал брокер, loop продолжал крутиться
+        assert ticker.ticks >= BROKER_DELAY / TICK / 3
+
+    assert published == ["pricelist"]
+
+
+@pytest.mark.asyncio
+async def test_duplicate_submits_collapse_while_batch_is_in_flight():
+    calls: list[tuple[str, int]] = []
+
+    def slow_publish(name: str) -> None:
+        time.sleep(BROKER_DELAY)
+        calls.append((name, 0))
+
+    def publish(name: str, position_id: int) -> None:
+        calls.append((name, position_id))
+
+    dispatcher = TaskDispatcher(max_pending=10)
+    await dispatcher.submit(slow_publish, "first")
+    await asyncio.sleep(0)
+    # массовое удаление: 20 одинаковых вызовов, пока поток занят первой пачкой
+    for _ in range(20):
+        await dispatcher.submit(publish, "pricelist", 1)
+    await dispatcher.submit(publish, "pricelist", 2)
+    await dispatcher.drain()
+
+    assert calls == [("first", 0), ("pricelist", 1), ("pricelist", 2)]
+
+
+@pytest.mark.asyncio
+async def test_backpressure_waits_without_blocking_loop():
+    broker_released = threading.Event()
+    published: list[int] = []
+
+    def blocked_publish(value: int) -> None:
+        broker_released.wait(timeout=5)
+        published.append(value)
+
+    dispatcher = TaskDispatcher(max_pending=2)
+    await dispatcher.submit(blocked_publish, 0)
+    await asyncio.sleep(0)
+    await dispatcher.submit(blocked_publish, 1)
+    await dispatcher.submit(blocked_publish, 2)
+
+    with Ticker() as ticker:
+        # очередь полна: третий вызов ждёт текущую пачку
+        overflow = asyncio.create_task(dispatcher.submit(blocked_publish, 3))
+        await asyncio.sleep(BROKER_DELAY)
+        assert not overflow.done()
+        assert ticker.ticks >= BROKER_DELAY / TICK / 3
+
+        broker_released.set()
+        await asyncio.wait_for(overflow, timeout=5)
+        await dispatcher.drain()
+
+    assert published == [0, 1, 2, 3]